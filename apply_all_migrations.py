@@ -1,55 +1,60 @@
 #!/usr/bin/env python3
 """
 Database migration script to apply all pending Drizzle migrations
+
+Pass --jobs N to run independent statements (e.g. index builds on different
+tables) concurrently on N connections; statements touching the same table
+keep their order. A critical-path timing report is printed at the end.
+
+Applied migrations are recorded in the schema_migrations table with their
+checksum and per-statement timings (see ops/ledger.py); entries in
+migrations/meta/_journal.json from before the ledger also count as applied.
+
+Pass --plan to print each pending statement's lock level, whether it
+rewrites a table and its expected duration against current table sizes,
+without changing anything.
 """
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import argparse
 import sys
 import json
+import time
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from ops import db, ledger, migrate_dag, planner, sqllex
 
 def get_db_connection():
-    """Get database connection from environment"""
-    db_url = os.getenv('DATABASE_URL')
-    if not db_url:
-        print("❌ DATABASE_URL not found in environment")
-        print("   Make sure .env file exists and contains DATABASE_URL")
-        sys.exit(1)
-
-    try:
-        conn = psycopg2.connect(db_url)
-        print("✅ Connected to database")
-        return conn
-    except Exception as e:
-        print(f"❌ Failed to connect to database: {e}")
-        sys.exit(1)
+    """Get a pooled database connection from environment"""
+    return db.connect()
 
-def get_applied_migrations():
-    """Get list of already applied migrations from journal"""
+def get_journal_migrations():
+    """Get list of migrations recorded in the Drizzle journal"""
     journal_path = Path('./migrations/meta/_journal.json')
     if not journal_path.exists():
-        print("⚠️  Migration journal not found")
         return []
     
     try:
         with open(journal_path, 'r') as f:
             journal = json.load(f)
-            applied = [entry['tag'] for entry in journal.get('entries', [])]
-            print(f"📋 Applied migrations: {applied}")
-            return applied
+            return [entry['tag'] for entry in journal.get('entries', [])]
     except Exception as e:
         print(f"⚠️  Could not read journal: {e}")
         return []
 
-def get_pending_migrations():
+def get_applied_migrations(conn):
+    """Get {tag: checksum} of applied migrations from the schema_migrations ledger
+    
+    Journal entries that predate the ledger count as applied with an unknown checksum.
+    """
+    applied = ledger.applied(conn)
+    for tag in get_journal_migrations():
+        applied.setdefault(tag, None)
+    print(f"📋 Applied migrations: {sorted(applied)}")
+    return applied
+
+def get_pending_migrations(conn):
     """Get list of migration files that haven't been applied yet"""
     migrations_dir = Path('./migrations')
-    applied = get_applied_migrations()
+    applied = get_applied_migrations(conn)
     
     # Define migration order - dependencies first
     migration_order = [
@@ -67,11 +72,14 @@ def get_pending_migrations():
     
     pending = []
     for tag in migration_order:
+        # Find the migration file for this tag
+        mig_files = list(migrations_dir.glob(f'{tag}.sql'))
+        if not mig_files:
+            continue
         if tag not in applied:
-            # Find the migration file for this tag
-            mig_files = list(migrations_dir.glob(f'{tag}.sql'))
-            if mig_files:
-                pending.append((tag, mig_files[0]))
+            pending.append((tag, mig_files[0]))
+        elif applied[tag] and applied[tag] != sqllex.parse_file(mig_files[0]).checksum:
+            print(f"⚠️  {tag} changed since it was applied; not re-running it")
     
     print(f"\n📁 Found {len(pending)} pending migrations")
     for tag, path in pending:
@@ -79,44 +87,33 @@ def get_pending_migrations():
     
     return pending
 
+def classify_error(tag, error):
+    """Return (status, reason): 'skipped' for tolerable errors, otherwise 'failed'"""
+    error_str = str(error).lower()
+    error_code = str(error)
+    
+    # Codes for "already exists"
+    if "already exists" in error_str or "42p07" in error_str:
+        return 'skipped', "Already exists"
+    # Code for "column does not exist" - try to skip for phase3-blockchain
+    if tag == 'phase3-blockchain' and ('does not exist' in error_str or '42703' in error_code):
+        return 'skipped', "Skipped (dependency not met)"
+    # Skip duplicate key violations
+    if "duplicate" in error_str or "unique" in error_str:
+        return 'skipped', "Duplicate/Unique constraint"
+    return 'failed', error_code[:80]
+
+def is_fatal(tag, status):
+    """Only fail on non-phase3 migrations"""
+    return status == 'failed' and tag != 'phase3-blockchain'
+
 def apply_migration(conn, cursor, migration_file):
-    """Apply a single migration file"""
+    """Apply a single migration file and record it in schema_migrations"""
+    run = None
     try:
-        with open(migration_file, 'r') as f:
-            content = f.read()
-        
-        # Split by the statement breakpoint marker used by Drizzle
-        # If no breakpoint is found, treat the whole file as one statement
-        if '--> statement-breakpoint' in content:
-            statements = content.split('--> statement-breakpoint')
-            statements = [s.strip() for s in statements if s.strip()]
-        else:
-            # For files without statement-breakpoint (like phase3-blockchain.sql)
-            # Split by semicolons but preserve comments
-            lines = []
-            current_statement = []
-            for line in content.split('\n'):
-                stripped = line.strip()
-                # Skip empty lines and comments at the start of a line
-                if not stripped or stripped.startswith('--'):
-                    if stripped and not stripped.startswith('--'):
-                        current_statement.append(line)
-                    continue
-                current_statement.append(line)
-                if stripped.endswith(';'):
-                    statement_text = '\n'.join(current_statement).strip()
-                    if statement_text and not statement_text.startswith('--'):
-                        lines.append(statement_text)
-                    current_statement = []
-            
-            # Add any remaining statement
-            if current_statement:
-                statement_text = '\n'.join(current_statement).strip()
-                if statement_text and not statement_text.startswith('--'):
-                    lines.append(statement_text)
-            
-            # Filter and clean statements
-            statements = [s for s in lines if s.strip() and not s.strip().startswith('--')]
+        parsed = sqllex.parse_file(migration_file)
+        statements = parsed.statements
+        run = ledger.Run(migration_file.stem, parsed.checksum, len(statements))
         
         print(f"\n📝 Applying {migration_file.stem}...")
         print(f"   Found {len(statements)} SQL statements")
@@ -129,69 +126,129 @@ def apply_migration(conn, cursor, migration_file):
             if not statement.strip():
                 continue
             
+            started = time.monotonic()
             try:
+                # Savepoint so a tolerated error does not undo earlier statements
+                cursor.execute("SAVEPOINT migration_statement")
                 cursor.execute(statement)
+                cursor.execute("RELEASE SAVEPOINT migration_statement")
                 applied_count += 1
+                run.record(statement, time.monotonic() - started, 'applied', i)
                 print(f"   ✓ Statement {i}/{len(statements)}")
             except Exception as e:
                 # Some statements may fail if they already exist
-                error_str = str(e).lower()
-                error_code = str(e)
-                
-                # Codes for "already exists"
-                if "already exists" in error_str or "42p07" in error_str:
-                    skipped_count += 1
-                    print(f"   ⚠️  Statement {i}/{len(statements)}: Already exists")
-                    # Need to rollback failed statement to continue
-                    conn.rollback()
-                # Code for "column does not exist" - try to skip for phase3-blockchain
-                elif migration_file.stem == 'phase3-blockchain' and ('does not exist' in error_str or '42703' in error_code):
-                    skipped_count += 1
-                    print(f"   ⚠️  Statement {i}/{len(statements)}: Skipped (dependency not met)")
-                    conn.rollback()
-                # Skip duplicate key violations
-                elif "duplicate" in error_str or "unique" in error_str:
+                cursor.execute("ROLLBACK TO SAVEPOINT migration_statement")
+                status, reason = classify_error(migration_file.stem, e)
+                run.record(statement, time.monotonic() - started, status, i)
+                if status == 'skipped':
                     skipped_count += 1
-                    print(f"   ⚠️  Statement {i}/{len(statements)}: Duplicate/Unique constraint")
-                    conn.rollback()
+                    print(f"   ⚠️  Statement {i}/{len(statements)}: {reason}")
                 else:
                     failed_count += 1
-                    print(f"   ✗ Statement {i}/{len(statements)}: {error_code[:80]}")
-                    conn.rollback()
-                    if migration_file.stem != 'phase3-blockchain':
-                        # Only fail on non-phase3 migrations
+                    print(f"   ✗ Statement {i}/{len(statements)}: {reason}")
+                    if is_fatal(migration_file.stem, status):
                         raise
         
-        # Commit this migration
+        # Commit this migration together with its ledger row
+        run.finish(conn, commit=False)
         conn.commit()
         print(f"✅ {migration_file.stem} applied (applied: {applied_count}, skipped: {skipped_count}, failed: {failed_count})")
         return True
     
     except Exception as e:
         print(f"❌ Failed to apply migration: {e}")
+        conn.rollback()
+        if run is not None:
+            run.finish(conn, status='failed')
         return False
 
+def apply_parallel(pending, jobs):
+    """Apply all pending migrations as one dependency DAG on `jobs` connections"""
+    statements = []
+    for tag, migration_file in pending:
+        statements.extend((tag, sql) for sql in sqllex.parse_file(migration_file).statements)
+    
+    nodes = migrate_dag.build_dag(statements)
+    print(f"\n🧩 {len(nodes)} statements, running on {jobs} connections...\n")
+    
+    def node_status(node, error):
+        status, _ = classify_error(node.tag, error)
+        return 'failed' if is_fatal(node.tag, status) else 'skipped'
+    
+    started = time.monotonic()
+    ok = migrate_dag.run_dag(nodes, jobs=jobs, classify_error=node_status)
+    migrate_dag.print_report(nodes, time.monotonic() - started)
+    record_parallel(pending, nodes)
+    return ok
+
+def record_parallel(pending, nodes):
+    """Write one schema_migrations row per migration from the DAG node timings"""
+    conn = get_db_connection()
+    try:
+        for tag, migration_file in pending:
+            tag_nodes = [n for n in nodes if n.tag == tag]
+            parsed = sqllex.parse_file(migration_file)
+            run = ledger.Run(tag, parsed.checksum, len(tag_nodes))
+            for i, node in enumerate(tag_nodes, 1):
+                run.record(node.sql, node.duration, node.status, i)
+            ran = [n for n in tag_nodes if n.started is not None]
+            # Span from the first statement start to the last statement end
+            span = max(n.finished for n in ran) - min(n.started for n in ran) if ran else 0.0
+            run.finish(conn, seconds=span)
+    finally:
+        conn.close()
+
+def plan_pending(conn, pending):
+    """Print the dry-run plan for all pending migrations"""
+    statements = []
+    for tag, migration_file in pending:
+        statements.extend((tag, sql) for sql in sqllex.parse_file(migration_file).statements)
+    
+    plans = planner.plan_statements(conn, statements)
+    planner.print_plan(plans)
+
 def main():
+    parser = argparse.ArgumentParser(description="Apply pending Drizzle migrations")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="worker connections for independent statements (default: 1, serial)")
+    parser.add_argument('--plan', action='store_true',
+                        help="show lock levels, rewrites and estimated durations without applying anything")
+    args = parser.parse_args()
+    # One pooled connection stays with main() for the final table listing
+    jobs = max(1, min(args.jobs, db.DEFAULT_POOL_MAX - 1))
+    
     print("🚀 Database Migration Tool\n")
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        pending = get_pending_migrations()
+        pending = get_pending_migrations(conn)
         
         if not pending:
             print("\n✅ All migrations are already applied!")
             return
         
+        if args.plan:
+            plan_pending(conn, pending)
+            return
+        
+        ledger.ensure_table(conn)
         print(f"\n⏳ Applying {len(pending)} pending migrations...\n")
         
-        for tag, migration_file in pending:
-            if not apply_migration(conn, cursor, migration_file):
-                print(f"\n❌ Failed at migration: {tag}")
+        if jobs > 1:
+            if not apply_parallel(pending, jobs):
+                print("\n❌ Some migration statements failed")
                 cursor.close()
                 conn.close()
                 sys.exit(1)
+        else:
+            for tag, migration_file in pending:
+                if not apply_migration(conn, cursor, migration_file):
+                    print(f"\n❌ Failed at migration: {tag}")
+                    cursor.close()
+                    conn.close()
+                    sys.exit(1)
         
         print("\n✅ All migrations applied successfully!")
         
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 """
 Simple BaseScan verification tool using API directly
+
+Statuses are fetched concurrently, with retries on rate limits and network
+errors (ops/explorer.py). Results are cached per (chain, address, bytecode
+hash): verified contracts are never re-fetched, unverified ones after --ttl
+seconds. --refresh ignores the cache.
 """
-import requests
-import json
-import sys
+import argparse
+import asyncio
+import os
+
+from ops import explorer
 
 BASESCAN_API = "https://api-sepolia.basescan.org/api"
-API_KEY = "Y8FSM4KAIQW5NSYUT2K7YXRJ8SYHHWPSAI"
+CHAIN_ID = 84532  # Base Sepolia
+RPC_URL = os.getenv("VITE_BASE_SEPOLIA_RPC", "https://sepolia.base.org")
+API_KEY = os.getenv("BASESCAN_API_KEY", "Y8FSM4KAIQW5NSYUT2K7YXRJ8SYHHWPSAI")
 
 CONTRACTS = {
     "BantahPoints": "0x3Fc4Eb09540625A07AB7c485c8e2c03a0F15FDCB",
@@ -16,31 +25,31 @@ CONTRACTS = {
     "PointsEscrow": "0xCfAa7FCE305c26F2429251e5c27a743E1a0C3FAf",
 }
 
-def check_verification_status(address):
-    """Check if contract is already verified"""
-    try:
-        params = {
-            "module": "contract",
-            "action": "getsourcecode",
-            "address": address,
-            "apikey": API_KEY
-        }
-        resp = requests.get(BASESCAN_API, params=params, timeout=10)
-        data = resp.json()
-        
-        if data["status"] == "1" and data["result"]:
-            source = data["result"][0].get("SourceCode", "")
-            return bool(source), source[:100] if source else None
-        return False, None
-    except Exception as e:
-        print(f"Error checking status: {e}")
-        return None, None
+parser = argparse.ArgumentParser(description="Check BaseScan verification status of the deployed contracts")
+parser.add_argument("--refresh", action="store_true", help="ignore cached statuses")
+parser.add_argument("--ttl", type=float, default=explorer.UNVERIFIED_TTL,
+                    help=f"seconds to trust a cached 'not verified' (default {explorer.UNVERIFIED_TTL})")
+args = parser.parse_args()
+
+async def check_all():
+    """getsourcecode for every uncached contract at once, under the explorer's rate limit"""
+    hashes = await explorer.code_hashes(RPC_URL, CONTRACTS.values())
+    async with explorer.Client(BASESCAN_API, API_KEY, rate=5) as client:
+        statuses, hits = await explorer.check_all_cached(
+            client, CHAIN_ID, CONTRACTS, hashes, ttl=args.ttl, refresh=args.refresh)
+    return statuses, hits, bool(hashes)
 
 print("🔍 Checking verification status on Base Sepolia...\n")
 print("=" * 60)
 
+statuses, hits, hashed = asyncio.run(check_all())
+if hits:
+    print(f"\n💾 {hits}/{len(CONTRACTS)} status(es) from cache")
+if not hashed:
+    print("⚠️  Could not fetch bytecode from the RPC; cache keyed by address only")
 for name, address in CONTRACTS.items():
-    is_verified, source = check_verification_status(address)
+    is_verified, row = statuses[name]
+    source = row.get("SourceCode", "")[:100] or None
     
     if is_verified is None:
         status = "❓ Error checking"
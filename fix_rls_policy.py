@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 """
 Fix points_transactions by removing row-level security policy before changing column type
+
+Pass --online to convert with a shadow column + batched backfill instead of
+rewriting each table under an ACCESS EXCLUSIVE lock.
 """
 
 import os
+import sys
 import psycopg2
 from dotenv import load_dotenv
 
+from ops import online_alter
+
 load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL')
+ONLINE = '--online' in sys.argv
 
 try:
     conn = psycopg2.connect(DATABASE_URL)
@@ -16,10 +23,12 @@ try:
     
     print("\n🔧 Fixing points_transactions table with RLS policies...\n")
     
-    # Step 1: Disable RLS temporarily
-    print("Step 1: Disabling Row-Level Security temporarily...")
-    cursor.execute("ALTER TABLE points_transactions DISABLE ROW LEVEL SECURITY;")
-    print("   ✅ RLS disabled")
+    # Step 1: Disable RLS temporarily. Online mode commits between steps, so
+    # it leaves RLS on rather than expose the table for the whole backfill
+    if not ONLINE:
+        print("Step 1: Disabling Row-Level Security temporarily...")
+        cursor.execute("ALTER TABLE points_transactions DISABLE ROW LEVEL SECURITY;")
+        print("   ✅ RLS disabled")
     
     # Step 2: Drop policies
     print("\nStep 2: Dropping RLS policies...")
@@ -37,23 +46,25 @@ try:
     
     # Step 3: Change column types
     print("\nStep 3: Changing column types from UUID to VARCHAR...")
-    cursor.execute("""
-        ALTER TABLE points_transactions
-        ALTER COLUMN user_id TYPE VARCHAR(255);
-    """)
-    print("   ✅ user_id changed to VARCHAR(255)")
+    conversions = [
+        ('points_transactions', 'user_id'),
+        ('points_transactions', 'admin_id'),
+        ('transactions', 'user_id'),
+    ]
     
-    cursor.execute("""
-        ALTER TABLE points_transactions
-        ALTER COLUMN admin_id TYPE VARCHAR(255);
-    """)
-    print("   ✅ admin_id changed to VARCHAR(255)")
+    if ONLINE:
+        # Policy drops must be committed before the shadow column work starts
+        conn.commit()
     
-    cursor.execute("""
-        ALTER TABLE transactions
-        ALTER COLUMN user_id TYPE VARCHAR(255);
-    """)
-    print("   ✅ transactions.user_id changed to VARCHAR(255)")
+    for table, column in conversions:
+        if ONLINE:
+            online_alter.change_column_type(conn, table, column, 'character varying(255)')
+        else:
+            cursor.execute(f"""
+                ALTER TABLE {table}
+                ALTER COLUMN {column} TYPE VARCHAR(255);
+            """)
+        print(f"   ✅ {table}.{column} changed to VARCHAR(255)")
     
     # Step 4: Re-enable RLS
     print("\nStep 4: Re-enabling Row-Level Security...")
@@ -2,18 +2,25 @@
 """
 Python migration script to fix userPointsLedgers userId column constraint.
 The column was created with UUID constraint but needs to accept varchar (Privy IDs).
+
+Pass --online to convert with a shadow column + batched backfill instead of
+rewriting the table under an ACCESS EXCLUSIVE lock.
 """
 
 import os
+import sys
 import psycopg2
 from psycopg2 import sql
 from dotenv import load_dotenv
 
+from ops import catalog, online_alter
+
 # Load environment variables
 load_dotenv()
 
 # Database connection
 DATABASE_URL = os.getenv('DATABASE_URL')
+ONLINE = '--online' in sys.argv
 if not DATABASE_URL:
     print("❌ DATABASE_URL not set in .env")
     exit(1)
@@ -26,28 +33,14 @@ try:
     
     # Step 1: Check current column definition
     print("📋 Step 1: Checking current userPointsLedgers schema...")
-    cursor.execute("""
-        SELECT column_name, data_type, is_nullable
-        FROM information_schema.columns
-        WHERE table_name = 'user_points_ledgers'
-        ORDER BY ordinal_position;
-    """)
-    
-    columns = cursor.fetchall()
-    for col in columns:
-        print(f"   - {col[0]:25} {col[1]:20} nullable={col[2]}")
+    cat = catalog.snapshot(conn)
+    for col in cat.columns('user_points_ledgers'):
+        print(f"   - {col.name:25} {col.type:20} nullable={'NO' if col.not_null else 'YES'}")
     
     # Step 2: Check if userId column has UUID type
     print("\n📋 Step 2: Checking userId column type...")
-    cursor.execute("""
-        SELECT data_type
-        FROM information_schema.columns
-        WHERE table_name = 'user_points_ledgers' AND column_name = 'user_id';
-    """)
-    
-    result = cursor.fetchone()
-    if result:
-        current_type = result[0]
+    current_type = cat.column_type('user_points_ledgers', 'user_id')
+    if current_type:
         print(f"   Current type: {current_type}")
         
         if 'uuid' in current_type.lower():
@@ -55,24 +48,22 @@ try:
             
             # Step 3: Drop constraints that depend on this column
             print("\n🔧 Step 3: Removing constraints...")
-            cursor.execute("""
-                SELECT constraint_name 
-                FROM information_schema.table_constraints 
-                WHERE table_name = 'user_points_ledgers' AND constraint_type = 'FOREIGN KEY';
-            """)
-            fk_constraints = cursor.fetchall()
-            
-            for fk in fk_constraints:
-                constraint_name = fk[0]
+            for fk in cat.constraints('user_points_ledgers', type='FOREIGN KEY'):
+                constraint_name = fk.name
                 print(f"   Dropping FK constraint: {constraint_name}")
                 cursor.execute(f"ALTER TABLE user_points_ledgers DROP CONSTRAINT {constraint_name};")
             
             # Step 4: Change column type
             print("\n🔧 Step 4: Converting userId column from UUID to TEXT...")
-            cursor.execute("""
-                ALTER TABLE user_points_ledgers 
-                ALTER COLUMN user_id TYPE TEXT;
-            """)
+            if ONLINE:
+                # FK drops must be committed before the shadow column work starts
+                conn.commit()
+                online_alter.change_column_type(conn, 'user_points_ledgers', 'user_id', 'text')
+            else:
+                cursor.execute("""
+                    ALTER TABLE user_points_ledgers 
+                    ALTER COLUMN user_id TYPE TEXT;
+                """)
             print("   ✅ Column type converted to TEXT")
             
             # Step 5: Recreate foreign key if needed
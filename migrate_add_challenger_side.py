@@ -3,44 +3,24 @@
 Database migration script to add challenger_side field to challenges table
 for P2P challenge YES/NO side selection
 """
-import os
-import psycopg2
 from psycopg2.extras import RealDictCursor
 import sys
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from ops import catalog, db
 
 def get_db_connection():
-    """Get database connection from environment"""
-    db_url = os.getenv('DATABASE_URL')
-    if not db_url:
-        print("❌ DATABASE_URL not found in environment")
-        sys.exit(1)
-
-    try:
-        conn = psycopg2.connect(db_url)
-        print("✅ Connected to database")
-        return conn
-    except Exception as e:
-        print(f"❌ Failed to connect to database: {e}")
-        sys.exit(1)
+    """Get a pooled database connection (close() returns it to the pool)"""
+    return db.connect()
 
 def add_challenger_side_column():
     """Add challenger_side column to challenges table"""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
 
     try:
         # Check if column already exists
-        cursor.execute("""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name = 'challenges' AND column_name = 'challenger_side'
-        """)
-
-        if cursor.fetchone():
+        cat = catalog.snapshot(conn)
+        if cat.has_column('challenges', 'challenger_side'):
             print("⚠️  challenger_side column already exists")
             return
 
@@ -61,17 +41,10 @@ def add_challenger_side_column():
         print("✅ Successfully added challenger_side column")
 
         # Show current table structure
-        cursor.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns
-            WHERE table_name = 'challenges'
-            ORDER BY ordinal_position
-        """)
-
-        columns = cursor.fetchall()
+        cat = catalog.snapshot(conn, refresh=True)
         print("\n📋 Current challenges table structure:")
-        for col in columns:
-            print(f"  - {col['column_name']}: {col['data_type']} ({'NOT NULL' if col['is_nullable'] == 'NO' else 'NULL'})")
+        for col in cat.columns('challenges'):
+            print(f"  - {col.name}: {col.type} ({'NOT NULL' if col.not_null else 'NULL'})")
 
     except Exception as e:
         print(f"❌ Error during migration: {e}")
@@ -118,5 +91,4 @@ if __name__ == "__main__":
     print("📝 Next steps:")
     print("  1. Update the shared/schema.ts to include challenger_side field")
     print("  2. Update frontend to send side selection in challenge creation")
-    print("  3. Update API to accept and store challenger_side")</content>
-<parameter name="filePath">/workspaces/vbht567/migrate_add_challenger_side.py
\ No newline at end of file
+    print("  3. Update API to accept and store challenger_side")
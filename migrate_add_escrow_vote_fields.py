@@ -10,6 +10,8 @@ from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from ops import catalog, ddl
+
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
@@ -26,12 +28,8 @@ def connect():
         print(f"❌ DB connect failed: {e}")
         sys.exit(1)
 
-def column_exists(cursor, table, column):
-    cursor.execute("""
-        SELECT 1 FROM information_schema.columns
-        WHERE table_name = %s AND column_name = %s
-    """, (table, column))
-    return cursor.fetchone() is not None
+def column_exists(cat, table, column):
+    return cat.has_column(table, column)
 
 def run():
     conn = connect()
@@ -52,39 +50,31 @@ def run():
     ]
 
     try:
+        cat = catalog.snapshot(conn)
         for col, definition in checks:
-            if not column_exists(cur, 'challenges', col):
+            if not column_exists(cat, 'challenges', col):
                 print(f"➕ Adding column: {col}")
                 migrations.append(f"ALTER TABLE challenges ADD COLUMN {col} {definition};")
             else:
                 print(f"✓ Column exists: {col}")
 
         if migrations:
-            print(f"\n🚀 Applying {len(migrations)} migration(s)...\n")
-            for i, sql in enumerate(migrations, 1):
-                try:
-                    print(f"  [{i}/{len(migrations)}] Executing...")
-                    cur.execute(sql)
-                    conn.commit()
-                    print("    ✅ OK")
-                except Exception as e:
-                    print(f"    ❌ Failed: {e}")
-                    conn.rollback()
+            # One multi-clause ALTER: challenges is locked once, not once per column
+            print(f"\n🚀 Applying {len(migrations)} migration(s) as one ALTER TABLE...\n")
+            for result in ddl.execute(conn, migrations):
+                if result.status == 'applied':
+                    print(f"    ✅ OK ({len(result.sources)} column(s), {result.seconds * 1000:.0f}ms)")
+                else:
+                    print(f"    ❌ Failed: {result.error}")
             print("\n✅ Migrations complete")
         else:
             print("\n✅ No migrations needed; schema already contains escrow/vote fields.")
 
         # Optional: show current challenge columns for verification
-        cur.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns
-            WHERE table_name = 'challenges'
-            ORDER BY ordinal_position
-        """)
-        cols = cur.fetchall()
+        cat = catalog.snapshot(conn, refresh=True)
         print("\n📋 challenges table columns:")
-        for c in cols:
-            print(f"  - {c['column_name']}: {c['data_type']} ({'NOT NULL' if c['is_nullable']=='NO' else 'NULL'})")
+        for c in cat.columns('challenges'):
+            print(f"  - {c.name}: {c.type} ({'NOT NULL' if c.not_null else 'NULL'})")
 
     finally:
         cur.close()
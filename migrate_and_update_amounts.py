@@ -1,12 +1,56 @@
 #!/usr/bin/env python3
+"""
+Migrate amount columns to NUMERIC and backfill P2P challenge amounts.
+
+Options:
+  --online            change the column types with a shadow column + batched
+                      backfill instead of rewriting each table under an
+                      ACCESS EXCLUSIVE lock
+  --bulk              compute amounts server-side in batched UPDATEs instead
+                      of one UPDATE + commit per challenge
+  --batch-size N      initial rows per UPDATE in --bulk mode (default 5000);
+                      adapts to keep each batch near 500ms
+  --commit-every N    rows between commits in --bulk mode (default 50000);
+                      an interrupted run resumes after the last commit
+  --plan              print lock levels, table rewrites and estimated
+                      durations for the chosen mode and exit without changes
+"""
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from ops import backfill, db, online_alter, planner, tokens
+
+parser = argparse.ArgumentParser(description="Migrate amount columns and backfill P2P challenge amounts")
+parser.add_argument('--online', action='store_true')
+parser.add_argument('--bulk', action='store_true')
+parser.add_argument('--batch-size', type=int, default=5000)
+parser.add_argument('--commit-every', type=int, default=50000)
+parser.add_argument('--plan', action='store_true')
+args = parser.parse_args()
+
 load_dotenv()
 db_url = os.getenv('DATABASE_URL')
+ONLINE = args.online
+
+
+def bulk_update_amounts(conn, batch_size, commit_every):
+    """Set amount = stake_amount_wei * 2 server-side, walking challenges by id (resumable)"""
+    # Same value for ETH and ERC20: amount is the total pool in the token's smallest unit
+    return backfill.run(
+        conn, 'migrate_and_update_amounts.stake_amount', 'challenges',
+        where="amount = 0 AND stake_amount_wei IS NOT NULL AND admin_created = false",
+        sql="""
+            UPDATE challenges
+            SET amount = stake_amount_wei * 2
+            WHERE id = ANY(%(keys)s) AND amount = 0
+        """,
+        chunk_size=batch_size,
+        commit_every=commit_every,
+    )
 
 if not db_url:
     print("❌ DATABASE_URL not set")
@@ -17,16 +61,38 @@ try:
     conn = psycopg2.connect(db_url)
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
-    print("\n🔄 Step 1: Migrating amount columns to NUMERIC...\n")
+    amount_tables = [
+        'challenges',
+        'admin_challenges',
+        'admin_challenge_participants',
+        'payouts',
+        'payout_records',
+    ]
     
-    migrations = [
-        'ALTER TABLE challenges ALTER COLUMN amount TYPE numeric(38, 18)',
-        'ALTER TABLE admin_challenges ALTER COLUMN amount TYPE numeric(38, 18)',
-        'ALTER TABLE admin_challenge_participants ALTER COLUMN amount TYPE numeric(38, 18)',
-        'ALTER TABLE payouts ALTER COLUMN amount TYPE numeric(38, 18)',
-        'ALTER TABLE payout_records ALTER COLUMN amount TYPE numeric(38, 18)',
+    migrations = [] if ONLINE else [
+        f'ALTER TABLE {table} ALTER COLUMN amount TYPE numeric(38, 18)'
+        for table in amount_tables
     ]
     
+    if args.plan:
+        statements = [('step1', migration) for migration in migrations]
+        if ONLINE:
+            for table in amount_tables:
+                statements.extend(
+                    (f'step1:{table}', sql)
+                    for sql in online_alter.outline(table, 'amount', 'numeric(38,18)')
+                )
+        statements.append(('step2', """
+            UPDATE challenges SET amount = stake_amount_wei * 2
+            WHERE amount = 0 AND stake_amount_wei IS NOT NULL AND admin_created = false
+        """))
+        planner.print_plan(planner.plan_statements(conn, statements))
+        cursor.close()
+        conn.close()
+        sys.exit(0)
+    
+    print("\n🔄 Step 1: Migrating amount columns to NUMERIC...\n")
+    
     for migration in migrations:
         try:
             cursor.execute(migration)
@@ -39,63 +105,65 @@ try:
                 print(f"⚠️  {migration[:60]}...")
             conn.rollback()
     
-    print("\n🔄 Step 2: Updating challenge amounts from stakeAmountWei...\n")
+    if ONLINE:
+        for table in amount_tables:
+            try:
+                online_alter.change_column_type(conn, table, 'amount', 'numeric(38,18)')
+            except (psycopg2.Error, online_alter.OnlineAlterError) as e:
+                print(f"⚠️  {table}.amount: {e}")
+                conn.rollback()
     
-    # Get challenges with amount = 0
-    cursor.execute("""
-        SELECT id, title, stake_amount_wei, payment_token_address, amount
-        FROM challenges
-        WHERE amount = 0 AND stake_amount_wei IS NOT NULL AND admin_created = false
-        ORDER BY id
-    """)
+    print("\n🔄 Step 2: Updating challenge amounts from stakeAmountWei...\n")
     
-    challenges = cursor.fetchall()
-    print(f"📊 Found {len(challenges)} P2P challenges with amount = 0\n")
+    if args.bulk:
+        updated = bulk_update_amounts(conn, args.batch_size, args.commit_every)
+        print(f"\n✅ Updated {updated} challenges")
+    else:
+        # Stream challenges with amount = 0; WITH HOLD keeps the cursor open across the per-row commits
+        challenges = db.scan(conn, """
+            SELECT id, title, stake_amount_wei, payment_token_address, amount
+            FROM challenges
+            WHERE amount = 0 AND stake_amount_wei IS NOT NULL AND admin_created = false
+            ORDER BY id
+        """, withhold=True)
     
-    updated = 0
+        updated = 0
+        found = 0
     
-    for row in challenges:
-        challenge_id = row['id']
-        title = row['title']
-        stake_amount_wei = int(row['stake_amount_wei'])
-        token_address = row['payment_token_address']
-        
-        # Check if ETH (zero address)
-        is_eth = token_address == '0x0000000000000000000000000000000000000000'
+        for row in challenges:
+            found += 1
+            challenge_id = row.id
+            title = row.title
+            stake_amount_wei = int(row.stake_amount_wei)
+            token = tokens.lookup(row.payment_token_address)
         
-        if is_eth:
-            # ETH: amount = stakeAmountWei * 2 (total pool)
-            calculated_amount = stake_amount_wei * 2
-        else:
-            # USDC/USDT: amount = stakeAmountWei * 2
+            # Same for ETH and ERC20: amount = stakeAmountWei * 2 (total pool, smallest unit)
             calculated_amount = stake_amount_wei * 2
         
-        # Convert to decimal for display
-        if is_eth:
-            display_amount = calculated_amount / 1e18
-        else:
-            display_amount = calculated_amount / 1e6
-        
-        print(f"ID {challenge_id}: \"{title}\"")
-        print(f"  stakeAmountWei: {stake_amount_wei}")
-        print(f"  Calculated amount: {calculated_amount}")
-        print(f"  Display: {display_amount}")
+            print(f"ID {challenge_id}: \"{title}\"")
+            print(f"  stakeAmountWei: {stake_amount_wei}")
+            print(f"  Calculated amount: {calculated_amount}")
+            if token:
+                print(f"  Display: {tokens.to_units(calculated_amount, token)} {token.symbol}")
+            else:
+                print(f"  Display: ? (unknown token {row.payment_token_address})")
         
-        # Update in database
-        try:
-            cursor.execute("""
-                UPDATE challenges
-                SET amount = %s
-                WHERE id = %s
-            """, (calculated_amount, challenge_id))
-            conn.commit()
-            print(f"  ✅ Updated\n")
-            updated += 1
-        except psycopg2.Error as e:
-            print(f"  ❌ Error: {e}\n")
-            conn.rollback()
+            # Update in database
+            try:
+                cursor.execute("""
+                    UPDATE challenges
+                    SET amount = %s
+                    WHERE id = %s
+                """, (calculated_amount, challenge_id))
+                conn.commit()
+                print(f"  ✅ Updated\n")
+                updated += 1
+            except psycopg2.Error as e:
+                print(f"  ❌ Error: {e}\n")
+                conn.rollback()
     
-    print(f"\n✅ Updated {updated}/{len(challenges)} challenges")
+        print(f"📊 Found {found} P2P challenges with amount = 0")
+        print(f"\n✅ Updated {updated}/{found} challenges")
     
     # Verify updates
     print("\n📋 Verification - Updated challenges:\n")
@@ -107,19 +175,14 @@ try:
     """)
     
     for row in cursor.fetchall():
-        amount = float(row['amount']) if row['amount'] else 0
-        is_eth = row['payment_token_address'] == '0x0000000000000000000000000000000000000000'
-        
-        if is_eth:
-            display = amount / 1e18
-            currency = 'ETH'
-        else:
-            display = amount / 1e6
-            currency = 'USDC/USDT'
+        token = tokens.lookup(row['payment_token_address'])
         
         print(f"ID {row['id']}: \"{row['title']}\"")
-        print(f"  Amount (wei): {row['amount']}")
-        print(f"  Amount ({currency}): {display:.10f}")
+        print(f"  Amount (smallest unit): {row['amount']}")
+        if token and row['amount'] is not None:
+            print(f"  Amount ({token.symbol}): {tokens.to_units(row['amount'], token)}")
+        else:
+            print(f"  Amount: ? ({tokens.describe(row['payment_token_address'])})")
         print()
     
     cursor.close()
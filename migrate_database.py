@@ -10,15 +10,24 @@ import os
 import sys
 from dotenv import load_dotenv
 
+from ops import ddl, ledger
+
 # Load environment variables
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
+MIGRATION_NAME = 'migrate_database'
 
 if not DATABASE_URL:
     print("❌ ERROR: DATABASE_URL not found in .env file")
     sys.exit(1)
 
+def classify_error(error):
+    """Column might already exist, that's fine"""
+    if "already exists" in str(error) or "already in use" in str(error):
+        return 'skipped'
+    return 'failed'
+
 def run_migration():
     """Run database migrations"""
     try:
@@ -102,19 +111,31 @@ def run_migration():
             },
         ]
         
-        # Run each migration
-        for migration in migrations:
-            try:
-                print(f"\n▶️  {migration['name']}...")
-                cursor.execute(migration['sql'])
-                conn.commit()
-                print(f"   ✅ Success")
-            except Exception as e:
-                # Column might already exist, that's fine
-                if "already exists" in str(e) or "already in use" in str(e):
-                    print(f"   ℹ️  Already exists - skipping")
-                else:
-                    print(f"   ⚠️  Warning: {str(e)[:100]}")
+        # Skip the whole run if this exact set of statements was already applied
+        ledger.ensure_table(conn)
+        checksum = ledger.checksum([m['sql'] for m in migrations])
+        if ledger.applied(conn).get(MIGRATION_NAME) == checksum:
+            print(f"\n⏭️  Already applied (schema_migrations) - nothing to do")
+            cursor.close()
+            conn.close()
+            return True
+        run = ledger.Run(MIGRATION_NAME, checksum, len(migrations))
+        
+        # Run each migration; consecutive ALTERs on the same table go out as one
+        # statement so the table is locked once instead of once per column
+        names = {m['sql']: m['name'] for m in migrations}
+        for result in ddl.execute(conn, [m['sql'] for m in migrations], classify=classify_error):
+            for sql in result.sources:
+                print(f"\n▶️  {names[sql]}...")
+                run.record(sql, result.seconds / len(result.sources), result.status)
+            if result.status == 'applied':
+                print(f"   ✅ Success ({result.seconds * 1000:.0f}ms)")
+            elif result.status == 'skipped':
+                print(f"   ℹ️  Already exists - skipping")
+            else:
+                print(f"   ⚠️  Warning: {str(result.error)[:100]}")
+        
+        run.finish(conn)
         
         # Verify schema
         print(f"\n🔍 Verifying schema...")
@@ -4,60 +4,24 @@ Supabase Database Migration Script
 Adds missing columns to tables for notification and points system
 """
 
-import os
 import sys
-from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from urllib.parse import urlparse
 
-# Load environment variables
-load_dotenv()
+from ops import catalog, db
 
-# Get Supabase connection details from DATABASE_URL
-DATABASE_URL = os.getenv('DATABASE_URL')
-
-if not DATABASE_URL:
-    print("❌ Missing DATABASE_URL in .env file")
-    sys.exit(1)
-
-# Parse the database URL
-try:
-    parsed_url = urlparse(DATABASE_URL)
-    SUPABASE_USER = parsed_url.username
-    SUPABASE_PASSWORD = parsed_url.password
-    SUPABASE_HOST = parsed_url.hostname
-    SUPABASE_PORT = parsed_url.port or 5432
-    SUPABASE_DB = parsed_url.path.lstrip('/')
-    
-    print(f"📌 Connecting to: {SUPABASE_HOST}:{SUPABASE_PORT}/{SUPABASE_DB}")
-except Exception as e:
-    print(f"❌ Failed to parse DATABASE_URL: {e}")
-    sys.exit(1)
-
-# Connection string
 try:
-    conn = psycopg2.connect(
-        host=SUPABASE_HOST,
-        port=SUPABASE_PORT,
-        user=SUPABASE_USER,
-        password=SUPABASE_PASSWORD,
-        database=SUPABASE_DB
-    )
+    conn = db.connect()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
-    print("✅ Connected to Supabase")
+    
+    # One catalog round trip answers every check below
+    cat = catalog.snapshot(conn)
     
     migrations = []
     
     # Migration 1: Add challenge_id column to points_transactions
     print("\n📋 Checking points_transactions table...")
-    cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'points_transactions' AND column_name = 'challenge_id'
-    """)
-    
-    if not cursor.fetchone():
+    if not cat.has_column('points_transactions', 'challenge_id'):
         print("  ⚠️  challenge_id column missing - adding it...")
         migrations.append("""
             ALTER TABLE points_transactions
@@ -69,13 +33,7 @@ try:
     
     # Migration 2: Add indexes for performance
     print("\n📋 Checking indexes on points_transactions...")
-    cursor.execute("""
-        SELECT indexname 
-        FROM pg_indexes 
-        WHERE tablename = 'points_transactions' AND indexname = 'idx_points_challenge_id'
-    """)
-    
-    if not cursor.fetchone():
+    if not cat.has_index('idx_points_challenge_id', 'points_transactions'):
         print("  ⚠️  Challenge ID index missing - adding it...")
         migrations.append("""
             CREATE INDEX idx_points_challenge_id ON points_transactions(challenge_id);
@@ -86,13 +44,7 @@ try:
     
     # Migration 3: Check challenges table has result column
     print("\n📋 Checking challenges table...")
-    cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'challenges' AND column_name = 'result'
-    """)
-    
-    if not cursor.fetchone():
+    if not cat.has_column('challenges', 'result'):
         print("  ⚠️  result column missing - adding it...")
         migrations.append("""
             ALTER TABLE challenges
@@ -104,13 +56,7 @@ try:
     
     # Migration 4: Check resolutionTimestamp column
     print("\n📋 Checking resolutionTimestamp in challenges...")
-    cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'challenges' AND column_name = 'resolution_timestamp'
-    """)
-    
-    if not cursor.fetchone():
+    if not cat.has_column('challenges', 'resolution_timestamp'):
         print("  ⚠️  resolution_timestamp column missing - adding it...")
         migrations.append("""
             ALTER TABLE challenges
@@ -122,13 +68,7 @@ try:
     
     # Migration 5: Check resolutionTxHash column
     print("\n📋 Checking resolutionTxHash in challenges...")
-    cursor.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'challenges' AND column_name = 'resolution_tx_hash'
-    """)
-    
-    if not cursor.fetchone():
+    if not cat.has_column('challenges', 'resolution_tx_hash'):
         print("  ⚠️  resolution_tx_hash column missing - adding it...")
         migrations.append("""
             ALTER TABLE challenges
@@ -152,6 +92,7 @@ try:
                 print(f"  ❌ Migration {i} failed: {e}")
                 conn.rollback()
         
+        catalog.invalidate()
         print("\n✅ All migrations completed!")
     else:
         print("\n✅ Database is already up to date!")
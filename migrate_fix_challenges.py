@@ -2,113 +2,83 @@
 """
 Migration script to fix challenge data inconsistencies:
 1. Fix admin_created flag for open P2P challenges (should be false)
-2. Populate null payment_token_address values with USDC Base address
+2. Populate null/empty payment_token_address values with USDC Base address
 """
 
-import os
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from ops import backfill, db, quality, tokens
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-USDC_BASE_ADDRESS = "0x833589fCD6eDb6E08f4c7C32D4f71b3566dA8860"
+USDC_BASE_ADDRESS = tokens.address_of("USDC", tokens.BASE)
 
 def connect_db():
-    """Connect to PostgreSQL database."""
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        print("✓ Connected to database")
-        return conn
-    except Exception as e:
-        print(f"✗ Failed to connect to database: {e}")
-        exit(1)
+    """Check a connection out of the shared ops pool."""
+    return db.connect()
+
+CHECKED_RULES = [quality.RULES['challenges.open_admin_flag'], quality.RULES['challenges.null_payment_token']]
 
 def get_before_stats(conn):
-    """Get stats before migration."""
+    """Get stats before migration (one scan of challenges for both checks)."""
+    result = quality.scan(conn, 'challenges', CHECKED_RULES, sample=5)
+    bad_admin, null_token = result.violations
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # Count open challenges with admin_created=true
-        cur.execute("""
-            SELECT COUNT(*) as count FROM challenges 
-            WHERE status = 'open' AND admin_created = true AND challenged IS NOT NULL
-        """)
-        bad_admin_flags = cur.fetchone()['count']
-        
-        # Count challenges with null payment_token_address
-        cur.execute("""
-            SELECT COUNT(*) as count FROM challenges 
-            WHERE payment_token_address IS NULL
-        """)
-        null_tokens = cur.fetchone()['count']
-        
-        # Sample of bad data
+        # Sample of bad data, by primary key
         cur.execute("""
             SELECT id, status, admin_created, payment_token_address, challenger, challenged 
             FROM challenges 
-            WHERE status = 'open' AND admin_created = true AND challenged IS NOT NULL
-            LIMIT 5
-        """)
+            WHERE id = ANY(%s)
+        """, (bad_admin.sample,))
         bad_samples = cur.fetchall()
         
         cur.execute("""
             SELECT id, status, admin_created, payment_token_address 
             FROM challenges 
-            WHERE payment_token_address IS NULL
-            LIMIT 5
-        """)
+            WHERE id = ANY(%s)
+        """, (null_token.sample,))
         null_samples = cur.fetchall()
         
         return {
-            'bad_admin_flags': bad_admin_flags,
-            'null_tokens': null_tokens,
+            'bad_admin_flags': bad_admin.count,
+            'null_tokens': null_token.count,
             'bad_samples': bad_samples,
             'null_samples': null_samples
         }
 
 def migrate(conn):
-    """Run migration to fix data."""
-    with conn.cursor() as cur:
-        # Fix 1: Set admin_created=false for open P2P challenges (have both challenger and challenged)
-        print("\n📝 Fixing admin_created flag for open P2P challenges...")
-        cur.execute("""
-            UPDATE challenges 
+    """Run migration to fix data in resumable keyset-paginated chunks."""
+    # Fix 1: Set admin_created=false for open P2P challenges (have both challenger and challenged)
+    print("\n📝 Fixing admin_created flag for open P2P challenges...")
+    affected_rows = backfill.run(
+        conn, 'migrate_fix_challenges.admin_flag', 'challenges',
+        where=quality.RULES['challenges.open_admin_flag'].predicate,
+        sql="""
+            UPDATE challenges
             SET admin_created = false
-            WHERE status = 'open' AND admin_created = true AND challenged IS NOT NULL
-        """)
-        affected_rows = cur.rowcount
-        print(f"   ✓ Updated {affected_rows} challenges with corrected admin_created flag")
-        
-        # Fix 2: Populate null payment_token_address with USDC Base
-        print("\n📝 Populating null payment_token_address values...")
-        cur.execute(f"""
-            UPDATE challenges 
-            SET payment_token_address = '{USDC_BASE_ADDRESS}'
-            WHERE payment_token_address IS NULL
-        """)
-        affected_rows = cur.rowcount
-        print(f"   ✓ Updated {affected_rows} challenges with USDC Base address")
-        
-        conn.commit()
+            WHERE id = ANY(%(keys)s) AND status = 'open' AND admin_created = true
+        """,
+    )
+    print(f"   ✓ Updated {affected_rows} challenges with corrected admin_created flag")
+    
+    # Fix 2: Populate null payment_token_address with USDC Base
+    print("\n📝 Populating null payment_token_address values...")
+    affected_rows = backfill.run(
+        conn, 'migrate_fix_challenges.payment_token', 'challenges',
+        where=quality.RULES['challenges.null_payment_token'].predicate,
+        sql="""
+            UPDATE challenges
+            SET payment_token_address = %(token)s
+            WHERE id = ANY(%(keys)s) AND (payment_token_address IS NULL OR payment_token_address = '')
+        """,
+        params={'token': USDC_BASE_ADDRESS},
+    )
+    print(f"   ✓ Updated {affected_rows} challenges with USDC Base address")
 
 def get_after_stats(conn):
     """Get stats after migration."""
+    # Count remaining issues
+    remaining_bad, remaining_null = quality.scan(conn, 'challenges', CHECKED_RULES, sample=0).violations
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # Count remaining issues
-        cur.execute("""
-            SELECT COUNT(*) as count FROM challenges 
-            WHERE status = 'open' AND admin_created = true AND challenged IS NOT NULL
-        """)
-        remaining_bad = cur.fetchone()['count']
-        
-        cur.execute("""
-            SELECT COUNT(*) as count FROM challenges 
-            WHERE payment_token_address IS NULL
-        """)
-        remaining_null = cur.fetchone()['count']
-        
         # Overall challenge stats
         cur.execute("""
             SELECT 
@@ -122,8 +92,8 @@ def get_after_stats(conn):
         stats = cur.fetchone()
         
         return {
-            'remaining_bad': remaining_bad,
-            'remaining_null': remaining_null,
+            'remaining_bad': remaining_bad.count,
+            'remaining_null': remaining_null.count,
             'stats': stats
         }
 
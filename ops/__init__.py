@@ -0,0 +1,10 @@
+"""
+Shared helpers for the Python ops scripts (migrations, data fixes, diagnostics).
+
+Scripts at the repo root import these directly; scripts in subdirectories add
+the repo root to sys.path first. Run several scripts in one interpreter with
+
+    python -m ops run migrate_db.py migrate_add_challenger_side.py ...
+
+so they share one pooled database connection.
+"""
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Run several ops scripts in one interpreter so they share the connection pool.
+
+Usage:
+    python -m ops run migrate_db.py migrate_add_challenger_side.py ...
+    python -m ops ledger        # applied migrations from schema_migrations, slowest first
+    python -m ops audit [--jobs N] [--table T] [--rule R] [--json PATH] [--fix RULE]
+                                # data-quality rules, one scan per table
+    python -m ops restore PATH.manifest.json [--table T]
+                                # stream a backup (ops/backup.py) back in
+"""
+
+import argparse
+import json
+import runpy
+import sys
+import time
+
+from ops import backup, catalog, db, ledger, quality
+
+
+def run_scripts(paths):
+    """Execute each script as __main__, stopping at the first failure"""
+    for path in paths:
+        print(f"\n▶️  {path}")
+        started = time.monotonic()
+        saved_argv = sys.argv
+        sys.argv = [path]
+        # Earlier scripts may have run DDL behind the cached snapshot
+        catalog.invalidate()
+        try:
+            runpy.run_path(path, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"❌ {path} exited with status {e.code}")
+                return e.code if isinstance(e.code, int) else 1
+        finally:
+            sys.argv = saved_argv
+        print(f"✅ {path} finished in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+def show_ledger():
+    conn = db.connect()
+    try:
+        if not catalog.snapshot(conn).has_table(ledger.TABLE):
+            print(f"⚠️  {ledger.TABLE} does not exist yet")
+        else:
+            ledger.print_history(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+def audit(argv):
+    """Exit status 1 if any rule has violations or any table failed to scan"""
+    parser = argparse.ArgumentParser(prog="python -m ops audit")
+    parser.add_argument("--jobs", type=int, default=4, help="tables scanned in parallel (default 4)")
+    parser.add_argument("--table", action="append", dest="tables", help="only this table (repeatable)")
+    parser.add_argument("--rule", action="append", dest="rules", help="only this rule (repeatable)")
+    parser.add_argument("--sample", type=int, default=quality.DEFAULT_SAMPLE,
+                        help=f"offending keys to list per rule (default {quality.DEFAULT_SAMPLE})")
+    parser.add_argument("--json", help="write the report to this file ('-' for stdout)")
+    parser.add_argument("--fix", action="append", default=[], help="run this rule's fix afterwards (repeatable)")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in (args.rules or []) + args.fix if name not in quality.RULES]
+    if unknown:
+        print(f"❌ Unknown rule(s): {', '.join(unknown)}")
+        return 2
+
+    report = quality.audit(args.tables, args.rules, jobs=args.jobs, sample=args.sample)
+    if args.json == "-":
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        quality.print_report(report)
+        if args.json:
+            quality.write_report(report, args.json)
+            print(f"\n💾 Report written to {args.json}")
+
+    if args.fix:
+        conn = db.connect()
+        try:
+            for name, changed in quality.fix(conn, args.fix).items():
+                print(f"   ✓ {name}: {changed} row(s) fixed")
+        finally:
+            conn.close()
+    return 1 if report["violations"] or report["errors"] else 0
+
+
+def restore(argv):
+    parser = argparse.ArgumentParser(prog="python -m ops restore")
+    parser.add_argument("manifest", help="the backup's .manifest.json")
+    parser.add_argument("--table", help="restore into this table instead of the original one")
+    args = parser.parse_args(argv)
+
+    manifest = backup.load_manifest(args.manifest)
+    print(f"♻️  Restoring {manifest.rows:,} row(s) into {args.table or manifest.table} from {manifest.data_path}")
+    conn = db.connect()
+    try:
+        started = time.monotonic()
+        rows = backup.restore(conn, args.manifest, table=args.table)
+        print(f"✅ {rows:,} row(s) restored in {time.monotonic() - started:.1f}s")
+        return 0
+    except backup.BackupError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ("ledger", "audit", "restore") and (len(sys.argv) < 3 or command != "run"):
+        print(__doc__.strip())
+        sys.exit(2)
+    try:
+        if command == "ledger":
+            status = show_ledger()
+        elif command == "audit":
+            status = audit(sys.argv[2:])
+        elif command == "restore":
+            status = restore(sys.argv[2:])
+        else:
+            status = run_scripts(sys.argv[2:])
+    finally:
+        db.close_pool()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
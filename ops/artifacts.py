@@ -0,0 +1,128 @@
+"""
+Explorer verification payloads built from Hardhat compilation artifacts.
+
+    from ops import artifacts
+
+    compiled = artifacts.index("contracts/artifacts")
+    artifact = artifacts.find(compiled, "ChallengeFactory")
+    params = artifacts.payload(artifact)     # codeformat, sourceCode, contractname, compilerversion
+
+The payload is a solidity-standard-json-input: the exact compiler input from
+build-info/, cut down to the sources the contract's metadata lists, so
+imports (OpenZeppelin and so on) verify without flattening. The compiler
+version and settings come from the same build, not from hand-kept constants.
+
+Payloads are cached (ops/cache.py) under the SHA-256 of the artifact's
+deployed bytecode. The bytecode ends in the metadata hash, which covers every
+source and setting, so the key changes whenever the payload would. Verifying
+the same contracts on several chains reads each multi-megabyte build-info
+file once at most, and not at all once the cache is warm.
+"""
+
+import json
+from collections import namedtuple
+from pathlib import Path
+
+from ops import cache
+
+CACHE_NAMESPACE = "verify-payload"
+STANDARD_JSON = "solidity-standard-json-input"
+
+Artifact = namedtuple("Artifact", "name source_name path build_info bytecode_hash")
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def _load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _artifact(path):
+    """Artifact for a Hardhat artifact file, or None for interfaces and abstract contracts"""
+    data = _load(path)
+    code = data["deployedBytecode"].lower().removeprefix("0x")
+    if not code:
+        return None
+    dbg = _load(path.with_name(f"{path.stem}.dbg.json"))
+    return Artifact(
+        data["contractName"], data["sourceName"], path,
+        (path.parent / dbg["buildInfo"]).resolve(),
+        cache.sha256_bytes(code.encode()),
+    )
+
+
+def index(artifacts_dir):
+    """{contract name: [Artifact]} for every compiled contract with deployable code"""
+    found = {}
+    for path in sorted(Path(artifacts_dir).glob("**/*.json")):
+        if path.name.endswith(".dbg.json") or "build-info" in path.parts:
+            continue
+        if not path.with_name(f"{path.stem}.dbg.json").exists():
+            continue
+        artifact = _artifact(path)
+        if artifact is None:
+            continue
+        found.setdefault(artifact.name, []).append(artifact)
+    return found
+
+
+def find(compiled, name):
+    """Artifact for "Name" or "path/To.sol:Name" in an index(); ArtifactError if missing or ambiguous"""
+    source_name, _, contract = name.rpartition(":")
+    candidates = compiled.get(contract, [])
+    if source_name:
+        candidates = [a for a in candidates if a.source_name == source_name]
+    if not candidates:
+        raise ArtifactError(f"no artifact for {name}")
+    if len(candidates) > 1:
+        sources = ", ".join(a.source_name for a in candidates)
+        raise ArtifactError(f"{name} is ambiguous ({sources}); use source:{contract}")
+    return candidates[0]
+
+
+def standard_json_input(build_info, source_name, contract_name):
+    """The build's compiler input, limited to the sources `contract_name` was compiled from"""
+    try:
+        compiled = build_info["output"]["contracts"][source_name][contract_name]
+    except KeyError:
+        raise ArtifactError(f"{source_name}:{contract_name} is not in build {build_info.get('id')}")
+    used = json.loads(compiled["metadata"])["sources"]
+    compiler_input = build_info["input"]
+    return {
+        "language": compiler_input["language"],
+        "sources": {path: compiler_input["sources"][path] for path in sorted(used)},
+        "settings": compiler_input["settings"],
+    }
+
+
+def build_payload(artifact, build_info=None):
+    """Explorer verifysourcecode parameters (all but address and license), uncached"""
+    if build_info is None:
+        build_info = _load(artifact.build_info)
+    return {
+        "codeformat": STANDARD_JSON,
+        "sourceCode": json.dumps(standard_json_input(build_info, artifact.source_name, artifact.name)),
+        "contractname": f"{artifact.source_name}:{artifact.name}",
+        "compilerversion": f"v{build_info['solcLongVersion']}",
+    }
+
+
+def payload(artifact, build_infos=None):
+    """build_payload() through the cache
+
+    Pass the same dict as `build_infos` across calls to parse each build-info
+    file once when several contracts miss the cache.
+    """
+    cached = cache.get(CACHE_NAMESPACE, artifact.bytecode_hash)
+    if cached is not None:
+        return cached
+    if build_infos is None:
+        build_infos = {}
+    if artifact.build_info not in build_infos:
+        build_infos[artifact.build_info] = _load(artifact.build_info)
+    params = build_payload(artifact, build_infos[artifact.build_info])
+    cache.put(CACHE_NAMESPACE, artifact.bytecode_hash, params)
+    return params
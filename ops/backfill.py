@@ -0,0 +1,211 @@
+"""
+Resumable keyset-paginated backfills.
+
+run() walks a table by primary key in chunks, applies a SQL statement or a
+Python transform to each chunk and records a checkpoint in
+ops_backfill_checkpoints in the same transaction, so a rerun after a timeout
+or deploy kill continues after the last committed chunk:
+
+    from ops import backfill, db
+
+    conn = db.connect()
+    backfill.run(
+        conn, 'fix_admin_flag', 'challenges',
+        sql='''
+            UPDATE challenges SET admin_created = false
+            WHERE id BETWEEN %(lo)s AND %(hi)s
+              AND status = 'open' AND admin_created = true AND challenged IS NOT NULL
+        ''',
+    )
+
+SQL statements get %(lo)s/%(hi)s (first and last key of the chunk) and
+%(keys)s (the chunk's keys as an array) plus any `params`. A Python
+`transform(cursor, rows)` gets the chunk's rows (the `columns` selected) and
+returns the number of rows it changed.
+
+Only interrupted runs resume; once a job finishes, the next run starts from
+the beginning (or is skipped with skip_finished=True).
+
+Chunk size adapts towards `target_ms` per chunk and halves on statement
+timeouts.
+"""
+
+import time
+
+from psycopg2 import errors
+
+from ops.progress import Progress, estimate_rows
+
+CHECKPOINT_TABLE = "ops_backfill_checkpoints"
+
+
+def ensure_checkpoint_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                name TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                last_key TEXT,
+                rows_done BIGINT NOT NULL DEFAULT 0,
+                rows_changed BIGINT NOT NULL DEFAULT 0,
+                chunk_size INTEGER,
+                started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                finished_at TIMESTAMP
+            )
+        """)
+    conn.commit()
+
+
+def get_checkpoint(conn, name):
+    """Checkpoint row as a dict, or None if the job never ran"""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT last_key, rows_done, rows_changed, chunk_size, finished_at
+            FROM {CHECKPOINT_TABLE} WHERE name = %s
+            """,
+            (name,),
+        )
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(("last_key", "rows_done", "rows_changed", "chunk_size", "finished_at"), row))
+
+
+def reset(conn, name):
+    """Forget a job's checkpoint so the next run starts from the beginning"""
+    ensure_checkpoint_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE name = %s", (name,))
+    conn.commit()
+
+
+def _save_checkpoint(cur, name, table, last_key, rows, changed, chunk_size, finished=False):
+    cur.execute(
+        f"""
+        INSERT INTO {CHECKPOINT_TABLE} (name, table_name, last_key, rows_done, rows_changed, chunk_size)
+        VALUES (%(name)s, %(table)s, %(last_key)s, %(rows)s, %(changed)s, %(chunk)s)
+        ON CONFLICT (name) DO UPDATE SET
+            last_key = coalesce(EXCLUDED.last_key, {CHECKPOINT_TABLE}.last_key),
+            rows_done = {CHECKPOINT_TABLE}.rows_done + EXCLUDED.rows_done,
+            rows_changed = {CHECKPOINT_TABLE}.rows_changed + EXCLUDED.rows_changed,
+            chunk_size = EXCLUDED.chunk_size,
+            updated_at = NOW(),
+            finished_at = CASE WHEN %(finished)s THEN NOW() END
+        """,
+        {
+            "name": name,
+            "table": table,
+            "last_key": None if last_key is None else str(last_key),
+            "rows": rows,
+            "changed": changed,
+            "chunk": chunk_size,
+            "finished": finished,
+        },
+    )
+
+
+def _next_chunk_size(chunk_size, elapsed_ms, target_ms, min_chunk, max_chunk):
+    """Scale towards target_ms, at most doubling or halving per step"""
+    if elapsed_ms <= 0:
+        factor = 2.0
+    else:
+        factor = min(max(target_ms / elapsed_ms, 0.5), 2.0)
+    return int(min(max(chunk_size * factor, min_chunk), max_chunk))
+
+
+def run(conn, name, table, sql=None, transform=None, pk="id", where=None, columns=None,
+        params=None, chunk_size=1000, target_ms=500, min_chunk=50, max_chunk=50000,
+        commit_every=None, sleep=0, restart=False, skip_finished=False):
+    """Run (or resume) backfill `name` over `table`; returns rows changed in this run"""
+    if (sql is None) == (transform is None):
+        raise ValueError("pass exactly one of sql= or transform=")
+
+    ensure_checkpoint_table(conn)
+    if restart:
+        reset(conn, name)
+
+    checkpoint = get_checkpoint(conn, name)
+    if checkpoint and checkpoint["finished_at"]:
+        if skip_finished:
+            print(f"   ✓ Backfill {name} already finished at {checkpoint['finished_at']}")
+            return 0
+        # A completed job is a fresh run next time; only interrupted runs resume
+        reset(conn, name)
+        checkpoint = None
+
+    last_key = checkpoint["last_key"] if checkpoint else None
+    if checkpoint:
+        chunk_size = checkpoint["chunk_size"] or chunk_size
+        print(f"   ↪️  Resuming {name} after {pk} = {last_key} ({checkpoint['rows_done']:,} rows done)")
+
+    select_cols = ", ".join([pk] + [c for c in (columns or []) if c != pk])
+    filters = f"AND ({where})" if where else ""
+    extra = dict(params or {})
+
+    progress = Progress(name, total=estimate_rows(conn, table))
+    if checkpoint:
+        progress.done = checkpoint["rows_done"]
+    changed_total = 0
+    committed_key = last_key
+    pending_rows = pending_changed = 0
+
+    with conn.cursor() as cur:
+        while True:
+            after = "" if last_key is None else f"AND {pk} > %(last_key)s"
+            started = time.monotonic()
+            try:
+                cur.execute(
+                    f"""
+                    SELECT {select_cols} FROM {table}
+                    WHERE true {after} {filters}
+                    ORDER BY {pk}
+                    LIMIT %(limit)s
+                    """,
+                    {**extra, "last_key": last_key, "limit": chunk_size},
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+
+                keys = [r[0] for r in rows]
+                if sql is not None:
+                    cur.execute(sql, {**extra, "lo": keys[0], "hi": keys[-1], "keys": keys})
+                    changed = cur.rowcount
+                else:
+                    changed = transform(cur, rows) or 0
+
+                _save_checkpoint(cur, name, table, keys[-1], len(rows), changed, chunk_size)
+                pending_rows += len(rows)
+                pending_changed += changed
+                if commit_every is None or pending_rows >= commit_every:
+                    conn.commit()
+                    committed_key = keys[-1]
+                    pending_rows = pending_changed = 0
+            except errors.QueryCanceled:
+                # statement_timeout: go back to the last commit and retry with a smaller chunk
+                conn.rollback()
+                last_key = committed_key
+                changed_total -= pending_changed
+                progress.done -= pending_rows
+                pending_rows = pending_changed = 0
+                if chunk_size <= min_chunk:
+                    raise
+                chunk_size = max(chunk_size // 2, min_chunk)
+                print(f"   ⚠️  Chunk timed out, retrying with {chunk_size} rows")
+                continue
+
+            last_key = keys[-1]
+            changed_total += changed
+            elapsed_ms = (time.monotonic() - started) * 1000
+            chunk_size = _next_chunk_size(chunk_size, elapsed_ms, target_ms, min_chunk, max_chunk)
+            progress.update(len(rows))
+            if sleep:
+                time.sleep(sleep)
+
+        _save_checkpoint(cur, name, table, None, 0, 0, chunk_size, finished=True)
+    conn.commit()
+    progress.finish()
+    print(f"   ✅ Backfill {name}: {changed_total:,} rows changed")
+    return changed_total
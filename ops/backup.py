@@ -0,0 +1,218 @@
+"""
+Streaming table backups: COPY out to a compressed file, COPY back in to restore.
+
+    from ops import backup
+
+    manifest = backup.backup(conn, "challenges", where="id = ANY(%(ids)s)",
+                             params={"ids": ids}, label="fix_challenge_data")
+    ...
+    backup.restore(conn, manifest.path)      # upserts the saved rows by primary key
+
+Rows go from `COPY (SELECT ...) TO STDOUT` straight through a zstd (if the
+zstandard package is installed) or gzip compressor into the file, so memory
+use does not depend on how many rows are saved. Next to each data file,
+<name>.manifest.json records the table, columns, filter, row count, and the
+SHA-256 and size of the uncompressed COPY stream. restore() checks all of
+these before it commits.
+
+Files go to $OPS_BACKUP_DIR (default .ops-backups/ in the working directory).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from psycopg2 import sql as pgsql
+
+from ops import catalog
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_VERSION = 1
+SUFFIXES = {"zstd": ".copy.zst", "gzip": ".copy.gz"}
+
+Manifest = namedtuple("Manifest", "path data_path table columns rows bytes sha256 compression")
+
+
+class BackupError(Exception):
+    pass
+
+
+def backup_dir():
+    return Path(os.environ.get("OPS_BACKUP_DIR", ".ops-backups"))
+
+
+def default_compression():
+    return "zstd" if zstandard is not None else "gzip"
+
+
+class _CountingWriter:
+    """Hashes and counts the uncompressed COPY stream on its way to the compressor"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.bytes = 0
+        self.rows = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.digest.update(data)
+        self.bytes += len(data)
+        # Text-format COPY escapes embedded newlines, so one line is one row
+        self.rows += data.count(b"\n")
+        return self.raw.write(data)
+
+
+class _HashingReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.digest.update(data)
+        self.bytes += len(data)
+        return data
+
+
+def _open_write(path, compression):
+    if compression == "zstd":
+        if zstandard is None:
+            raise BackupError("zstd compression needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(open(path, "wb"))
+    return gzip.open(path, "wb", compresslevel=6)
+
+
+def _open_read(path, compression):
+    if compression == "zstd":
+        if zstandard is None:
+            raise BackupError("reading a .zst backup needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return gzip.open(path, "rb")
+
+
+def backup(conn, table, where=None, params=None, columns=None, label=None,
+           directory=None, compression=None, meta=None):
+    """COPY the rows of `table` matching `where` to a compressed file; returns the Manifest"""
+    compression = compression or default_compression()
+    if compression not in SUFFIXES:
+        raise ValueError(f"unknown compression {compression!r}")
+
+    cat = catalog.snapshot(conn)
+    if not cat.has_table(table):
+        raise BackupError(f"table {table} does not exist")
+    columns = list(columns or [c.name for c in cat.columns(table)])
+
+    directory = Path(directory) if directory else backup_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{label or table}_{datetime.now():%Y%m%d_%H%M%S}"
+    data_path = directory / f"{name}{SUFFIXES[compression]}"
+    manifest_path = directory / f"{name}.manifest.json"
+
+    query = pgsql.SQL("SELECT {} FROM {}").format(
+        pgsql.SQL(", ").join(map(pgsql.Identifier, columns)), pgsql.Identifier(table))
+    with conn.cursor() as cur:
+        select = query.as_string(cur)
+        if where:
+            # mogrify binds the filter's parameters; COPY itself cannot take any
+            select += " WHERE " + cur.mogrify(where, params or {}).decode()
+        with _open_write(data_path, compression) as raw:
+            out = _CountingWriter(raw)
+            cur.copy_expert(f"COPY ({select}) TO STDOUT", out)
+    conn.commit()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "table": table,
+        "columns": columns,
+        "where": where,
+        "query": select,
+        "rows": out.rows,
+        "bytes": out.bytes,
+        "sha256": out.digest.hexdigest(),
+        "compression": compression,
+        "data_file": data_path.name,
+        "meta": meta or {},
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return Manifest(manifest_path, data_path, table, columns, out.rows, out.bytes,
+                    manifest["sha256"], compression)
+
+
+def load_manifest(path):
+    path = Path(path)
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise BackupError(f"{path}: unsupported manifest version {manifest.get('version')}")
+    data_path = path.parent / manifest["data_file"]
+    return Manifest(path, data_path, manifest["table"], manifest["columns"], manifest["rows"],
+                    manifest["bytes"], manifest["sha256"], manifest["compression"])
+
+
+def _primary_key(cat, table):
+    for index in cat.indexes(table):
+        if index.primary:
+            return list(index.columns)
+    raise BackupError(f"{table} has no primary key; restore needs one to upsert")
+
+
+def restore(conn, manifest_path, table=None, commit=True):
+    """Stream a backup back into `table` (default: the one it came from); returns rows restored
+
+    Saved rows overwrite the current rows with the same primary key, and
+    missing rows are re-inserted. Rows created after the backup are left
+    alone. Nothing is committed unless the stream matches the manifest.
+    """
+    manifest = load_manifest(manifest_path)
+    table = table or manifest.table
+    cat = catalog.snapshot(conn)
+    key = _primary_key(cat, table)
+    columns = manifest.columns
+
+    staging = f"ops_restore_{os.getpid()}"
+    column_list = pgsql.SQL(", ").join(map(pgsql.Identifier, columns))
+    updates = pgsql.SQL(", ").join(
+        pgsql.SQL("{0} = EXCLUDED.{0}").format(pgsql.Identifier(c)) for c in columns if c not in key)
+
+    with conn.cursor() as cur:
+        cur.execute(pgsql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(
+            pgsql.Identifier(staging), pgsql.Identifier(table)))
+        with _open_read(manifest.data_path, manifest.compression) as raw:
+            source = _HashingReader(raw)
+            cur.copy_expert(
+                pgsql.SQL("COPY {} ({}) FROM STDIN").format(pgsql.Identifier(staging), column_list).as_string(cur),
+                source,
+            )
+        if source.bytes != manifest.bytes or source.digest.hexdigest() != manifest.sha256:
+            conn.rollback()
+            raise BackupError(f"{manifest.data_path} does not match its manifest (corrupt or truncated)")
+
+        conflict = pgsql.SQL("DO UPDATE SET {}").format(updates) if columns != key else pgsql.SQL("DO NOTHING")
+        cur.execute(pgsql.SQL("""
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM {staging}
+            ON CONFLICT ({key}) {conflict}
+        """).format(
+            table=pgsql.Identifier(table),
+            columns=column_list,
+            staging=pgsql.Identifier(staging),
+            key=pgsql.SQL(", ").join(map(pgsql.Identifier, key)),
+            conflict=conflict,
+        ))
+        restored = cur.rowcount
+    if commit:
+        conn.commit()
+    return restored
@@ -0,0 +1,60 @@
+"""
+Small on-disk JSON cache for derived data (parsed SQL, lookups, ...).
+
+Entries live under $OPS_CACHE_DIR (default .ops-cache/ in the working
+directory), one file per key, grouped by namespace:
+
+    from ops import cache
+
+    value = cache.get("sql", checksum)
+    if value is None:
+        value = expensive(...)
+        cache.put("sql", checksum, value)
+
+Keys should be content hashes so stale entries are never read; deleting the
+directory is always safe.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def cache_dir(namespace):
+    return Path(os.environ.get("OPS_CACHE_DIR", ".ops-cache")) / namespace
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get(namespace, key):
+    """Cached value, or None on a miss or unreadable entry"""
+    try:
+        with open(cache_dir(namespace) / f"{key}.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def put(namespace, key, value):
+    """Store `value` atomically; cache write failures are ignored"""
+    directory = cache_dir(namespace)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, directory / f"{key}.json")
+    except OSError:
+        pass
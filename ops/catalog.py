@@ -0,0 +1,219 @@
+"""
+In-memory snapshot of the schema catalog.
+
+Probing information_schema once per column is slow on Supabase (the views
+join across every system schema). The snapshot reads pg_attribute, pg_class,
+pg_index and pg_constraint in a single round trip and answers existence and
+type questions from memory:
+
+    from ops import catalog
+
+    cat = catalog.snapshot(conn)
+    if not cat.has_column('challenges', 'result'):
+        ...
+    cat.column_type('points_transactions', 'amount')   # 'bigint'
+    cat.has_index('idx_points_challenge_id')
+
+The snapshot is cached for the run; call catalog.invalidate() (or
+snapshot(conn, refresh=True)) after DDL that the script needs to see.
+"""
+
+from collections import namedtuple
+
+Column = namedtuple("Column", "table name type not_null default position")
+Index = namedtuple("Index", "table name columns unique primary definition")
+Constraint = namedtuple("Constraint", "table name type columns definition")
+
+CONSTRAINT_TYPES = {
+    "p": "PRIMARY KEY",
+    "u": "UNIQUE",
+    "f": "FOREIGN KEY",
+    "c": "CHECK",
+    "x": "EXCLUDE",
+    "t": "TRIGGER",
+}
+
+SNAPSHOT_SQL = """
+    WITH rels AS (
+        SELECT c.oid, c.relname, n.nspname, c.relkind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = ANY(%(schemas)s)
+          AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+    )
+    SELECT json_build_object(
+        'tables', (
+            SELECT coalesce(json_agg(json_build_object(
+                'schema', r.nspname, 'table', r.relname, 'kind', r.relkind
+            )), '[]'::json)
+            FROM rels r
+        ),
+        'columns', (
+            SELECT coalesce(json_agg(json_build_object(
+                'schema', r.nspname,
+                'table', r.relname,
+                'name', a.attname,
+                'type', format_type(a.atttypid, a.atttypmod),
+                'not_null', a.attnotnull,
+                'default', pg_get_expr(d.adbin, d.adrelid),
+                'position', a.attnum
+            ) ORDER BY r.relname, a.attnum), '[]'::json)
+            FROM rels r
+            JOIN pg_attribute a ON a.attrelid = r.oid
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attnum > 0 AND NOT a.attisdropped
+        ),
+        'indexes', (
+            SELECT coalesce(json_agg(json_build_object(
+                'schema', r.nspname,
+                'table', r.relname,
+                'name', ic.relname,
+                'columns', (
+                    SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]'::json)
+                    FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+                    JOIN pg_attribute a ON a.attrelid = r.oid AND a.attnum = k.attnum
+                ),
+                'unique', i.indisunique,
+                'primary', i.indisprimary,
+                'definition', pg_get_indexdef(i.indexrelid)
+            )), '[]'::json)
+            FROM rels r
+            JOIN pg_index i ON i.indrelid = r.oid
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+        ),
+        'constraints', (
+            SELECT coalesce(json_agg(json_build_object(
+                'schema', r.nspname,
+                'table', r.relname,
+                'name', con.conname,
+                'type', con.contype,
+                'columns', (
+                    SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]'::json)
+                    FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                    JOIN pg_attribute a ON a.attrelid = r.oid AND a.attnum = k.attnum
+                ),
+                'definition', pg_get_constraintdef(con.oid)
+            )), '[]'::json)
+            FROM rels r
+            JOIN pg_constraint con ON con.conrelid = r.oid
+        )
+    )
+"""
+
+
+class CatalogSnapshot:
+    """Tables, columns, indexes and constraints of the given schemas"""
+
+    def __init__(self, data, schemas=("public",)):
+        self.schemas = tuple(schemas)
+        self._tables = {}
+        self._columns = {}
+        self._indexes = {}
+        self._constraints = {}
+
+        for t in data["tables"]:
+            key = (t["schema"], t["table"])
+            self._tables[key] = t["kind"]
+            self._columns[key] = {}
+            self._indexes[key] = {}
+            self._constraints[key] = {}
+
+        for c in data["columns"]:
+            key = (c["schema"], c["table"])
+            self._columns[key][c["name"]] = Column(
+                c["table"], c["name"], c["type"], c["not_null"], c["default"], c["position"]
+            )
+
+        for i in data["indexes"]:
+            key = (i["schema"], i["table"])
+            self._indexes[key][i["name"]] = Index(
+                i["table"], i["name"], tuple(i["columns"]), i["unique"], i["primary"], i["definition"]
+            )
+
+        for c in data["constraints"]:
+            key = (c["schema"], c["table"])
+            self._constraints[key][c["name"]] = Constraint(
+                c["table"],
+                c["name"],
+                CONSTRAINT_TYPES.get(c["type"], c["type"]),
+                tuple(c["columns"]),
+                c["definition"],
+            )
+
+    @classmethod
+    def load(cls, conn, schemas=("public",)):
+        """Read the whole catalog for `schemas` in one query"""
+        with conn.cursor() as cur:
+            cur.execute(SNAPSHOT_SQL, {"schemas": list(schemas)})
+            data = cur.fetchone()[0]
+        return cls(data, schemas)
+
+    def _key(self, table):
+        """Resolve 'table' or 'schema.table' against the snapshot's search order"""
+        if "." in table:
+            schema, name = table.split(".", 1)
+            return (schema, name)
+        for schema in self.schemas:
+            if (schema, table) in self._tables:
+                return (schema, table)
+        return (self.schemas[0], table)
+
+    def has_table(self, table):
+        return self._key(table) in self._tables
+
+    def columns(self, table):
+        """Columns of a table in ordinal order ([] if the table is missing)"""
+        cols = self._columns.get(self._key(table), {})
+        return sorted(cols.values(), key=lambda c: c.position)
+
+    def column(self, table, column):
+        return self._columns.get(self._key(table), {}).get(column)
+
+    def has_column(self, table, column):
+        return self.column(table, column) is not None
+
+    def column_type(self, table, column):
+        """format_type() of a column, e.g. 'integer' or 'numeric(38,18)'; None if missing"""
+        col = self.column(table, column)
+        return col.type if col else None
+
+    def indexes(self, table):
+        return list(self._indexes.get(self._key(table), {}).values())
+
+    def has_index(self, name, table=None):
+        if table is not None:
+            return name in self._indexes.get(self._key(table), {})
+        return any(name in idx for idx in self._indexes.values())
+
+    def index(self, name):
+        """Index by name in any table of the snapshot, or None"""
+        for idx in self._indexes.values():
+            if name in idx:
+                return idx[name]
+        return None
+
+    def constraints(self, table, type=None):
+        """Constraints of a table, optionally filtered by type ('FOREIGN KEY', ...)"""
+        cons = self._constraints.get(self._key(table), {}).values()
+        return [c for c in cons if type is None or c.type == type]
+
+    def has_constraint(self, name, table=None):
+        if table is not None:
+            return name in self._constraints.get(self._key(table), {})
+        return any(name in cons for cons in self._constraints.values())
+
+
+_cache = {}
+
+
+def snapshot(conn, schemas=("public",), refresh=False):
+    """Cached CatalogSnapshot for this run; refresh=True re-reads the catalog"""
+    key = tuple(schemas)
+    if refresh or key not in _cache:
+        _cache[key] = CatalogSnapshot.load(conn, schemas)
+    return _cache[key]
+
+
+def invalidate():
+    """Drop cached snapshots after DDL"""
+    _cache.clear()
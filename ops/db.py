@@ -0,0 +1,226 @@
+"""
+Pooled PostgreSQL connections for the ops scripts.
+
+Every script used to parse DATABASE_URL itself and open a fresh TLS
+connection per phase. This module keeps one psycopg2 pool per process:
+
+    from ops import db
+
+    conn = db.connect()            # checked out of the pool
+    ...
+    conn.close()                   # returned to the pool, socket stays open
+
+    with db.connection(statement_timeout=30000) as conn:
+        with db.named_cursor(conn, itersize=5000) as cur:
+            cur.execute("SELECT ... FROM challenges")
+            for row in cur:
+                ...
+
+        for c in db.scan(conn, "SELECT id, amount FROM challenges"):
+            print(c.id, c.amount)       # namedtuple rows, streamed
+
+For full-table audits prefer scan() over RealDictCursor + fetchall(): rows
+arrive itersize at a time from a server-side cursor, and each row is a
+namedtuple (no per-row dict) instead of a dict. scan_columns() goes one step
+further and hands back each batch as column lists.
+
+libpq cannot resume a TLS session on a new socket, so the handshake is saved
+by never closing the socket: connections go back to the pool with TCP
+keepalives enabled and are reused by the next phase or, under
+`python -m ops run`, by the next script.
+"""
+
+import atexit
+import itertools
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, unquote, urlparse
+
+import psycopg2
+from psycopg2 import extensions, pool as pg_pool
+from psycopg2.extras import NamedTupleCursor
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", ""}
+
+DEFAULT_POOL_MIN = 1
+DEFAULT_POOL_MAX = int(os.getenv("OPS_DB_POOL_MAX", "8"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_cursor_ids = itertools.count(1)
+
+
+class PooledConnection(extensions.connection):
+    """Connection whose close() hands it back to the pool instead of closing"""
+
+    _ops_pool = None
+
+    def close(self):
+        pool = self._ops_pool
+        if pool is None or pool.closed or self.closed:
+            return super().close()
+        # Clear first: putconn() calls close() again when the pool is full
+        self._ops_pool = None
+        pool.putconn(self)
+
+
+def get_database_url():
+    """Read DATABASE_URL from the environment (and .env if python-dotenv is installed)"""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment")
+        print("   Make sure .env file exists and contains DATABASE_URL")
+        sys.exit(1)
+    return db_url
+
+
+def parse_database_url(db_url, statement_timeout=None):
+    """Turn a postgres:// URL into psycopg2.connect() keyword arguments"""
+    parsed = urlparse(db_url)
+    params = dict(parse_qsl(parsed.query))
+
+    kwargs = {
+        "host": parsed.hostname,
+        "port": parsed.port or 5432,
+        "dbname": unquote(parsed.path.lstrip("/")) or "postgres",
+        "user": unquote(parsed.username) if parsed.username else None,
+        "password": unquote(parsed.password) if parsed.password else None,
+        # Keep idle pooled sockets alive between phases so they are not
+        # dropped by the Supabase pooler and re-handshaken
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 5,
+        "application_name": "bantah-ops",
+    }
+    kwargs.update(params)
+
+    if "sslmode" not in kwargs and (parsed.hostname or "") not in LOCAL_HOSTS:
+        kwargs["sslmode"] = "require"
+
+    if statement_timeout is None:
+        statement_timeout = os.getenv("OPS_STATEMENT_TIMEOUT_MS")
+    if statement_timeout:
+        # Sent in the startup packet, so it costs no extra round trip
+        kwargs["options"] = f"-c statement_timeout={int(statement_timeout)}"
+
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def get_pool(minconn=DEFAULT_POOL_MIN, maxconn=DEFAULT_POOL_MAX):
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            kwargs = parse_database_url(get_database_url())
+            try:
+                _pool = pg_pool.ThreadedConnectionPool(
+                    minconn,
+                    maxconn,
+                    connection_factory=PooledConnection,
+                    **kwargs,
+                )
+            except psycopg2.OperationalError as e:
+                print(f"❌ Failed to connect to database: {e}")
+                sys.exit(1)
+            print(f"✅ Connected to {kwargs.get('host')}:{kwargs.get('port')}/{kwargs.get('dbname')}")
+        return _pool
+
+
+def connect():
+    """Check a connection out of the pool; conn.close() returns it"""
+    pool = get_pool()
+    conn = pool.getconn()
+    if conn.closed:
+        # Server dropped it while idle - discard and take a fresh one
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    conn._ops_pool = pool
+    return conn
+
+
+@contextmanager
+def connection(statement_timeout=None, autocommit=False):
+    """Pooled connection for a with-block; commits on success, rolls back on error"""
+    conn = connect()
+    conn.autocommit = autocommit
+    try:
+        if statement_timeout is not None:
+            with conn.cursor() as cur:
+                cur.execute("SET statement_timeout = %s", (int(statement_timeout),))
+        yield conn
+        if not autocommit:
+            conn.commit()
+    except Exception:
+        if not conn.closed and not autocommit:
+            conn.rollback()
+        raise
+    finally:
+        if not conn.closed:
+            if statement_timeout is not None:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute("RESET statement_timeout")
+                conn.commit()
+            conn.autocommit = False
+            conn.close()
+
+
+@contextmanager
+def named_cursor(conn, name=None, itersize=2000, cursor_factory=None, withhold=False):
+    """Server-side cursor that streams rows in itersize chunks instead of fetchall()"""
+    if name is None:
+        name = f"ops_cursor_{next(_cursor_ids)}"
+    cur = conn.cursor(name=name, cursor_factory=cursor_factory, withhold=withhold)
+    cur.itersize = itersize
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+
+def scan(conn, query, params=None, itersize=5000, withhold=False):
+    """Yield the rows of `query` as namedtuples, streamed through a server-side cursor
+
+    Use withhold=True if the loop commits or rolls back on `conn` while
+    scanning; the cursor's transaction is then committed right after it opens.
+    """
+    with named_cursor(conn, itersize=itersize, cursor_factory=NamedTupleCursor, withhold=withhold) as cur:
+        cur.execute(query, params)
+        if withhold:
+            conn.commit()
+        yield from cur
+
+
+def scan_columns(conn, query, params=None, batch_size=5000, withhold=False):
+    """Yield {column: [values]} for each batch of up to `batch_size` rows of `query`"""
+    with named_cursor(conn, itersize=batch_size, withhold=withhold) as cur:
+        cur.execute(query, params)
+        if withhold:
+            conn.commit()
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            names = [d.name for d in cur.description]
+            yield dict(zip(names, (list(values) for values in zip(*rows))))
+
+
+def close_pool():
+    """Close every pooled connection (registered at interpreter exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+atexit.register(close_pool)
@@ -0,0 +1,115 @@
+"""
+Coalescing of consecutive ALTER TABLE statements.
+
+Every ALTER TABLE takes an ACCESS EXCLUSIVE lock on its table and
+invalidates the table's cached catalog entries in every backend. Seven
+single-column ALTERs on challenges queue behind (and block) live traffic
+seven times; one ALTER with seven clauses does it once:
+
+    from ops import ddl
+
+    for result in ddl.execute(conn, statements):
+        print(result.status, result.sql)
+
+coalesce() merges runs of ALTER TABLE on the same table and keeps every
+other statement, and the overall order, as is. execute() runs each merged
+statement in its own transaction. If a merged statement fails, it falls back
+to the original statements one by one, so one bad clause does not stop the
+others.
+"""
+
+import re
+import time
+from collections import namedtuple
+
+from ops import sqllex
+
+Group = namedtuple("Group", "sql sources")
+Result = namedtuple("Result", "sql sources status seconds error")
+
+ALTER_HEADER = re.compile(
+    rf'^\s*ALTER\s+TABLE\s+(IF\s+EXISTS\s+)?(ONLY\s+)?({sqllex.IDENT})\s+',
+    re.IGNORECASE,
+)
+
+# Subcommands PostgreSQL does not allow in a multi-clause ALTER TABLE
+STANDALONE_CLAUSES = re.compile(
+    r'^(?:RENAME|SET\s+SCHEMA|ATTACH\s+PARTITION|DETACH\s+PARTITION)\b',
+    re.IGNORECASE,
+)
+
+
+def _alter_parts(sql):
+    """(merge key, header, clauses) for a mergeable ALTER TABLE, else None"""
+    statements = sqllex.split_statements(sql)
+    if len(statements) != 1:
+        return None
+    statement = sqllex.strip_comments(statements[0]).strip()
+    m = ALTER_HEADER.match(statement)
+    if not m:
+        return None
+    clauses = sqllex.split_top_level(statement[m.end():])
+    if not clauses or any(STANDALONE_CLAUSES.match(c) for c in clauses):
+        return None
+    key = (sqllex.identifier_key(m.group(3)), bool(m.group(1)), bool(m.group(2)))
+    header = " ".join(statement[:m.end()].split())
+    return key, header, [c.strip() for c in clauses]
+
+
+def coalesce(statements):
+    """[Group] with consecutive ALTER TABLEs on the same table merged"""
+    groups = []
+    current_key = None
+    header, clauses, sources = None, [], []
+
+    def flush():
+        if sources:
+            if len(sources) == 1:
+                groups.append(Group(sources[0], list(sources)))
+            else:
+                body = ",\n    ".join(clauses)
+                groups.append(Group(f"{header}\n    {body}", list(sources)))
+
+    for sql in statements:
+        parts = _alter_parts(sql)
+        if parts and parts[0] == current_key:
+            clauses.extend(parts[2])
+            sources.append(sql)
+            continue
+        flush()
+        if parts:
+            current_key, header, clauses, sources = parts[0], parts[1], list(parts[2]), [sql]
+        else:
+            groups.append(Group(sql, [sql]))
+            current_key, header, clauses, sources = None, None, [], []
+    flush()
+    return groups
+
+
+def _run_one(conn, sql, sources, classify):
+    started = time.monotonic()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+        conn.commit()
+        return Result(sql, sources, "applied", time.monotonic() - started, None)
+    except Exception as e:
+        conn.rollback()
+        status = classify(e) if classify else "failed"
+        return Result(sql, sources, status, time.monotonic() - started, e)
+
+
+def execute(conn, statements, classify=None):
+    """Run `statements` coalesced; yields a Result per statement actually executed.
+
+    classify(exc) returns 'skipped' for tolerable errors or 'failed' (the default).
+    """
+    for group in coalesce(statements):
+        result = _run_one(conn, group.sql, group.sources, classify)
+        if result.error is None or len(group.sources) == 1:
+            yield result
+            continue
+        print(f"   ⚠️  Merged ALTER failed ({str(result.error).strip().splitlines()[0]}); "
+              f"retrying its {len(group.sources)} statements one by one")
+        for sql in group.sources:
+            yield _run_one(conn, sql, [sql], classify)
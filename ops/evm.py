@@ -0,0 +1,235 @@
+"""
+Minimal EVM helpers: keccak-256, event topics and log decoding, batched JSON-RPC.
+
+    from ops import evm
+
+    events = evm.events_from_abi(abi, ["ChallengeCreatedP2P", "CreatorStakeLocked"])
+    rpc = evm.Rpc("http://127.0.0.1:8545")
+    for log in rpc.get_logs(factory, [list(events)], from_block, to_block):
+        name, args = evm.decode_log(events, log)
+
+keccak256() is pure Python. It is only used to hash event signatures into
+topics, a handful of calls per run, so it needs neither pycryptodome nor
+eth-hash. decode_log() handles the static ABI types (uintN, intN, address,
+bool, bytesN) and string/bytes in the data section. Indexed dynamic values
+come back as their topic hash.
+
+Rpc keeps one keep-alive HTTP connection per thread (ops/keepalive.py), so a scan of many
+batches reuses one TCP (and TLS) session. batch(raise_errors=False) leaves
+per-call errors in place so callers can retry just the calls that failed.
+"""
+
+import json
+import threading
+from collections import namedtuple
+
+from ops import keepalive
+
+Event = namedtuple("Event", "name signature topic inputs")
+
+_RC = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+# _ROTATIONS[x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_MASK = (1 << 64) - 1
+_RATE = 136
+
+
+def _rol(value, shift):
+    return ((value << shift) | (value >> (64 - shift))) & _MASK if shift else value
+
+
+def _keccak_f(a):
+    for rc in _RC:
+        c = [a[x][0] ^ a[x][1] ^ a[x][2] ^ a[x][3] ^ a[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rol(c[(x + 1) % 5], 1) for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rol(a[x][y] ^ d[x], _ROTATIONS[x][y])
+        for x in range(5):
+            for y in range(5):
+                a[x][y] = b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y])
+        a[0][0] ^= rc
+
+
+def keccak256(data):
+    """Keccak-256 digest (the Ethereum hash, not SHA3-256) of `data` (bytes or str)"""
+    if isinstance(data, str):
+        data = data.encode()
+    padded = bytearray(data) + b"\x01" + bytes(-(len(data) + 1) % _RATE)
+    padded[-1] |= 0x80
+    state = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset:offset + _RATE]
+        for i in range(_RATE // 8):
+            state[i % 5][i // 5] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        _keccak_f(state)
+    return b"".join(state[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+def event_topic(signature):
+    """topic0 of an event signature such as "Transfer(address,address,uint256)" """
+    return "0x" + keccak256(signature).hex()
+
+
+def events_from_abi(abi, names=None):
+    """{topic0: Event} for the ABI's events (only `names`, if given)"""
+    events = {}
+    for entry in abi:
+        if entry.get("type") != "event" or entry.get("anonymous"):
+            continue
+        if names is not None and entry["name"] not in names:
+            continue
+        signature = f"{entry['name']}({','.join(i['type'] for i in entry['inputs'])})"
+        topic = event_topic(signature)
+        events[topic] = Event(entry["name"], signature, topic, entry["inputs"])
+    if names is not None:
+        missing = set(names) - {e.name for e in events.values()}
+        if missing:
+            raise KeyError(f"events not in ABI: {', '.join(sorted(missing))}")
+    return events
+
+
+def _decode_word(kind, word):
+    if kind == "address":
+        return "0x" + word[-20:].hex()
+    if kind == "bool":
+        return word[-1] == 1
+    if kind.startswith("uint"):
+        return int.from_bytes(word, "big")
+    if kind.startswith("int"):
+        return int.from_bytes(word, "big", signed=True)
+    if kind.startswith("bytes"):
+        return "0x" + word[:int(kind[5:])].hex()
+    raise ValueError(f"unsupported ABI type {kind}")
+
+
+def _hex_bytes(value):
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def decode_log(events, log):
+    """(event name, {arg: value}) for a raw log, or None if its topic0 is not in `events`"""
+    topics = log.get("topics") or []
+    event = events.get(topics[0].lower()) if topics else None
+    if event is None:
+        return None
+    data = _hex_bytes(log.get("data") or "0x")
+    args = {}
+    topic_index = 1
+    slot = 0
+    for arg in event.inputs:
+        kind = arg["type"]
+        if arg.get("indexed"):
+            word = _hex_bytes(topics[topic_index])
+            topic_index += 1
+            # Indexed strings, bytes and arrays are only present as their hash
+            args[arg["name"]] = "0x" + word.hex() if kind in ("string", "bytes") or kind.endswith("]") \
+                else _decode_word(kind, word)
+            continue
+        word = data[32 * slot:32 * slot + 32]
+        slot += 1
+        if kind in ("string", "bytes"):
+            offset = int.from_bytes(word, "big")
+            length = int.from_bytes(data[offset:offset + 32], "big")
+            raw = data[offset + 32:offset + 32 + length]
+            args[arg["name"]] = raw.decode("utf-8", "replace") if kind == "string" else "0x" + raw.hex()
+        else:
+            args[arg["name"]] = _decode_word(kind, word)
+    return event.name, args
+
+
+class RpcError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class Rpc:
+    """JSON-RPC over keep-alive HTTP; batch() sends many calls in one request"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.requests = 0
+        self._pool = keepalive.Pool(url, timeout)
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    def close(self):
+        self._pool.close()
+
+    def _post(self, payload):
+        status, data = self._pool.request("POST", body=json.dumps(payload).encode(),
+                                          headers={"Content-Type": "application/json"})
+        with self._lock:
+            self.requests += 1
+        if status == 429:
+            raise RpcError("rate limited (HTTP 429)", 429)
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise RpcError(f"HTTP {status}: {data[:200]!r}", status)
+
+    def batch(self, calls, raise_errors=True):
+        """[result] for [(method, params)], in order
+
+        With raise_errors=False a failed call's slot holds its RpcError
+        instead of raising. A rejected batch always raises.
+        """
+        if not calls:
+            return []
+        with self._lock:
+            first = self._ids
+            self._ids += len(calls)
+        payload = [{"jsonrpc": "2.0", "id": first + i, "method": method, "params": params}
+                   for i, (method, params) in enumerate(calls)]
+        replies = self._post(payload)
+        if isinstance(replies, dict):
+            # Some nodes answer a whole batch with a single error object
+            error = replies.get("error") or {}
+            raise RpcError(error.get("message", "batch rejected"), error.get("code"))
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for i in range(len(calls)):
+            reply = by_id.get(first + i)
+            if reply is None:
+                result = RpcError(f"no reply for {calls[i][0]}")
+            elif "error" in reply:
+                result = RpcError(reply["error"].get("message", "error"), reply["error"].get("code"))
+            else:
+                result = reply.get("result")
+            if raise_errors and isinstance(result, RpcError):
+                raise result
+            results.append(result)
+        return results
+
+    def call(self, method, *params):
+        return self.batch([(method, list(params))])[0]
+
+    def block_number(self):
+        return int(self.call("eth_blockNumber"), 16)
+
+    def chain_id(self):
+        return int(self.call("eth_chainId"), 16)
+
+    def get_logs(self, address, topics, from_block, to_block, chunk=2000):
+        """Logs of `address` matching `topics` in [from_block, to_block], `chunk` blocks per call"""
+        logs = []
+        for start in range(from_block, to_block + 1, chunk):
+            end = min(start + chunk - 1, to_block)
+            logs.extend(self.call("eth_getLogs", {
+                "address": address, "topics": topics,
+                "fromBlock": hex(start), "toBlock": hex(end),
+            }))
+        return logs
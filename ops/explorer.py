@@ -0,0 +1,345 @@
+"""
+Asynchronous Etherscan-family (BaseScan, PolygonScan, Arbiscan) verification client.
+
+    import asyncio
+    from ops import explorer
+
+    async def main():
+        async with explorer.Client(api_url, api_key, rate=5) as client:
+            results = await explorer.verify_all(client, [
+                explorer.Submission("ChallengeEscrow", address, payload),
+                ...
+            ])
+
+    asyncio.run(main())
+
+Every contract is submitted at once and each GUID is polled with backoff,
+while a token bucket keeps the total request rate under the explorer's limit
+(5/s on the free tier). A rate-limited or failed request is retried after a
+delay rather than reported as a failure. With aiohttp installed, all requests
+share one keep-alive connection pool. Without it, requests run on up to
+`connections` worker threads, each reusing its own keep-alive connection
+(ops/keepalive.py).
+
+ops/mock_explorer.py speaks the same API locally, for trying this out
+without an API key or a live deploy.
+
+Status lookups can go through an on-disk cache (ops/cache.py) keyed by
+(chain id, address, hash of the deployed bytecode). Verification is
+permanent, so a "verified" entry is reused forever. A "not verified" entry
+is reused for `UNVERIFIED_TTL` seconds. A redeploy at the same address
+(CREATE2) changes the bytecode hash and so misses the cache:
+
+    hashes = await explorer.code_hashes(rpc_url, addresses)
+    statuses, hits = await explorer.check_all_cached(client, 84532, contracts, hashes)
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+import urllib.parse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ops import cache, evm, keepalive
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# ValueError covers non-JSON bodies (HTML error pages from a proxy)
+TRANSPORT_ERRORS = (OSError, asyncio.TimeoutError, ValueError)
+if aiohttp is not None:
+    TRANSPORT_ERRORS += (aiohttp.ClientError,)
+
+Submission = namedtuple("Submission", "name address payload")
+Result = namedtuple("Result", "name address status guid message seconds")
+
+# Result.status values
+VERIFIED = "verified"
+ALREADY_VERIFIED = "already_verified"
+FAILED = "failed"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+RATE_LIMITED = "max rate limit reached"
+NOT_INDEXED = "unable to locate contractcode"
+ALREADY = "already verified"
+PENDING = "pending in queue"
+
+CACHE_NAMESPACE = "explorer-status"
+UNVERIFIED_TTL = 600
+
+
+class ExplorerError(Exception):
+    pass
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `capacity`
+
+    The default capacity of 1 spaces requests evenly. A full bucket of `rate`
+    would allow close to 2 x rate requests in the first second, which a
+    sliding-window limiter like the explorer's rejects.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _backoff(attempt, base=1.0, cap=30.0):
+    """Exponential delay with jitter so concurrent pollers do not line up"""
+    return min(cap, base * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class Client:
+    def __init__(self, api_url, api_key, rate=5, burst=1, connections=10, timeout=30, retries=6):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate, burst)
+        self.connections = connections
+        self.timeout = timeout
+        self.retries = retries
+        self.requests = 0
+        self.rate_limited = 0
+        self._session = None
+        self._pool = None
+        self._executor = None
+
+    async def __aenter__(self):
+        if aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        else:
+            self._pool = keepalive.Pool(self.api_url, self.timeout)
+            self._executor = ThreadPoolExecutor(max_workers=self.connections)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._pool.close()
+            self._executor = self._pool = None
+
+    async def _send(self, method, params):
+        if self._session is not None:
+            if method == "GET":
+                request = self._session.get(self.api_url, params=params)
+            else:
+                request = self._session.post(self.api_url, data=params)
+            async with request as resp:
+                return json.loads(await resp.text())
+
+        if self._pool is None:
+            raise ExplorerError("Client must be used as `async with Client(...)`")
+
+        def blocking():
+            data = urllib.parse.urlencode(params)
+            if method == "GET":
+                _, body = self._pool.request("GET", f"?{data}")
+            else:
+                _, body = self._pool.request("POST", body=data.encode(), headers={
+                    "Content-Type": "application/x-www-form-urlencoded"})
+            return json.loads(body)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, blocking)
+
+    async def call(self, method, module, action, **params):
+        """One API call, retried on rate limits and transport errors; returns the JSON body"""
+        params = {"module": module, "action": action, "apikey": self.api_key, **params}
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                body = await self._send(method, params)
+            except TRANSPORT_ERRORS as e:
+                if attempt == self.retries:
+                    raise ExplorerError(f"{action}: {e}") from e
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            if RATE_LIMITED in str(body.get("result", "")).lower():
+                self.rate_limited += 1
+                await asyncio.sleep(_backoff(attempt, base=0.5))
+                continue
+            return body
+        raise ExplorerError(f"{action}: still rate limited after {self.retries} retries")
+
+    async def submit(self, payload):
+        """verifysourcecode; returns the raw response body"""
+        return await self.call("POST", "contract", "verifysourcecode", **payload)
+
+    async def status(self, guid):
+        return await self.call("GET", "contract", "checkverifystatus", guid=guid)
+
+    async def source(self, address):
+        """getsourcecode result row for `address` (SourceCode is '' when unverified)"""
+        body = await self.call("GET", "contract", "getsourcecode", address=address)
+        result = body.get("result") or [{}]
+        return result[0] if isinstance(result, list) else {}
+
+
+async def verify(client, submission, poll_timeout=300, poll_interval=1.0, index_retries=6):
+    """Submit one contract and poll its GUID to a final Result"""
+    started = time.monotonic()
+
+    def result(status, guid=None, message=""):
+        return Result(submission.name, submission.address, status, guid, message, time.monotonic() - started)
+
+    try:
+        for attempt in range(index_retries + 1):
+            body = await client.submit(submission.payload)
+            message = str(body.get("result", ""))
+            if body.get("status") == "1":
+                guid = message
+                break
+            lowered = message.lower()
+            if ALREADY in lowered:
+                return result(ALREADY_VERIFIED, message=message)
+            # Right after a deploy the explorer may not have indexed the bytecode yet
+            if NOT_INDEXED in lowered and attempt < index_retries:
+                await asyncio.sleep(_backoff(attempt, base=2 * poll_interval))
+                continue
+            return result(FAILED, message=message or body.get("message", ""))
+
+        deadline = time.monotonic() + poll_timeout
+        attempt = 0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_backoff(attempt, base=poll_interval, cap=15.0))
+            attempt += 1
+            body = await client.status(guid)
+            message = str(body.get("result", ""))
+            lowered = message.lower()
+            if PENDING in lowered:
+                continue
+            if ALREADY in lowered:
+                return result(ALREADY_VERIFIED, guid, message)
+            if body.get("status") == "1":
+                return result(VERIFIED, guid, message)
+            return result(FAILED, guid, message)
+        return result(TIMEOUT, guid, f"still pending after {poll_timeout}s")
+    except ExplorerError as e:
+        return result(ERROR, message=str(e))
+
+
+async def verify_all(client, submissions, poll_timeout=300, poll_interval=1.0, on_result=None):
+    """Verify every submission concurrently; results come back in submission order"""
+
+    async def one(submission):
+        r = await verify(client, submission, poll_timeout, poll_interval)
+        if on_result:
+            on_result(r)
+        return r
+
+    return await asyncio.gather(*(one(s) for s in submissions))
+
+
+async def check_all(client, contracts):
+    """{name: (verified or None on error, source row)} for {name: address}, concurrently"""
+
+    async def one(address):
+        try:
+            row = await client.source(address)
+            return bool(row.get("SourceCode")), row
+        except ExplorerError:
+            return None, {}
+
+    names = list(contracts)
+    rows = await asyncio.gather(*(one(contracts[n]) for n in names))
+    return dict(zip(names, rows))
+
+
+async def code_hashes(rpc_url, addresses, timeout=30):
+    """{address: sha256 of its runtime bytecode} from one batched eth_getCode call
+
+    Addresses without code, or whose call failed, map to None; if the request
+    itself fails the result is {} and callers fall back to address-only cache
+    keys.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return {}
+    rpc = evm.Rpc(rpc_url, timeout=timeout)
+    calls = [("eth_getCode", [address, "latest"]) for address in addresses]
+    try:
+        codes = await asyncio.get_running_loop().run_in_executor(None, rpc.batch, calls, False)
+    except (evm.RpcError,) + TRANSPORT_ERRORS:
+        return {}
+    finally:
+        rpc.close()
+    hashes = {}
+    for address, code in zip(addresses, codes):
+        ok = isinstance(code, str) and code not in ("", "0x")
+        hashes[address] = hashlib.sha256(bytes.fromhex(code[2:])).hexdigest() if ok else None
+    return hashes
+
+
+def _status_key(chain_id, address, code_hash):
+    return cache.sha256_bytes(f"{chain_id}:{address.lower()}:{code_hash or ''}".encode())
+
+
+def cached_status(chain_id, address, code_hash=None, ttl=UNVERIFIED_TTL):
+    """(verified, source row) from the cache, or None if missing or expired"""
+    entry = cache.get(CACHE_NAMESPACE, _status_key(chain_id, address, code_hash))
+    if entry is None:
+        return None
+    if not entry["verified"] and time.time() - entry["checked_at"] > ttl:
+        return None
+    return entry["verified"], entry["row"]
+
+
+def remember_status(chain_id, address, code_hash, verified, row=None):
+    cache.put(CACHE_NAMESPACE, _status_key(chain_id, address, code_hash), {
+        "chain_id": chain_id,
+        "address": address,
+        "code_hash": code_hash,
+        "verified": bool(verified),
+        "checked_at": time.time(),
+        "row": row or {},
+    })
+
+
+async def check_all_cached(client, chain_id, contracts, hashes=None, ttl=UNVERIFIED_TTL, refresh=False):
+    """check_all() through the status cache; returns ({name: (verified, row)}, cache hits)
+
+    Only cache misses reach the explorer, concurrently. Errors (verified
+    None) are not cached.
+    """
+    hashes = hashes or {}
+    statuses = {}
+    misses = {}
+    for name, address in contracts.items():
+        hit = None if refresh else cached_status(chain_id, address, hashes.get(address), ttl)
+        if hit is None:
+            misses[name] = address
+        else:
+            statuses[name] = hit
+    if misses:
+        for name, (verified, row) in (await check_all(client, misses)).items():
+            statuses[name] = (verified, row)
+            if verified is not None:
+                address = misses[name]
+                remember_status(chain_id, address, hashes.get(address), verified, row)
+    return {name: statuses[name] for name in contracts}, len(contracts) - len(misses)
@@ -0,0 +1,381 @@
+"""
+Checkpointed block-range indexer for ChallengeFactory and ChallengeEscrow events.
+
+    from ops import db, evm, indexer
+
+    rpc = evm.Rpc("http://127.0.0.1:8545")
+    source = indexer.Source(rpc, factory="0x…", escrow="0x…")
+    indexer.run(db.connect(), source, name="challenges")
+
+scan() walks [from_block, to_block] in windows of `span` blocks and sends
+`batch` eth_getLogs calls per JSON-RPC request over Rpc's keep-alive
+connection. Providers cap eth_getLogs by result count or block range:
+- A capped window is split, at the provider's suggested range when the
+  error message has one, else in half. Only that window is refetched.
+- The span shrinks after a split and doubles again after clean rounds, up
+  to max_span.
+- A batch rejected as a whole halves the batch size.
+- HTTP 429 and transport errors back off and retry.
+
+run() stores each decoded event in ops_chain_events and merges the factory's
+ChallengeCreatedP2P/CreatorStakeLocked/ParticipantStakeLocked events into
+challenges via ops.onchain. The events and the per-(chain, name) checkpoint
+in ops_chain_checkpoints are committed together, so a rerun continues after
+the last committed block. onchain.ingest is idempotent, so a crash between
+its commit and the checkpoint's only repeats work.
+
+Blocks newer than head - `confirmations` are left for the next run. The
+indexer does not unwind reorgs deeper than that.
+"""
+
+import json
+import re
+import time
+from collections import deque
+
+from ops import artifacts, evm, onchain
+from ops.onchain import DEFAULT_ARTIFACTS
+
+CHECKPOINT_TABLE = "ops_chain_checkpoints"
+EVENTS_TABLE = "ops_chain_events"
+LOCK_KEY = "ops.indexer"
+SPAN = 2000
+MAX_SPAN = 100_000
+BATCH = 10
+BLOCKS_PER_REQUEST = 100
+COMMIT_EVENTS = 1000
+RETRIES = 5
+BACKOFF = 1.0
+
+# eth_getLogs errors that mean "ask for fewer blocks": Infura/QuickNode use
+# -32005, others (Alchemy, public Base endpoints) only say so in the message
+LIMIT_CODES = {-32005}
+LIMIT_MESSAGE = re.compile(
+    r"more than \d+ results|too many|limit exceeded|response size|block range|range too (large|wide)"
+    r"|exceeds? (the )?max|query timeout", re.IGNORECASE)
+SUGGESTED_RANGE = re.compile(r"\[\s*(0x[0-9a-fA-F]+)\s*,\s*(0x[0-9a-fA-F]+)\s*\]")
+
+
+class IndexerError(Exception):
+    pass
+
+
+def _abi_events(name, artifacts_dir):
+    artifact = artifacts.find(artifacts.index(artifacts_dir), name)
+    with open(artifact.path, "r") as f:
+        return evm.events_from_abi(json.load(f)["abi"])
+
+
+class Source:
+    """The contracts to index and the events they emit ({topic0: evm.Event})"""
+
+    def __init__(self, rpc, factory=None, escrow=None, artifacts_dir=DEFAULT_ARTIFACTS):
+        if not factory and not escrow:
+            raise IndexerError("nothing to index: give a factory and/or escrow address")
+        self.rpc = rpc
+        self.factory = factory.lower() if factory else None
+        self.escrow = escrow.lower() if escrow else None
+        self.events = {}
+        if self.factory:
+            self.events.update(_abi_events("ChallengeFactory", artifacts_dir))
+        if self.escrow:
+            self.events.update(_abi_events("ChallengeEscrow", artifacts_dir))
+
+    @property
+    def addresses(self):
+        return [a for a in (self.factory, self.escrow) if a]
+
+    @property
+    def topics(self):
+        return [sorted(self.events)]
+
+
+def ensure_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                chain_id BIGINT NOT NULL,
+                name TEXT NOT NULL,
+                addresses TEXT NOT NULL,
+                last_block BIGINT NOT NULL,
+                events BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (chain_id, name)
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {EVENTS_TABLE} (
+                chain_id BIGINT NOT NULL,
+                tx_hash TEXT NOT NULL,
+                log_index INTEGER NOT NULL,
+                block_number BIGINT NOT NULL,
+                block_time TIMESTAMP,
+                address TEXT NOT NULL,
+                event TEXT NOT NULL,
+                args JSONB NOT NULL,
+                PRIMARY KEY (chain_id, tx_hash, log_index)
+            )
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {EVENTS_TABLE}_block_idx "
+                    f"ON {EVENTS_TABLE} (chain_id, block_number)")
+    conn.commit()
+
+
+def get_checkpoint(conn, chain_id, name):
+    """Checkpoint row as a dict, or None if this indexer never committed"""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT addresses, last_block, events, updated_at FROM {CHECKPOINT_TABLE} "
+            f"WHERE chain_id = %s AND name = %s",
+            (chain_id, name),
+        )
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(("addresses", "last_block", "events", "updated_at"), row))
+
+
+def reset(conn, chain_id, name):
+    ensure_tables(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE chain_id = %s AND name = %s", (chain_id, name))
+    conn.commit()
+
+
+def _is_limit(error):
+    return error.code in LIMIT_CODES or bool(LIMIT_MESSAGE.search(str(error)))
+
+
+def _split(window, error):
+    """Two windows covering `window`, at the provider's suggested range if it gave one"""
+    start, end = window
+    if start == end:
+        raise IndexerError(f"block {start} alone exceeds the provider's eth_getLogs limit: {error}")
+    match = SUGGESTED_RANGE.search(str(error))
+    if match:
+        lo, hi = int(match.group(1), 16), int(match.group(2), 16)
+        if lo == start and start <= hi < end:
+            return [(start, hi), (hi + 1, end)]
+    middle = (start + end) // 2
+    return [(start, middle), (middle + 1, end)]
+
+
+def _with_retries(send, retries=RETRIES, backoff=BACKOFF):
+    """send() retried with exponential backoff on HTTP 429 and transport errors"""
+    for attempt in range(retries + 1):
+        try:
+            return send()
+        except evm.RpcError as e:
+            if e.code != 429 or attempt == retries:
+                raise
+        except OSError:
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2 ** attempt)
+
+
+def scan(rpc, addresses, topics, from_block, to_block, span=SPAN, batch=BATCH, max_span=MAX_SPAN):
+    """Yield (start, end, raw logs) for consecutive windows covering [from_block, to_block]"""
+    pending = deque()      # windows to request, in block order
+    fetched = {}           # start -> (end, logs), waiting for the windows before them
+    cursor = from_block    # first block not yet in a window
+    position = from_block  # first block not yet yielded
+    while position <= to_block:
+        while len(pending) < batch and cursor <= to_block:
+            end = min(cursor + span - 1, to_block)
+            pending.append((cursor, end))
+            cursor = end + 1
+        windows = [pending.popleft() for _ in range(min(batch, len(pending)))]
+        calls = [("eth_getLogs", [{"address": addresses, "topics": topics,
+                                   "fromBlock": hex(start), "toBlock": hex(end)}])
+                 for start, end in windows]
+        try:
+            results = _with_retries(lambda: rpc.batch(calls, raise_errors=False))
+        except evm.RpcError as e:
+            if e.code == 429:
+                raise
+            if len(windows) > 1:
+                # The batch itself was refused (too large, or too much work): send fewer calls
+                batch = max(1, len(windows) // 2)
+                pending.extendleft(reversed(windows))
+                continue
+            if not _is_limit(e):
+                raise
+            results = [e]
+
+        split = []
+        for window, result in zip(windows, results):
+            if isinstance(result, evm.RpcError):
+                if not _is_limit(result):
+                    raise IndexerError(f"eth_getLogs {window[0]}-{window[1]}: {result}")
+                split.extend(_split(window, result))
+            else:
+                fetched[window[0]] = (window[1], result)
+        if split:
+            # Refetch only the capped windows, ahead of anything not yet requested
+            split.sort()
+            pending.extendleft(reversed(split))
+            span = max(1, min(end - start + 1 for start, end in split))
+        elif cursor <= to_block:
+            span = min(max_span, span * 2)
+
+        while position in fetched:
+            end, logs = fetched.pop(position)
+            yield position, end, logs
+            position = end + 1
+
+
+def block_times(rpc, numbers, per_request=BLOCKS_PER_REQUEST):
+    """{block number: unix seconds} via batched eth_getBlockByNumber"""
+    pending = deque(sorted(set(numbers)))
+    times = {}
+    while pending:
+        chunk = [pending.popleft() for _ in range(min(per_request, len(pending)))]
+        calls = [("eth_getBlockByNumber", [hex(n), False]) for n in chunk]
+        try:
+            blocks = _with_retries(lambda: rpc.batch(calls))
+        except evm.RpcError as e:
+            if e.code == 429 or len(chunk) == 1:
+                raise
+            per_request = max(1, len(chunk) // 2)
+            pending.extendleft(reversed(chunk))
+            continue
+        for number, block in zip(chunk, blocks):
+            if block is not None:
+                times[number] = int(block["timestamp"], 16)
+    return times
+
+
+def _decode(source, raws, chain_id):
+    """onchain.Logs for raw logs, with block timestamps filled in where the node left them out"""
+    missing = [int(raw["blockNumber"], 16) for raw in raws
+               if not (raw.get("blockTimestamp") or raw.get("timestamp"))]
+    times = block_times(source.rpc, missing) if missing else {}
+    logs = []
+    for raw in raws:
+        if not (raw.get("blockTimestamp") or raw.get("timestamp")):
+            raw = dict(raw, blockTimestamp=times.get(int(raw["blockNumber"], 16)))
+        log = onchain.from_raw(source.events, raw, chain_id)
+        if log is not None:
+            logs.append(log)
+    return logs
+
+
+def _commit(conn, source, chain_id, name, last_block, logs):
+    """Merge factory events into challenges, then store events and the checkpoint in one transaction"""
+    factory_logs = [log for log in logs if log.contract == source.factory and log.name in onchain.EVENTS]
+    counts = onchain.ingest(conn, factory_logs) if factory_logs else None
+    with conn.cursor() as cur:
+        if logs:
+            cur.execute(
+                f"""
+                INSERT INTO {EVENTS_TABLE}
+                    (chain_id, tx_hash, log_index, block_number, block_time, address, event, args)
+                SELECT chain_id, tx_hash, log_index, block_number, block_time, address, event, args
+                FROM jsonb_to_recordset(%s::jsonb) AS t(
+                    chain_id bigint, tx_hash text, log_index integer, block_number bigint,
+                    block_time timestamp, address text, event text, args jsonb)
+                ON CONFLICT DO NOTHING
+                """,
+                (json.dumps([
+                    {"chain_id": log.chain_id, "tx_hash": log.tx_hash, "log_index": log.log_index,
+                     "block_number": log.block_number, "block_time": log.timestamp,
+                     "address": log.contract, "event": log.name, "args": log.args}
+                    for log in logs
+                ]),),
+            )
+            inserted = cur.rowcount
+        else:
+            inserted = 0
+        cur.execute(
+            f"""
+            INSERT INTO {CHECKPOINT_TABLE} (chain_id, name, addresses, last_block, events)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (chain_id, name) DO UPDATE SET
+                addresses = EXCLUDED.addresses,
+                last_block = EXCLUDED.last_block,
+                events = {CHECKPOINT_TABLE}.events + EXCLUDED.events,
+                updated_at = NOW()
+            """,
+            (chain_id, name, ",".join(source.addresses), last_block, inserted),
+        )
+    conn.commit()
+    return inserted, counts
+
+
+def _lock(conn, key):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (key,))
+        locked = cur.fetchone()[0]
+    conn.commit()
+    return locked
+
+
+def _unlock(conn, key):
+    # Session-level lock: release it before the connection goes back to the pool
+    if conn.closed:
+        return
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (key,))
+    conn.commit()
+
+
+def run(conn, source, name="challenges", chain_id=None, from_block=0, to_block=None, confirmations=0,
+        span=SPAN, batch=BATCH, commit_events=COMMIT_EVENTS, on_commit=None):
+    """Index from the checkpoint (or `from_block`) up to `to_block` (default: head - confirmations)
+
+    Returns a counts dict. on_commit(last_block, to_block, events) is called
+    after each commit. Only one run per (chain, name) at a time.
+    """
+    chain_id = chain_id or _with_retries(source.rpc.chain_id)
+    ensure_tables(conn)
+    key = f"{LOCK_KEY}:{chain_id}:{name}"
+    if not _lock(conn, key):
+        raise IndexerError(f"another indexer is already running for {name} on chain {chain_id}")
+    try:
+        return _index(conn, source, name, chain_id, from_block, to_block, confirmations,
+                      span, batch, commit_events, on_commit)
+    finally:
+        _unlock(conn, key)
+
+
+def _index(conn, source, name, chain_id, from_block, to_block, confirmations,
+           span, batch, commit_events, on_commit):
+    rpc = source.rpc
+    checkpoint = get_checkpoint(conn, chain_id, name)
+    if checkpoint:
+        if checkpoint["addresses"] != ",".join(source.addresses):
+            raise IndexerError(f"checkpoint {name} on chain {chain_id} was for {checkpoint['addresses']}; "
+                               f"use another --name or --reset")
+        start = checkpoint["last_block"] + 1
+    else:
+        start = from_block
+    if to_block is None:
+        to_block = _with_retries(rpc.block_number) - confirmations
+
+    counts = {"chain_id": chain_id, "from_block": start, "to_block": to_block, "events": 0, "stored": 0,
+              "inserted": 0, "updated": 0, "unchanged": 0, "orphans": 0, "requests": rpc.requests}
+    if start > to_block:
+        counts["requests"] = rpc.requests - counts["requests"]
+        return counts
+
+    raws = []
+    last = start - 1
+    for window_start, window_end, logs in scan(rpc, source.addresses, source.topics, start, to_block, span, batch):
+        raws.extend(logs)
+        last = window_end
+        if len(raws) < commit_events and last < to_block:
+            continue
+        decoded = _decode(source, raws, chain_id)
+        stored, merged = _commit(conn, source, chain_id, name, last, decoded)
+        counts["events"] += len(decoded)
+        counts["stored"] += stored
+        if merged:
+            for key in ("inserted", "updated", "unchanged", "orphans"):
+                counts[key] += merged[key]
+        raws = []
+        if on_commit:
+            on_commit(last, to_block, counts["events"])
+    counts["requests"] = rpc.requests - counts["requests"]
+    return counts
@@ -0,0 +1,87 @@
+"""
+Keep-alive HTTP connections, one per thread, for the stdlib-only clients.
+
+    from ops import keepalive
+
+    pool = keepalive.Pool("https://api-sepolia.basescan.org/api", timeout=30)
+    status, body = pool.request("GET", "?module=contract&action=...")
+    pool.close()
+
+Each thread that calls request() gets its own http.client connection and
+keeps it open, so a client running on a thread pool or a single loop reuses
+TCP (and TLS) sessions instead of connecting once per request. A connection
+the server closed while idle is reopened once. ops/evm.py's Rpc and
+ops/explorer.py's non-aiohttp path both go through this.
+"""
+
+import http.client
+import threading
+import urllib.parse
+
+
+class Pool:
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        parsed = urllib.parse.urlsplit(url)
+        self._https = parsed.scheme == "https"
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._base = parsed.path or "/"
+        self._query = parsed.query
+        self.path = self._base + (f"?{self._query}" if self._query else "")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = set()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            conn = cls(self._host, self._port, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._open.add(conn)
+        return conn
+
+    def _discard(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            with self._lock:
+                self._open.discard(conn)
+
+    def request(self, method, path=None, body=None, headers=None):
+        """(status, body bytes) for one request on this thread's connection
+
+        `path` defaults to the URL's own path; a path starting with "?" adds
+        its parameters to the URL's query string.
+        """
+        if path is None:
+            path = self.path
+        elif path.startswith("?"):
+            path = self.path + ("&" + path[1:] if self._query else path)
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body, headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, OSError):
+                # The server may have closed the idle connection; reconnect once
+                self._discard()
+                if attempt:
+                    raise
+                continue
+            if resp.will_close:
+                self._discard()
+            return resp.status, data
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._lock:
+            conns, self._open = self._open, set()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
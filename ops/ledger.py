@@ -0,0 +1,159 @@
+"""
+schema_migrations: which migrations ran, with what content and how long.
+
+One row per migration (Drizzle file or ad-hoc script) with the checksum of
+the SQL it ran, start/finish times, statement count and per-statement
+timings. Runners check it with a single query instead of trusting files on
+disk or re-probing the schema:
+
+    from ops import ledger
+
+    ledger.ensure_table(conn)
+    done = ledger.applied(conn)             # {name: checksum}
+    if done.get(name) == checksum:
+        return
+
+    run = ledger.Run(name, checksum, len(statements))
+    for sql in statements:
+        started = time.monotonic()
+        cur.execute(sql)
+        run.record(sql, time.monotonic() - started)
+    run.finish(conn)
+
+finish() writes without committing when commit=False, so the ledger row can
+share the migration's own transaction.
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from psycopg2.extras import Json
+
+TABLE = "schema_migrations"
+
+
+def ensure_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE} (
+                name TEXT PRIMARY KEY,
+                checksum TEXT NOT NULL,
+                status TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                duration_ms DOUBLE PRECISION,
+                statement_count INTEGER NOT NULL DEFAULT 0,
+                statements JSONB NOT NULL DEFAULT '[]'
+            )
+        """)
+    conn.commit()
+
+
+def checksum(statements):
+    """SHA-256 over a list of SQL statements (for scripts without a .sql file)"""
+    digest = hashlib.sha256()
+    for sql in statements:
+        digest.update(" ".join(sql.split()).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def applied(conn):
+    """{name: checksum} of every successfully applied migration ({} before the first run)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (TABLE,))
+        if cur.fetchone()[0] is None:
+            return {}
+        cur.execute(f"SELECT name, checksum FROM {TABLE} WHERE status = 'applied'")
+        return dict(cur.fetchall())
+
+
+class Run:
+    """Timings for one migration, written to the ledger by finish()"""
+
+    def __init__(self, name, checksum, statement_count):
+        self.name = name
+        self.checksum = checksum
+        self.statement_count = statement_count
+        self.started_at = datetime.now()
+        self.started = time.monotonic()
+        self.statements = []
+
+    def record(self, sql, seconds, status="applied", index=None):
+        self.statements.append({
+            "index": index if index is not None else len(self.statements) + 1,
+            "sql": " ".join(sql.split())[:200],
+            "ms": round(seconds * 1000, 3),
+            "status": status,
+        })
+
+    @property
+    def failed(self):
+        return any(s["status"] in ("failed", "blocked") for s in self.statements)
+
+    def finish(self, conn, status=None, commit=True, seconds=None):
+        """Upsert the ledger row; status defaults to 'failed' if any statement failed"""
+        status = status or ("failed" if self.failed else "applied")
+        if seconds is None:
+            seconds = time.monotonic() - self.started
+        statements = sorted(self.statements, key=lambda s: s["index"])
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {TABLE}
+                    (name, checksum, status, started_at, finished_at, duration_ms, statement_count, statements)
+                VALUES (%(name)s, %(checksum)s, %(status)s, %(started_at)s, NOW(), %(ms)s, %(count)s, %(statements)s)
+                ON CONFLICT (name) DO UPDATE SET
+                    checksum = EXCLUDED.checksum,
+                    status = EXCLUDED.status,
+                    started_at = EXCLUDED.started_at,
+                    finished_at = EXCLUDED.finished_at,
+                    duration_ms = EXCLUDED.duration_ms,
+                    statement_count = EXCLUDED.statement_count,
+                    statements = EXCLUDED.statements
+                """,
+                {
+                    "name": self.name,
+                    "checksum": self.checksum,
+                    "status": status,
+                    "started_at": self.started_at,
+                    "ms": round(seconds * 1000, 3),
+                    "count": self.statement_count,
+                    "statements": Json(statements),
+                },
+            )
+        if commit:
+            conn.commit()
+        return status
+
+
+def history(conn, limit=20):
+    """Ledger rows, slowest first, with each migration's slowest statement"""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT name, status, finished_at, duration_ms, statement_count,
+                   (SELECT s FROM jsonb_array_elements(statements) s
+                    ORDER BY (s->>'ms')::float DESC LIMIT 1)
+            FROM {TABLE}
+            ORDER BY duration_ms DESC NULLS LAST
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        return cur.fetchall()
+
+
+def print_history(conn, limit=20):
+    rows = history(conn, limit)
+    print(f"\n📋 {TABLE} (slowest first)\n")
+    for name, status, finished_at, duration_ms, count, slowest in rows:
+        icon = "✅" if status == "applied" else "❌"
+        print(f"   {icon} {name}: {(duration_ms or 0) / 1000:.2f}s, {count} statements, {finished_at:%Y-%m-%d %H:%M}")
+        if slowest:
+            slowest = slowest if isinstance(slowest, dict) else json.loads(slowest)
+            print(f"      slowest: {slowest['ms'] / 1000:.2f}s  {slowest['sql'][:70]}")
+    if not rows:
+        print("   (empty)")
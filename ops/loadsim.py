@@ -0,0 +1,542 @@
+"""
+Concurrent challenge lifecycle simulator for contention testing.
+
+    from ops import loadsim
+
+    report = loadsim.run(challenges=2000, workers=16)
+    loadsim.print_report(report)
+
+Each worker thread has its own connection and takes steps from a shared
+queue. Every challenge goes through the same transactions as the app:
+
+    create -> creator_stake -> join -> acceptor_stake -> vote x2 -> resolve
+                              \\-> cancel (5%)
+
+Several users race to join each challenge (`joiners`), and the two
+parties vote concurrently. join and resolve also update the users' points
+rows, the way the routes do. Hot users (activity is skewed as in
+ops/synth.py) therefore lock rows across challenges, in the orders the app
+would.
+
+Recorded:
+- The latency of every step (transaction plus commit), with percentiles.
+- Deadlocks, serialization failures and lock timeouts. Each one is counted
+  and the step is retried.
+- Joins lost to another user.
+- Lock waits, from a monitor connection that samples pg_stat_activity for
+  the simulator's sessions every `sample_interval` seconds.
+
+Only `in_flight` challenges are active at a time, so the steps of
+different challenges interleave the way live traffic does. Challenges are
+titled "[loadsim <run id>]"; run it against a load-test database such as one
+filled by scripts/generate_load_data.py.
+"""
+
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import psycopg2
+
+from ops import db, tokens
+
+APPLICATION_NAME = "bantah-loadsim"
+SKEW = 2.5
+RETRIES = 5
+CANCEL_RATE = 0.05
+
+DEADLOCK = "40P01"
+SERIALIZATION_FAILURE = "40001"
+LOCK_TIMEOUT = "55P03"
+RETRYABLE = {DEADLOCK: "deadlocks", SERIALIZATION_FAILURE: "serialization_failures",
+             LOCK_TIMEOUT: "lock_timeouts"}
+
+STEPS = ["create", "creator_stake", "join", "acceptor_stake", "vote", "resolve", "cancel"]
+
+
+class SimulationError(Exception):
+    pass
+
+
+class Challenge:
+    def __init__(self, creator):
+        self.id = None
+        self.creator = creator
+        self.acceptor = None
+        self.joins_left = 0
+        self.finished = False
+
+
+def _tx_hash():
+    return "0x" + uuid.uuid4().hex * 2
+
+
+# Steps: each runs in one transaction and returns the follow-up (step, challenge, arg)
+# tasks, except join, which returns whether this user got the challenge
+
+def _create(sim, cur, challenge, _):
+    token = sim.rng_choice(tokens.for_chain(tokens.BASE_SEPOLIA))
+    amount = sim.rng_amount()
+    cur.execute(
+        """
+        INSERT INTO challenges (challenger, challenger_side, title, description, category, amount,
+                                status, admin_created, due_date, payment_token_address,
+                                stake_amount_wei, on_chain_status, creator_staked, acceptor_staked)
+        VALUES (%s, %s, %s, 'Load simulation', 'p2p', %s, 'open', false, now() + interval '1 day',
+                %s, %s, 'pending', false, false)
+        RETURNING id
+        """,
+        (challenge.creator, sim.rng_choice(["YES", "NO"]), sim.title, amount,
+         token.address, amount * 10 ** (token.decimals - 3)),
+    )
+    challenge.id = cur.fetchone()[0]
+    cur.execute(
+        """
+        INSERT INTO points_transactions (user_id, challenge_id, transaction_type, amount, reason)
+        VALUES (%s, %s, 'creation_reward', 10, %s)
+        """,
+        (challenge.creator, challenge.id, sim.title),
+    )
+    return [("creator_stake", challenge, None)]
+
+
+def _creator_stake(sim, cur, challenge, _):
+    cur.execute(
+        """
+        UPDATE challenges SET creator_transaction_hash = %s, creator_staked = true,
+                              on_chain_status = 'submitted'
+        WHERE id = %s AND status = 'open'
+        """,
+        (_tx_hash(), challenge.id),
+    )
+    if sim.rng_random() < CANCEL_RATE:
+        return [("cancel", challenge, None)]
+    challenge.joins_left = sim.joiners
+    return [("join", challenge, sim.pick_user(exclude=challenge.creator)) for _ in range(sim.joiners)]
+
+
+def _join(sim, cur, challenge, user):
+    # Joiners race for the same row; the losers find challenged already set
+    cur.execute(
+        """
+        UPDATE challenges SET challenged = %s
+        WHERE id = %s AND status = 'open' AND challenged IS NULL
+        RETURNING id
+        """,
+        (user, challenge.id),
+    )
+    won = cur.fetchone() is not None
+    if won:
+        cur.execute(
+            """
+            INSERT INTO points_transactions (user_id, challenge_id, transaction_type, amount, reason)
+            VALUES (%s, %s, 'joining_reward', 5, %s)
+            """,
+            (user, challenge.id, sim.title),
+        )
+        cur.execute("UPDATE users SET points = points + 5 WHERE id = %s", (user,))
+    return won
+
+
+def _acceptor_stake(sim, cur, challenge, _):
+    cur.execute(
+        """
+        UPDATE challenges SET acceptor_transaction_hash = %s, acceptor_staked = true, status = 'active',
+                              on_chain_status = 'active', voting_ends_at = now() + interval '1 hour'
+        WHERE id = %s
+        """,
+        (_tx_hash(), challenge.id),
+    )
+    return [("vote", challenge, "creator"), ("vote", challenge, "acceptor")]
+
+
+def _vote(sim, cur, challenge, party):
+    winner = sim.rng_choice([challenge.creator, challenge.acceptor])
+    column = "creator_vote" if party == "creator" else "acceptor_vote"
+    cur.execute(
+        f"""
+        UPDATE challenges SET {column} = %s
+        WHERE id = %s
+        RETURNING creator_vote IS NOT NULL AND acceptor_vote IS NOT NULL
+        """,
+        (winner, challenge.id),
+    )
+    # The row lock orders the two votes; whichever commits second sees both
+    both = cur.fetchone()[0]
+    return [("resolve", challenge, None)] if both else []
+
+
+def _resolve(sim, cur, challenge, _):
+    cur.execute(
+        """
+        UPDATE challenges SET status = 'completed', completed_at = now(), on_chain_status = 'completed',
+               result = CASE WHEN creator_vote IS DISTINCT FROM acceptor_vote THEN 'draw'
+                             WHEN creator_vote = challenger THEN 'challenger_won'
+                             ELSE 'challenged_won' END
+        WHERE id = %s AND status = 'active'
+        RETURNING result
+        """,
+        (challenge.id,),
+    )
+    row = cur.fetchone()
+    if row is None or row[0] == "draw":
+        return []
+    if row[0] == "challenger_won":
+        winner, loser = challenge.creator, challenge.acceptor
+    else:
+        winner, loser = challenge.acceptor, challenge.creator
+    cur.execute(
+        """
+        INSERT INTO points_transactions (user_id, challenge_id, transaction_type, amount, reason)
+        VALUES (%s, %s, 'earned_challenge', 50, %s)
+        """,
+        (winner, challenge.id, sim.title),
+    )
+    # Winner first, then loser, so two resolves with the same users in
+    # opposite roles can deadlock
+    cur.execute("UPDATE users SET points = points + 50, streak = streak + 1 WHERE id = %s", (winner,))
+    cur.execute("UPDATE users SET streak = 0 WHERE id = %s", (loser,))
+    return []
+
+
+def _cancel(sim, cur, challenge, _):
+    cur.execute("UPDATE challenges SET status = 'cancelled' WHERE id = %s AND status = 'open'", (challenge.id,))
+    return []
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Simulation:
+    def __init__(self, user_ids, challenges, workers=8, in_flight=None, joiners=2,
+                 seed=None, lock_timeout=None, sample_interval=0.05):
+        if len(user_ids) < 2:
+            raise SimulationError("need at least two users; load users first with scripts/generate_load_data.py")
+        if workers < 1:
+            raise SimulationError("need at least one worker")
+        if joiners < 1:
+            # Nobody would ever join, so no challenge would get past its creator's stake
+            raise SimulationError("need at least one joiner per challenge")
+        self.user_ids = user_ids
+        self.challenges = challenges
+        self.workers = workers
+        self.in_flight = in_flight or workers * 4
+        self.joiners = joiners
+        self.lock_timeout = lock_timeout
+        self.sample_interval = sample_interval
+        self.run_id = uuid.uuid4().hex[:8]
+        self.title = f"[loadsim {self.run_id}]"
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._tasks = queue.Queue()
+        self._started_challenges = 0
+        self._finished_challenges = 0
+        self._done = threading.Event()
+        self._stop_monitor = threading.Event()
+
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.lost_joins = 0
+        self.lock_samples = Counter()
+        self.samples = 0
+        self.failures = []
+
+    # Shared RNG: workers draw from it in whatever order they run, so only
+    # the user choices of a single-worker run are reproducible
+
+    def rng_random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def rng_choice(self, values):
+        with self._rng_lock:
+            return self._rng.choice(values)
+
+    def rng_amount(self):
+        with self._rng_lock:
+            return min(9000, max(1, int(self._rng.lognormvariate(3.0, 1.2))))
+
+    def pick_user(self, exclude=None):
+        with self._rng_lock:
+            while True:
+                user = self.user_ids[int(len(self.user_ids) * self._rng.random() ** SKEW)]
+                if user != exclude:
+                    return user
+
+    def _connect(self):
+        kwargs = db.parse_database_url(db.get_database_url())
+        kwargs["application_name"] = APPLICATION_NAME
+        conn = psycopg2.connect(**kwargs)
+        if self.lock_timeout:
+            with conn.cursor() as cur:
+                cur.execute("SET lock_timeout = %s", (int(self.lock_timeout),))
+            conn.commit()
+        return conn
+
+    def _start_challenge(self):
+        """Queue the next create if any are left; called with self._lock held"""
+        if self._started_challenges < self.challenges:
+            self._started_challenges += 1
+            self._tasks.put(("create", Challenge(self.pick_user()), None))
+
+    def _finish_challenge(self, challenge):
+        with self._lock:
+            if challenge.finished:
+                return
+            challenge.finished = True
+            self._finished_challenges += 1
+            self._start_challenge()
+            if self._finished_challenges == self.challenges:
+                self._done.set()
+
+    def _run_step(self, conn, step, challenge, arg):
+        """Run one step to commit, retrying retryable errors; returns its result"""
+        function = STEP_FUNCTIONS[step]
+        for attempt in range(RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                with conn.cursor() as cur:
+                    result = function(self, cur, challenge, arg)
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                kind = RETRYABLE.get(e.pgcode)
+                with self._lock:
+                    self.errors[kind or e.pgcode or type(e).__name__] += 1
+                if kind is None or attempt == RETRIES:
+                    raise
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+                continue
+            with self._lock:
+                self.latencies[step].append(time.perf_counter() - started)
+            return result
+
+    def _after(self, step, challenge, result):
+        """Queue follow-up steps; finishes the challenge when its last step is done"""
+        if step == "join":
+            with self._lock:
+                challenge.joins_left -= 1
+                if result:
+                    challenge.acceptor = result
+                elif result is False:
+                    self.lost_joins += 1
+                abandoned = challenge.joins_left == 0 and challenge.acceptor is None
+            if result:
+                self._tasks.put(("acceptor_stake", challenge, None))
+            elif abandoned:
+                # No joiner got in (taken outside the run, or the joins failed)
+                self._finish_challenge(challenge)
+            return
+        for task in result:
+            self._tasks.put(task)
+        if step in ("resolve", "cancel"):
+            self._finish_challenge(challenge)
+
+    def _worker(self, conn):
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                step, challenge, arg = task
+                try:
+                    result = self._run_step(conn, step, challenge, arg)
+                    if step == "join":
+                        # The joining user, or False if another user got there first
+                        result = arg if result else False
+                except Exception as e:
+                    with self._lock:
+                        self.failures.append(f"{step} challenge {challenge.id}: {e}".strip())
+                    if step != "join":
+                        # Give up on this challenge, but keep the run going
+                        self._finish_challenge(challenge)
+                        continue
+                    result = None
+                self._after(step, challenge, result)
+        finally:
+            conn.close()
+
+    def _monitor(self, conn):
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self._stop_monitor.wait(self.sample_interval):
+                    cur.execute(
+                        """
+                        SELECT wait_event, count(*) FROM pg_stat_activity
+                        WHERE application_name = %s AND wait_event_type = 'Lock' AND pid <> pg_backend_pid()
+                        GROUP BY wait_event
+                        """,
+                        (APPLICATION_NAME,),
+                    )
+                    rows = cur.fetchall()
+                    with self._lock:
+                        self.samples += 1
+                        for event, count in rows:
+                            self.lock_samples[event] += count
+        finally:
+            conn.close()
+
+    def _server_deadlocks(self):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()")
+                return cur.fetchone()[0]
+        finally:
+            conn.close()
+
+    def _open_connections(self):
+        """One connection per worker plus the monitor's, all or none"""
+        conns = []
+        try:
+            for _ in range(self.workers + 1):
+                conns.append(self._connect())
+        except psycopg2.Error as e:
+            for conn in conns:
+                conn.close()
+            raise SimulationError(
+                f"could not open connection {len(conns) + 1} of {self.workers + 1}: {str(e).strip()}"
+            )
+        return conns
+
+    def run(self):
+        """Drive every challenge to completion; returns the report dict"""
+        deadlocks_before = self._server_deadlocks()
+        monitor_conn, *worker_conns = self._open_connections()
+        with self._lock:
+            for _ in range(min(self.in_flight, self.challenges)):
+                self._start_challenge()
+        if not self.challenges:
+            self._done.set()
+
+        monitor = threading.Thread(target=self._monitor, args=(monitor_conn,), daemon=True)
+        threads = [threading.Thread(target=self._worker, args=(conn,), daemon=True) for conn in worker_conns]
+        started = time.monotonic()
+        monitor.start()
+        for thread in threads:
+            thread.start()
+        try:
+            # A worker that died would leave its challenge unfinished forever
+            while not self._done.wait(0.5):
+                if not all(thread.is_alive() for thread in threads):
+                    raise SimulationError(
+                        f"a worker thread died with {self._finished_challenges}/{self.challenges} "
+                        "challenges finished"
+                    )
+        finally:
+            elapsed = time.monotonic() - started
+            if not self._done.is_set():
+                # Abandon queued steps so the remaining workers stop promptly
+                while True:
+                    try:
+                        self._tasks.get_nowait()
+                    except queue.Empty:
+                        break
+            for _ in threads:
+                self._tasks.put(None)
+            for thread in threads:
+                thread.join()
+            self._stop_monitor.set()
+            monitor.join()
+        return self.report(elapsed, self._server_deadlocks() - deadlocks_before)
+
+    def report(self, elapsed, server_deadlocks):
+        steps = {}
+        for step in STEPS:
+            ordered = sorted(self.latencies.get(step, []))
+            if not ordered:
+                continue
+            steps[step] = {
+                "count": len(ordered),
+                "p50_ms": _percentile(ordered, 0.50) * 1000,
+                "p95_ms": _percentile(ordered, 0.95) * 1000,
+                "p99_ms": _percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        transactions = sum(s["count"] for s in steps.values())
+        return {
+            "run_id": self.run_id,
+            "challenges": self.challenges,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "joiners": self.joiners,
+            "seconds": elapsed,
+            "transactions": transactions,
+            "tps": transactions / elapsed if elapsed else 0.0,
+            "steps": steps,
+            "lost_joins": self.lost_joins,
+            "errors": dict(self.errors),
+            "server_deadlocks": server_deadlocks,
+            "lock_wait_seconds": sum(self.lock_samples.values()) * self.sample_interval,
+            "lock_waits_by_event": dict(self.lock_samples),
+            "lock_samples": self.samples,
+            "failed_steps": len(self.failures),
+            "failures": self.failures[:20],
+        }
+
+
+STEP_FUNCTIONS = {
+    "create": _create,
+    "creator_stake": _creator_stake,
+    "join": _join,
+    "acceptor_stake": _acceptor_stake,
+    "vote": _vote,
+    "resolve": _resolve,
+    "cancel": _cancel,
+}
+
+
+def load_users(conn, limit=10000, prefix=None):
+    """Up to `limit` user ids (oldest first, so the skew favours long-time users)"""
+    with conn.cursor() as cur:
+        if prefix:
+            cur.execute("SELECT id FROM users WHERE id LIKE %s ORDER BY created_at, id LIMIT %s",
+                        (prefix.replace("_", r"\_") + "%", limit))
+        else:
+            cur.execute("SELECT id FROM users ORDER BY created_at, id LIMIT %s", (limit,))
+        users = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return users
+
+
+def run(challenges=1000, workers=8, users=10000, prefix=None, **kwargs):
+    """Simulate `challenges` lifecycles with `workers` threads; returns the report"""
+    with db.connection() as conn:
+        user_ids = load_users(conn, users, prefix)
+    return Simulation(user_ids, challenges, workers, **kwargs).run()
+
+
+def print_report(report):
+    print(f"\n📊 loadsim {report['run_id']}: {report['challenges']:,} challenges, "
+          f"{report['workers']} workers, {report['in_flight']} in flight, {report['joiners']} joiners each")
+    print(f"   {report['transactions']:,} transactions in {report['seconds']:.1f}s "
+          f"({report['tps']:,.0f}/s)\n")
+    print(f"   {'step':16} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step, s in report["steps"].items():
+        print(f"   {step:16} {s['count']:>8,} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} "
+              f"{s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+    errors = report["errors"]
+    print(f"\n   🔒 Lock waits: ~{report['lock_wait_seconds']:.2f}s across sessions "
+          f"({report['lock_samples']:,} samples)")
+    for event, count in sorted(report["lock_waits_by_event"].items(), key=lambda kv: -kv[1]):
+        print(f"      {event}: {count:,} sample(s)")
+    print(f"   💀 Deadlocks: {errors.get('deadlocks', 0)} caught and retried "
+          f"({report['server_deadlocks']} in pg_stat_database)")
+    for kind in ("serialization_failures", "lock_timeouts"):
+        if errors.get(kind):
+            print(f"   ⚠️  {kind.replace('_', ' ')}: {errors[kind]}")
+    print(f"   🏁 Joins lost to another user: {report['lost_joins']:,}")
+    if report["failed_steps"]:
+        print(f"\n   ❌ {report['failed_steps']} step(s) failed after retries:")
+        for failure in report["failures"]:
+            print(f"      {failure}")
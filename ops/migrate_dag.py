@@ -0,0 +1,260 @@
+"""
+Dependency-aware parallel execution of migration statements.
+
+Each statement becomes a node that touches a set of objects (tables, plus
+index names for CREATE/DROP INDEX). A node depends on the previous node for
+every object it touches, so statements on the same table keep their file
+order while, say, index builds on different tables run at the same time.
+Statements whose objects cannot be determined (DO blocks, functions, types)
+are barriers: they wait for everything before them and everything after
+waits for them.
+
+    nodes = migrate_dag.build_dag([(tag, sql), ...])
+    migrate_dag.run_dag(nodes, jobs=4, classify_error=...)
+    migrate_dag.print_report(nodes, wall_time)
+
+Every worker holds one pooled connection in autocommit mode for the whole
+run, so each statement is its own transaction.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ops import db, sqllex
+
+IDENT = sqllex.IDENT
+
+TABLE_PATTERNS = [
+    rf'\bCREATE\s+(?:UNLOGGED\s+|TEMP(?:ORARY)?\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?({IDENT})',
+    rf'\bALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({IDENT})',
+    rf'\bDROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?({IDENT})',
+    rf'\bINDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(?:{IDENT}\s+)?ON\s+(?:ONLY\s+)?({IDENT})',
+    rf'\bREFERENCES\s+({IDENT})',
+    rf'\bINSERT\s+INTO\s+({IDENT})',
+    rf'\bUPDATE\s+(?:ONLY\s+)?({IDENT})\s+SET\b',
+    rf'\bDELETE\s+FROM\s+(?:ONLY\s+)?({IDENT})',
+    rf'\b(?:FROM|JOIN)\s+({IDENT})',
+    rf'\bTRIGGER\s+{IDENT}\s+.*?\bON\s+({IDENT})',
+    rf'\bPOLICY\s+{IDENT}\s+ON\s+({IDENT})',
+]
+
+INDEX_NAME_PATTERNS = [
+    rf'\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({IDENT})\s+ON\b',
+    rf'\bDROP\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?({IDENT})',
+    rf'\bALTER\s+INDEX\s+(?:IF\s+EXISTS\s+)?({IDENT})',
+]
+
+BARRIER_PATTERNS = [
+    r'^\s*DO\b',
+    r'\bCREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\b',
+    r'\bCREATE\s+TYPE\b',
+    r'\bCREATE\s+EXTENSION\b',
+    r'\bCREATE\s+SCHEMA\b',
+]
+
+SYSTEM_SCHEMAS = ("information_schema.", "pg_catalog.")
+
+
+def statement_objects(sql):
+    """Objects a statement touches, or None if it must run as a barrier"""
+    text = sqllex.mask_literals(sql)
+    if any(re.search(p, text, re.IGNORECASE) for p in BARRIER_PATTERNS):
+        return None
+
+    objects = set()
+    for pattern in TABLE_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE | re.DOTALL):
+            name = sqllex.normalize_identifier(match.group(1))
+            if not name.startswith(SYSTEM_SCHEMAS) and not name.startswith(("pg_", "information_schema")):
+                objects.add(f"table:{name}")
+    for pattern in INDEX_NAME_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            objects.add(f"index:{sqllex.normalize_identifier(match.group(1))}")
+
+    return objects or None
+
+
+class Node:
+    """One migration statement plus its scheduling and timing state"""
+
+    def __init__(self, index, tag, sql, objects):
+        self.index = index
+        self.tag = tag
+        self.sql = sql
+        self.objects = objects
+        self.deps = set()
+        self.dependents = set()
+        self.status = "pending"     # pending, applied, skipped, failed, blocked
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def label(self):
+        first_line = " ".join(self.sql.split())[:70]
+        return f"{self.tag}#{self.index}: {first_line}"
+
+
+def build_dag(statements):
+    """Nodes with dependency edges for [(tag, sql), ...] in file order"""
+    nodes = []
+    last_touch = {}
+    since_barrier = []
+    barrier = None
+
+    for i, (tag, sql) in enumerate(statements):
+        node = Node(i, tag, sql, statement_objects(sql))
+        if node.objects is None:
+            # Barrier: after everything since the previous barrier
+            node.deps.update(n.index for n in since_barrier)
+            if barrier is not None:
+                node.deps.add(barrier.index)
+            barrier = node
+            since_barrier = []
+            last_touch = {}
+        else:
+            for obj in node.objects:
+                if obj in last_touch:
+                    node.deps.add(last_touch[obj])
+            if barrier is not None:
+                node.deps.add(barrier.index)
+            for obj in node.objects:
+                last_touch[obj] = i
+            since_barrier.append(node)
+        nodes.append(node)
+
+    for node in nodes:
+        for dep in node.deps:
+            nodes[dep].dependents.add(node.index)
+    return nodes
+
+
+def run_dag(nodes, jobs=4, classify_error=None):
+    """Execute nodes on `jobs` worker connections; returns True if nothing failed.
+
+    classify_error(node, exc) returns 'skipped' for tolerable errors (e.g.
+    "already exists") or 'failed'. Dependents of a failed node are blocked.
+    """
+    local = threading.local()
+    held = []
+    held_lock = threading.Lock()
+
+    def worker_conn():
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = db.connect()
+            conn.autocommit = True
+            local.conn = conn
+            with held_lock:
+                held.append(conn)
+        return conn
+
+    def execute(node):
+        conn = worker_conn()
+        node.started = time.monotonic()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(node.sql)
+            node.status = "applied"
+        except Exception as e:
+            node.error = e
+            node.status = classify_error(node, e) if classify_error else "failed"
+        finally:
+            node.finished = time.monotonic()
+        return node
+
+    remaining = {n.index: len(n.deps) for n in nodes}
+    ready = [n for n in nodes if not n.deps]
+    running = set()
+    ok = True
+
+    def block(node):
+        for dep_index in node.dependents:
+            dependent = nodes[dep_index]
+            if dependent.status == "pending":
+                dependent.status = "blocked"
+                block(dependent)
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while ready or running:
+                while ready:
+                    node = ready.pop(0)
+                    if node.status == "blocked":
+                        continue
+                    running.add(pool.submit(execute, node))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = future.result()
+                    if node.status == "applied":
+                        print(f"   ✓ {node.label} ({node.duration * 1000:.0f}ms)")
+                    elif node.status == "skipped":
+                        print(f"   ⚠️  {node.label}: {str(node.error).strip().splitlines()[0]}")
+                    else:
+                        ok = False
+                        print(f"   ✗ {node.label}: {str(node.error).strip()[:80]}")
+                        block(node)
+                    for dep_index in sorted(node.dependents):
+                        remaining[dep_index] -= 1
+                        if remaining[dep_index] == 0:
+                            ready.append(nodes[dep_index])
+    finally:
+        for conn in held:
+            conn.autocommit = False
+            conn.close()
+
+    blocked = [n for n in nodes if n.status == "blocked"]
+    if blocked:
+        print(f"   ⛔ {len(blocked)} statements not run because a dependency failed")
+    return ok
+
+
+def critical_path(nodes):
+    """(length in seconds, [nodes]) of the longest duration-weighted dependency chain"""
+    best = {}
+    prev = {}
+    for node in nodes:
+        base, via = 0.0, None
+        for dep in node.deps:
+            if best[dep] > base:
+                base, via = best[dep], dep
+        best[node.index] = base + node.duration
+        prev[node.index] = via
+    if not best:
+        return 0.0, []
+    end = max(best, key=best.get)
+    path = []
+    cursor = end
+    while cursor is not None:
+        path.append(nodes[cursor])
+        cursor = prev[cursor]
+    return best[end], list(reversed(path))
+
+
+def print_report(nodes, wall_time):
+    """Timing summary: wall clock vs serial sum vs critical path"""
+    serial = sum(n.duration for n in nodes)
+    length, path = critical_path(nodes)
+    counts = {}
+    for n in nodes:
+        counts[n.status] = counts.get(n.status, 0) + 1
+
+    print("\n⏱️  Migration timing report")
+    print(f"   Statements: {len(nodes)} ({', '.join(f'{k}: {v}' for k, v in sorted(counts.items()))})")
+    print(f"   Wall time: {wall_time:.2f}s")
+    print(f"   Serial time (sum of statements): {serial:.2f}s")
+    print(f"   Critical path: {length:.2f}s over {len(path)} statements")
+    if wall_time > 0:
+        print(f"   Speedup vs serial: {serial / wall_time:.2f}x")
+    for node in path:
+        print(f"     {node.duration:7.2f}s  {node.label}")
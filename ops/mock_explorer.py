@@ -0,0 +1,196 @@
+"""
+Local stand-in for an Etherscan-family API, for exercising ops/explorer.py.
+
+    python -m ops.mock_explorer --port 8765 --rate 5
+    python verify-basescan-api.py --api http://127.0.0.1:8765/api
+
+or in-process:
+
+    async with MockExplorer(rate=5, pending_polls=2) as mock:
+        async with explorer.Client(mock.url, "test") as client:
+            ...
+
+It implements verifysourcecode, checkverifystatus and getsourcecode with the
+explorer's quirks: "Max rate limit reached" above `rate` requests per
+second, "Pending in queue" for the first `pending_polls` status checks of a
+GUID, "Unable to locate ContractCode" for addresses in `unindexed` (for that
+many submissions), and "Fail - Unable to verify" for addresses in `failing`.
+JSON-RPC POSTs to `rpc_url` answer eth_getCode with made-up bytecode per
+address (none for addresses in `codeless`), so explorer.code_hashes() and
+the status cache can be tried against it too.
+Connections are kept alive, as aiohttp expects. Standard library only.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import urllib.parse
+import uuid
+from collections import deque
+
+
+class MockExplorer:
+    def __init__(self, host="127.0.0.1", port=0, rate=5, pending_polls=2, unindexed=None, failing=(),
+                 codeless=()):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.pending_polls = pending_polls
+        self.unindexed = {a.lower(): n for a, n in (unindexed or {}).items()}
+        self.failing = {a.lower() for a in failing}
+        self.codeless = {a.lower() for a in codeless}
+        self.verified = {}
+        self.guids = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self._recent = deque()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/api"
+
+    @property
+    def rpc_url(self):
+        return f"http://{self.host}:{self.port}/rpc"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _over_limit(self):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        if self.rate and len(self._recent) >= self.rate:
+            return True
+        self._recent.append(now)
+        return False
+
+    def handle(self, params):
+        """JSON body for one API request"""
+        self.requests += 1
+        if self._over_limit():
+            self.rate_limited += 1
+            return {"status": "0", "message": "NOTOK", "result": "Max rate limit reached"}
+
+        action = params.get("action")
+        if action == "verifysourcecode":
+            address = params.get("contractaddress", "").lower()
+            if address in self.verified:
+                return {"status": "0", "message": "NOTOK", "result": "Contract source code already verified"}
+            if self.unindexed.get(address, 0) > 0:
+                self.unindexed[address] -= 1
+                return {"status": "0", "message": "NOTOK",
+                        "result": f"Unable to locate ContractCode at {address}"}
+            guid = uuid.uuid4().hex + uuid.uuid4().hex[:18]
+            self.guids[guid] = {"address": address, "polls": 0, "params": params}
+            return {"status": "1", "message": "OK", "result": guid}
+
+        if action == "checkverifystatus":
+            job = self.guids.get(params.get("guid"))
+            if job is None:
+                return {"status": "0", "message": "NOTOK", "result": "Unable to locate GUID"}
+            job["polls"] += 1
+            if job["polls"] <= self.pending_polls:
+                return {"status": "0", "message": "NOTOK", "result": "Pending in queue"}
+            if job["address"] in self.failing:
+                return {"status": "0", "message": "NOTOK", "result": "Fail - Unable to verify"}
+            self.verified[job["address"]] = job["params"]
+            return {"status": "1", "message": "OK", "result": "Pass - Verified"}
+
+        if action == "getsourcecode":
+            submitted = self.verified.get(params.get("address", "").lower())
+            row = {
+                "SourceCode": submitted.get("sourceCode", "") if submitted else "",
+                "ContractName": submitted.get("contractname", "") if submitted else "",
+                "CompilerVersion": submitted.get("compilerversion", "") if submitted else "",
+            }
+            return {"status": "1", "message": "OK", "result": [row]}
+
+        return {"status": "0", "message": "NOTOK", "result": f"Unknown action {action}"}
+
+    def handle_rpc(self, payload):
+        """JSON-RPC reply (or batch of replies) for eth_getCode"""
+        if isinstance(payload, list):
+            return [self.handle_rpc(call) for call in payload]
+        reply = {"jsonrpc": "2.0", "id": payload.get("id")}
+        if payload.get("method") != "eth_getCode":
+            reply["error"] = {"code": -32601, "message": "the method does not exist"}
+            return reply
+        address = payload["params"][0].lower()
+        reply["result"] = "0x" if address in self.codeless else "0x6080604052" + address[2:]
+        return reply
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+
+                url = urllib.parse.urlsplit(target)
+                if url.path == "/rpc":
+                    payload = json.dumps(self.handle_rpc(json.loads(body))).encode()
+                else:
+                    params = dict(urllib.parse.parse_qsl(url.query))
+                    if method == "POST":
+                        params.update(urllib.parse.parse_qsl(body.decode()))
+                    payload = json.dumps(self.handle(params)).encode()
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n".encode()
+                    + b"Connection: keep-alive\r\n\r\n"
+                    + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # An idle keep-alive connection still open when the loop shuts down
+            pass
+        finally:
+            writer.close()
+
+
+async def _main(args):
+    async with MockExplorer(args.host, args.port, rate=args.rate, pending_polls=args.pending_polls) as mock:
+        print(f"🧪 Mock explorer on {mock.url} (rate {args.rate}/s, {args.pending_polls} pending polls)")
+        print(f"   eth_getCode on {mock.rpc_url}")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Etherscan-style verification API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=int, default=5, help="requests per second before 'Max rate limit reached'")
+    parser.add_argument("--pending-polls", type=int, default=2)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,361 @@
+"""
+Batched, re-runnable ingestion of ChallengeFactory events into challenges.
+
+    from ops import db, evm, onchain
+
+    events = onchain.factory_events()
+    logs = onchain.read_jsonl("events.jsonl", events, chain_id=84532)
+    # or: onchain.read_rpc(evm.Rpc(url), factory, events, from_block, to_block, chain_id)
+    counts = onchain.ingest(db.connect(), logs)
+
+ChallengeCreatedP2P, CreatorStakeLocked and ParticipantStakeLocked are
+first folded into one state per (chain id, contract, on-chain challenge id),
+so the input can arrive in any order and split across files. Each batch of
+challenges is one transaction:
+- The states are loaded into a temp table.
+- They are matched to existing rows on blockchain_challenge_id (within the
+  chain and contract, so a redeployed factory's ids start new rows) or
+  blockchain_creation_tx_hash.
+- Matched rows are updated with one set-based UPDATE. Rows that would not
+  change are skipped.
+- Challenges seen only on chain are inserted.
+
+Values are merged, never accumulated:
+- Stake flags only go from false to true.
+- Hashes, users and the contract address already set on the row are kept.
+Running the same input again therefore writes nothing. Stake events whose
+creation is neither in the input nor in the table are reported as orphans.
+Rerun once their creation has been ingested.
+
+Wallets map to users through users.wallet_address and, where it exists,
+user_wallet_addresses. The blockchain_* columns come from migrations 0006
+and phase3-blockchain.sql.
+"""
+
+import json
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ops import artifacts, catalog, evm, tokens
+
+EVENTS = ["ChallengeCreatedP2P", "CreatorStakeLocked", "ParticipantStakeLocked"]
+DEFAULT_ARTIFACTS = Path(__file__).resolve().parents[1] / "contracts" / "artifacts"
+BATCH_SIZE = 1000
+LOCK_KEY = "ops.onchain"
+BIGINT_MAX = 2 ** 63 - 1
+ZERO_ADDRESS = "0x" + "0" * 40
+# challenges column -> the migration that adds it
+REQUIRED_COLUMNS = {
+    "blockchain_challenge_id": "0006_add_p2p_blockchain_fields.sql",
+    "blockchain_created_at": "0006_add_p2p_blockchain_fields.sql",
+    "blockchain_accepted_at": "0006_add_p2p_blockchain_fields.sql",
+    "blockchain_chain_id": "phase3-blockchain.sql",
+    "blockchain_contract_address": "phase3-blockchain.sql",
+    "blockchain_creation_tx_hash": "phase3-blockchain.sql",
+    "blockchain_block_number": "phase3-blockchain.sql",
+}
+
+Log = namedtuple("Log", "chain_id contract tx_hash log_index block_number timestamp name args")
+
+STATE_COLUMNS = [
+    ("chain_id", "int"), ("challenge_id", "text"), ("contract", "text"), ("created", "boolean"),
+    ("creation_tx", "text"), ("block_number", "bigint"), ("created_at", "timestamp"),
+    ("creator", "text"), ("participant", "text"), ("token", "text"), ("stake_wei", "bigint"),
+    ("amount", "numeric"), ("creator_staked", "boolean"), ("creator_tx", "text"),
+    ("acceptor_staked", "boolean"), ("acceptor_tx", "text"), ("accepted_at", "timestamp"),
+    ("creator_user", "text"), ("participant_user", "text"),
+]
+
+# challenges column -> merged value (c = existing row, i = incoming state)
+MERGE = {
+    "blockchain_challenge_id": "i.challenge_id",
+    "blockchain_chain_id": "i.chain_id",
+    "blockchain_contract_address": "coalesce(c.blockchain_contract_address, i.contract)",
+    "blockchain_creation_tx_hash": "coalesce(c.blockchain_creation_tx_hash, i.creation_tx)",
+    "blockchain_block_number": "coalesce(c.blockchain_block_number, i.block_number)",
+    "blockchain_created_at": "coalesce(c.blockchain_created_at, i.created_at)",
+    "blockchain_accepted_at": "coalesce(c.blockchain_accepted_at, i.accepted_at)",
+    "payment_token_address": "coalesce(i.token, c.payment_token_address)",
+    "stake_amount_wei": "coalesce(i.stake_wei, c.stake_amount_wei)",
+    "challenger": "coalesce(c.challenger, i.creator_user)",
+    "challenged": "coalesce(c.challenged, i.participant_user)",
+    "creator_transaction_hash": "coalesce(c.creator_transaction_hash, i.creator_tx)",
+    "acceptor_transaction_hash": "coalesce(c.acceptor_transaction_hash, i.acceptor_tx)",
+    "creator_staked": "coalesce(c.creator_staked, false) OR i.creator_staked",
+    "acceptor_staked": "coalesce(c.acceptor_staked, false) OR i.acceptor_staked",
+    "on_chain_status": """CASE
+        WHEN c.on_chain_status IN ('completed', 'failed') THEN c.on_chain_status
+        WHEN (coalesce(c.creator_staked, false) OR i.creator_staked)
+         AND (coalesce(c.acceptor_staked, false) OR i.acceptor_staked) THEN 'active'
+        WHEN i.created THEN coalesce(nullif(c.on_chain_status, 'pending'), 'confirmed')
+        ELSE c.on_chain_status END""",
+    "status": """CASE
+        WHEN c.status IN ('open', 'pending')
+         AND (coalesce(c.creator_staked, false) OR i.creator_staked)
+         AND (coalesce(c.acceptor_staked, false) OR i.acceptor_staked) THEN 'active'
+        ELSE c.status END""",
+}
+
+INSERT_SQL = """
+    INSERT INTO challenges (
+        title, description, category, amount, status, admin_created, challenger, challenged,
+        payment_token_address, stake_amount_wei, on_chain_status, creator_staked, acceptor_staked,
+        creator_transaction_hash, acceptor_transaction_hash, blockchain_challenge_id,
+        blockchain_chain_id, blockchain_contract_address, blockchain_creation_tx_hash,
+        blockchain_block_number, blockchain_created_at, blockchain_accepted_at, created_at
+    )
+    SELECT 'On-chain challenge #' || i.challenge_id, 'Ingested from on-chain events', 'p2p',
+           i.amount, CASE WHEN i.creator_staked AND i.acceptor_staked THEN 'active' ELSE 'open' END,
+           false, i.creator_user, i.participant_user, i.token, i.stake_wei,
+           CASE WHEN i.creator_staked AND i.acceptor_staked THEN 'active' ELSE 'confirmed' END,
+           i.creator_staked, i.acceptor_staked, i.creator_tx, i.acceptor_tx, i.challenge_id,
+           i.chain_id, i.contract, i.creation_tx, i.block_number, i.created_at, i.accepted_at,
+           coalesce(i.created_at, now())
+    FROM ops_onchain_incoming i
+    WHERE i.row_id IS NULL AND i.created
+"""
+
+
+class IngestError(Exception):
+    pass
+
+
+def factory_events(artifacts_dir=DEFAULT_ARTIFACTS):
+    """{topic0: evm.Event} for the ingested events, from the ChallengeFactory artifact"""
+    artifact = artifacts.find(artifacts.index(artifacts_dir), "ChallengeFactory")
+    with open(artifact.path, "r") as f:
+        abi = json.load(f)["abi"]
+    return evm.events_from_abi(abi, EVENTS)
+
+
+def _int(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return int(value, 16) if value.startswith("0x") else int(value)
+    return int(value)
+
+
+def _timestamp(value):
+    """Unix seconds (int or hex) -> ISO string for the timestamp columns"""
+    seconds = _int(value)
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None).isoformat(sep=" ")
+
+
+def from_raw(events, log, chain_id):
+    """Log for an eth_getLogs entry, or None if it is not one of `events` (or was removed)"""
+    if log.get("removed"):
+        return None
+    decoded = evm.decode_log(events, log)
+    if decoded is None:
+        return None
+    name, args = decoded
+    return Log(
+        _int(log.get("chainId")) or chain_id, (log.get("address") or "").lower() or None,
+        log["transactionHash"].lower(), _int(log.get("logIndex")) or 0, _int(log.get("blockNumber")),
+        _timestamp(log.get("blockTimestamp") or log.get("timestamp")), name, args,
+    )
+
+
+def _from_decoded(events, entry, chain_id):
+    """Log for an already-decoded JSONL entry: {"event", "args"} or fetch_tx_logs.js's {"parsed"}"""
+    parsed = entry.get("parsed") or entry
+    name = parsed.get("event") or parsed.get("name")
+    event = next((e for e in events.values() if e.name == name), None)
+    if event is None:
+        return None
+    args = parsed.get("args") or {}
+    if isinstance(args, list):
+        args = {arg["name"]: value for arg, value in zip(event.inputs, args)}
+    args = {k: (v.lower() if isinstance(v, str) and v.startswith("0x") else v) for k, v in args.items()}
+    for arg in event.inputs:
+        if arg["type"].startswith(("uint", "int")) and arg["name"] in args:
+            args[arg["name"]] = _int(args[arg["name"]])
+    tx_hash = entry.get("transactionHash") or entry.get("tx_hash")
+    if not tx_hash:
+        raise IngestError(f"{name} event without a transaction hash")
+    return Log(
+        _int(entry.get("chainId") or entry.get("chain_id")) or chain_id,
+        (entry.get("address") or "").lower() or None, tx_hash.lower(),
+        _int(entry.get("logIndex", entry.get("log_index"))) or 0,
+        _int(entry.get("blockNumber", entry.get("block_number"))),
+        _timestamp(entry.get("blockTimestamp") or entry.get("timestamp")), name, args,
+    )
+
+
+def read_jsonl(path, events, chain_id):
+    """Yield Logs from a JSONL file of raw logs or decoded events (other lines are skipped)"""
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise IngestError(f"{path}:{number}: {e}")
+            log = from_raw(events, entry, chain_id) if "topics" in entry else _from_decoded(events, entry, chain_id)
+            if log is not None:
+                yield log
+
+
+def read_rpc(rpc, address, events, from_block, to_block, chain_id=None, chunk=2000):
+    """Yield Logs for `events` emitted by `address` in [from_block, to_block]"""
+    chain_id = chain_id or rpc.chain_id()
+    for raw in rpc.get_logs(address, [list(events)], from_block, to_block, chunk):
+        log = from_raw(events, raw, chain_id)
+        if log is not None:
+            yield log
+
+
+def fold(logs):
+    """{(chain_id, contract, challenge_id): state} merging every event of each challenge in chain order"""
+    grouped = {}
+    for log in logs:
+        grouped.setdefault((log.chain_id, log.contract, str(log.args["challengeId"])), []).append(log)
+
+    states = {}
+    for (chain_id, contract, challenge_id), challenge_logs in grouped.items():
+        state = {name: None for name, _ in STATE_COLUMNS}
+        state.update(chain_id=chain_id, contract=contract, challenge_id=challenge_id, created=False,
+                     creator_staked=False, acceptor_staked=False)
+        for log in sorted(challenge_logs, key=lambda l: (l.block_number or 0, l.log_index)):
+            args = log.args
+            if log.name == "ChallengeCreatedP2P":
+                stake = args["stakeAmount"]
+                token = tokens.lookup(args["paymentToken"], chain_id)
+                participant = args["participant"]
+                state.update(
+                    created=True, creation_tx=log.tx_hash, block_number=log.block_number,
+                    created_at=log.timestamp, creator=args["creator"],
+                    participant=None if participant == ZERO_ADDRESS else participant,
+                    token=args["paymentToken"],
+                    # stake_amount_wei is BIGINT; larger stakes keep only `amount`
+                    stake_wei=stake if stake <= BIGINT_MAX else None,
+                    # Unregistered tokens have unknown decimals; keep raw units
+                    amount=str(tokens.to_units(stake, token) if token else stake),
+                )
+            elif log.name == "CreatorStakeLocked":
+                state.update(creator_staked=True, creator_tx=state["creator_tx"] or log.tx_hash)
+                state["creator"] = state["creator"] or args["creator"]
+            elif log.name == "ParticipantStakeLocked":
+                state.update(acceptor_staked=True, acceptor_tx=state["acceptor_tx"] or log.tx_hash,
+                             accepted_at=state["accepted_at"] or log.timestamp)
+                state["participant"] = state["participant"] or args["participant"]
+        states[(chain_id, contract, challenge_id)] = state
+    return states
+
+
+def _users_by_wallet(cur, wallets):
+    """{lowercase wallet: user id}, one scan of users (and user_wallet_addresses) per batch"""
+    if not wallets:
+        return {}
+    found = {}
+    if catalog.snapshot(cur.connection).has_table("user_wallet_addresses"):
+        cur.execute(
+            """
+            SELECT DISTINCT ON (lower(wallet_address)) lower(wallet_address), user_id
+            FROM user_wallet_addresses WHERE lower(wallet_address) = ANY(%s)
+            ORDER BY lower(wallet_address), is_primary DESC NULLS LAST, id
+            """,
+            (wallets,),
+        )
+        found.update(cur.fetchall())
+    cur.execute(
+        """
+        SELECT DISTINCT ON (lower(wallet_address)) lower(wallet_address), id
+        FROM users WHERE lower(wallet_address) = ANY(%s)
+        ORDER BY lower(wallet_address), created_at
+        """,
+        (wallets,),
+    )
+    for wallet, user_id in cur.fetchall():
+        found.setdefault(wallet, user_id)
+    return found
+
+
+def _check_schema(conn):
+    cat = catalog.snapshot(conn, refresh=True)
+    for column, migration in REQUIRED_COLUMNS.items():
+        if not cat.has_column("challenges", column):
+            raise IngestError(f"challenges is missing {column}; run migrations/{migration}")
+
+
+def _upsert_batch(conn, batch):
+    """Merge one batch of states; returns (inserted, updated, unchanged, orphans)"""
+    with conn.cursor() as cur:
+        # One ingester at a time: matching and inserting must not interleave
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (LOCK_KEY,))
+        users = _users_by_wallet(cur, sorted({w for s in batch for w in (s["creator"], s["participant"]) if w}))
+        for state in batch:
+            state["creator_user"] = users.get(state["creator"])
+            state["participant_user"] = users.get(state["participant"])
+
+        definition = ", ".join(f"{name} {kind}" for name, kind in STATE_COLUMNS)
+        names = ", ".join(name for name, _ in STATE_COLUMNS)
+        cur.execute(f"CREATE TEMP TABLE ops_onchain_incoming ({definition}, row_id integer) ON COMMIT DROP")
+        cur.execute(
+            f"INSERT INTO ops_onchain_incoming ({names}) "
+            f"SELECT {names} FROM json_to_recordset(%s::json) AS t({definition})",
+            (json.dumps(batch),),
+        )
+        cur.execute("""
+            UPDATE ops_onchain_incoming i SET row_id = (
+                SELECT c.id FROM challenges c
+                WHERE (c.blockchain_challenge_id = i.challenge_id
+                       AND coalesce(c.blockchain_chain_id, i.chain_id) = i.chain_id
+                       -- Decoded JSONL may lack the address; match on the id alone then
+                       AND (i.contract IS NULL
+                            OR lower(coalesce(c.blockchain_contract_address, i.contract)) = i.contract))
+                   OR c.blockchain_creation_tx_hash = i.creation_tx
+                ORDER BY c.id LIMIT 1
+            )
+        """)
+
+        columns = list(MERGE)
+        merged = ", ".join(f"{expr} AS {column}" for column, expr in MERGE.items())
+        cur.execute(f"""
+            WITH merged AS (
+                SELECT c.id, {merged}
+                FROM ops_onchain_incoming i JOIN challenges c ON c.id = i.row_id
+            )
+            UPDATE challenges c SET {", ".join(f"{col} = m.{col}" for col in columns)}
+            FROM merged m
+            WHERE c.id = m.id
+              AND ({", ".join(f"c.{col}" for col in columns)})
+                  IS DISTINCT FROM ({", ".join(f"m.{col}" for col in columns)})
+        """)
+        updated = cur.rowcount
+        cur.execute("SELECT count(*) FILTER (WHERE row_id IS NOT NULL), "
+                    "count(*) FILTER (WHERE row_id IS NULL AND NOT created) FROM ops_onchain_incoming")
+        matched, orphans = cur.fetchone()
+        cur.execute(INSERT_SQL)
+        inserted = cur.rowcount
+    conn.commit()
+    return inserted, updated, matched - updated, orphans
+
+
+def ingest(conn, logs, batch_size=BATCH_SIZE, on_batch=None):
+    """Fold `logs` and merge them into challenges; returns a counts dict"""
+    _check_schema(conn)
+    events = 0
+
+    def counted():
+        nonlocal events
+        for log in logs:
+            events += 1
+            yield log
+
+    states = list(fold(counted()).values())
+    counts = {"events": events, "challenges": len(states), "inserted": 0, "updated": 0,
+              "unchanged": 0, "orphans": 0}
+    for start in range(0, len(states), batch_size):
+        result = _upsert_batch(conn, states[start:start + batch_size])
+        for key, value in zip(("inserted", "updated", "unchanged", "orphans"), result):
+            counts[key] += value
+        if on_batch:
+            on_batch(min(start + batch_size, len(states)), len(states))
+    return counts
@@ -0,0 +1,295 @@
+"""
+Online column type changes.
+
+`ALTER COLUMN ... TYPE` rewrites the whole table under an ACCESS EXCLUSIVE
+lock. change_column_type() does the same change without blocking the API:
+
+1. add a nullable shadow column of the new type (metadata-only)
+2. keep it in sync with a BEFORE INSERT OR UPDATE trigger
+3. backfill it in throttled keyset batches, one short transaction each
+4. rebuild indexes on the shadow column CONCURRENTLY
+5. swap names in one short transaction under lock_timeout, with retries
+
+    from ops import db, online_alter
+
+    conn = db.connect()
+    online_alter.change_column_type(conn, 'points_transactions', 'amount', 'bigint')
+
+`using` is a cast template with a {col} placeholder, e.g. "{col}::text".
+UNIQUE and PRIMARY KEY constraints are rebuilt on the shadow column and
+re-attached during the swap, and the column default is re-applied. Columns
+referenced by other constraints, views or policies are refused; drop those
+first (as fix_rls_policy.py does) and recreate them afterwards
+(test_online_alter.py checks the defaulted-column path on a scratch table).
+"""
+
+import re
+import time
+
+from psycopg2 import errors
+
+from ops import catalog
+from ops.progress import Progress, estimate_rows
+
+SHADOW_SUFFIX = "__ops_new"
+
+
+class OnlineAlterError(Exception):
+    pass
+
+
+def _names(table, column):
+    base = f"{table}_{column}"[:40]
+    return {
+        "shadow": f"{column}{SHADOW_SUFFIX}",
+        "function": f"ops_sync_{base}",
+        "trigger": f"ops_sync_{base}",
+        "check": f"ops_nn_{base}",
+    }
+
+
+def _blocking_dependencies(conn, table, column):
+    """Objects other than indexes and the default (constraints, views, policies, sequences) that use the column"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT pg_describe_object(d.classid, d.objid, d.objsubid)
+            FROM pg_depend d
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            LEFT JOIN pg_class c ON d.classid = 'pg_class'::regclass AND c.oid = d.objid
+            LEFT JOIN pg_constraint k ON d.classid = 'pg_constraint'::regclass AND k.oid = d.objid
+            WHERE d.refobjid = %s::regclass
+              AND a.attname = %s
+              AND d.deptype IN ('n', 'a')
+              -- The column default is re-applied by _swap()
+              AND d.classid <> 'pg_attrdef'::regclass
+              AND c.relkind IS DISTINCT FROM 'i'
+              AND coalesce(k.contype, '') NOT IN ('u', 'p')
+            """,
+            (table, column),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+def _dependent_indexes(conn, table, column):
+    """(name, definition) of indexes that use the column"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ic.relname, pg_get_indexdef(ic.oid)
+            FROM pg_depend d
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            JOIN pg_class ic ON ic.oid = d.objid
+            WHERE d.refobjid = %s::regclass
+              AND a.attname = %s
+              AND d.classid = 'pg_class'::regclass
+              AND ic.relkind = 'i'
+            """,
+            (table, column),
+        )
+        return cur.fetchall()
+
+
+def _key_constraints(conn, table, column):
+    """(constraint, type, index name, index definition) of UNIQUE/PRIMARY KEY constraints on the column"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT con.conname, con.contype, ic.relname, pg_get_indexdef(con.conindid)
+            FROM pg_constraint con
+            JOIN pg_class ic ON ic.oid = con.conindid
+            JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = ANY(con.conkey)
+            WHERE con.conrelid = %s::regclass
+              AND con.contype IN ('u', 'p')
+              AND a.attname = %s
+            """,
+            (table, column),
+        )
+        return cur.fetchall()
+
+
+def _shadow_index_sql(definition, name, column, shadow):
+    """Rewrite a pg_get_indexdef() statement to build the index on the shadow column"""
+    head, using, tail = definition.partition(" USING ")
+    head = head.replace(f"INDEX {name} ON", f"INDEX CONCURRENTLY IF NOT EXISTS {name}{SHADOW_SUFFIX} ON", 1)
+    tail = re.sub(rf'\b{re.escape(column)}\b', shadow, tail)
+    return head + using + tail
+
+
+def _execute_autocommit(conn, sql, params=None):
+    previous = conn.autocommit
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+    finally:
+        conn.autocommit = previous
+
+
+def _prepare(conn, table, column, new_type, expr, names, not_null):
+    """Shadow column, sync trigger and NOT NULL check (each a short transaction)"""
+    shadow = names["shadow"]
+    new_expr = expr.format(col=f"NEW.{column}")
+    with conn.cursor() as cur:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadow} {new_type}")
+        conn.commit()
+
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION {names['function']}() RETURNS trigger
+            LANGUAGE plpgsql AS $ops$
+            BEGIN
+                NEW.{shadow} := {new_expr};
+                RETURN NEW;
+            END
+            $ops$
+        """)
+        cur.execute(f"DROP TRIGGER IF EXISTS {names['trigger']} ON {table}")
+        cur.execute(f"""
+            CREATE TRIGGER {names['trigger']}
+            BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {names['function']}()
+        """)
+        conn.commit()
+
+        if not_null:
+            # NOT VALID now, VALIDATE after the backfill: SET NOT NULL then
+            # reuses the validated check instead of scanning under the lock
+            cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {names['check']}")
+            cur.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {names['check']} "
+                f"CHECK ({shadow} IS NOT NULL) NOT VALID"
+            )
+            conn.commit()
+
+
+def backfill_shadow(conn, table, column, shadow, expr, pk="id", batch_size=5000, sleep=0.05):
+    """Copy converted values into the shadow column in keyset batches"""
+    src_expr = expr.format(col=f"t.{column}")
+    progress = Progress(f"{table}.{shadow}", total=estimate_rows(conn, table))
+    last = None
+    with conn.cursor() as cur:
+        while True:
+            after = "" if last is None else f"WHERE {pk} > %(last)s"
+            cur.execute(
+                f"""
+                WITH batch AS (
+                    SELECT {pk} FROM {table}
+                    {after}
+                    ORDER BY {pk}
+                    LIMIT %(limit)s
+                )
+                UPDATE {table} t SET {shadow} = {src_expr}
+                FROM batch WHERE t.{pk} = batch.{pk}
+                RETURNING t.{pk}
+                """,
+                {"last": last, "limit": batch_size},
+            )
+            keys = [r[0] for r in cur.fetchall()]
+            conn.commit()
+            if not keys:
+                break
+            last = max(keys)
+            progress.update(len(keys))
+            if sleep:
+                time.sleep(sleep)
+    progress.finish()
+    return progress.done
+
+
+def _swap(conn, table, column, new_type, names, indexes, keys, not_null, default, lock_timeout_ms):
+    shadow = names["shadow"]
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = %s", (f"{int(lock_timeout_ms)}ms",))
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cur.execute(f"DROP TRIGGER IF EXISTS {names['trigger']} ON {table}")
+        cur.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        cur.execute(f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {column}")
+        for name, _ in indexes:
+            cur.execute(f"ALTER INDEX {name}{SHADOW_SUFFIX} RENAME TO {name}")
+        if not_null:
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+            cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT {names['check']}")
+        for conname, contype, index_name, _ in keys:
+            kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+            cur.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {conname} {kind} "
+                f"USING INDEX {index_name}{SHADOW_SUFFIX}"
+            )
+        if default is not None:
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT ({default})::{new_type}")
+        cur.execute(f"DROP FUNCTION IF EXISTS {names['function']}()")
+    conn.commit()
+
+
+def outline(table, column, new_type, using=None, pk="id"):
+    """Representative statements of each step, for dry-run planning"""
+    names = _names(table, column)
+    shadow = names["shadow"]
+    expr = (using or f"{{col}}::{new_type}").format(col=column)
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadow} {new_type}",
+        f"CREATE TRIGGER {names['trigger']} BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {names['function']}()",
+        f"UPDATE {table} SET {shadow} = {expr} WHERE {pk} > %(last)s",
+        f"ALTER TABLE {table} DROP COLUMN {column}",
+        f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {column}",
+    ]
+
+
+def change_column_type(conn, table, column, new_type, using=None, pk="id",
+                       batch_size=5000, sleep=0.05, lock_timeout_ms=3000, swap_retries=10):
+    """Change `table.column` to `new_type` without a long ACCESS EXCLUSIVE lock"""
+    cat = catalog.snapshot(conn, refresh=True)
+    col = cat.column(table, column)
+    if col is None:
+        raise OnlineAlterError(f"{table}.{column} does not exist")
+    if col.type.lower() == new_type.lower():
+        print(f"   ✓ {table}.{column} is already {new_type}")
+        return False
+
+    blockers = _blocking_dependencies(conn, table, column)
+    if blockers:
+        raise OnlineAlterError(
+            f"{table}.{column} is referenced by {', '.join(blockers)}; drop these first"
+        )
+
+    names = _names(table, column)
+    expr = using or f"{{col}}::{new_type}"
+    started = time.monotonic()
+    print(f"\n🔁 Online type change {table}.{column}: {col.type} → {new_type}")
+
+    print("   1/5 Adding shadow column and sync trigger...")
+    _prepare(conn, table, column, new_type, expr, names, col.not_null)
+
+    print("   2/5 Backfilling shadow column...")
+    backfill_shadow(conn, table, column, names["shadow"], expr, pk, batch_size, sleep)
+
+    print("   3/5 Validating and building indexes concurrently...")
+    if col.not_null:
+        _execute_autocommit(conn, f"ALTER TABLE {table} VALIDATE CONSTRAINT {names['check']}")
+    indexes = _dependent_indexes(conn, table, column)
+    keys = _key_constraints(conn, table, column)
+    for name, definition in indexes + [(k[2], k[3]) for k in keys]:
+        print(f"      - {name}")
+        _execute_autocommit(conn, _shadow_index_sql(definition, name, column, names["shadow"]))
+
+    print("   4/5 Swapping columns...")
+    for attempt in range(1, swap_retries + 1):
+        try:
+            _swap(conn, table, column, new_type, names, indexes, keys,
+                  col.not_null, col.default, lock_timeout_ms)
+            break
+        except errors.LockNotAvailable:
+            conn.rollback()
+            print(f"      ⚠️  Lock busy (attempt {attempt}/{swap_retries}), retrying...")
+            time.sleep(min(attempt, 5))
+    else:
+        raise OnlineAlterError(
+            f"could not lock {table} within {lock_timeout_ms}ms after {swap_retries} attempts; "
+            "shadow column and trigger left in place, rerun to resume"
+        )
+
+    catalog.invalidate()
+    print(f"   5/5 ✅ {table}.{column} is now {new_type} ({time.monotonic() - started:.1f}s)")
+    return True
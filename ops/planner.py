@@ -0,0 +1,406 @@
+"""
+Dry-run planning for migrations: lock level, table rewrites and expected
+blocking time of each statement, without executing anything.
+
+Current column types come from the catalog snapshot and table sizes from
+pg_class.relpages/reltuples, so the plan reflects the database it runs
+against:
+
+    from ops import db, planner
+
+    conn = db.connect()
+    plans = planner.plan_statements(conn, [(tag, sql), ...])
+    planner.print_plan(plans)
+
+Durations assume the throughputs below on an otherwise idle server. They are
+meant for picking a maintenance window, not as a promise.
+"""
+
+import re
+from collections import namedtuple
+
+from ops import catalog, sqllex
+from ops.progress import format_duration
+
+IDENT = sqllex.IDENT
+
+PAGE_SIZE = 8192
+SCAN_BYTES_PER_S = 200 * 1024 * 1024      # sequential heap read
+REWRITE_BYTES_PER_S = 40 * 1024 * 1024    # read + write heap and indexes, WAL
+INDEX_ROWS_PER_S = 400_000                # sort and build, on top of the scan
+UPDATE_ROWS_PER_S = 20_000                # new row versions, index entries, WAL
+
+# Weakest first
+LOCK_LEVELS = [
+    None,
+    "ROW EXCLUSIVE",
+    "SHARE UPDATE EXCLUSIVE",
+    "SHARE",
+    "SHARE ROW EXCLUSIVE",
+    "EXCLUSIVE",
+    "ACCESS EXCLUSIVE",
+]
+
+# What application traffic waits for while the lock is held
+LOCK_BLOCKS = {
+    None: "nothing",
+    "ROW EXCLUSIVE": "touched rows only",
+    "SHARE UPDATE EXCLUSIVE": "other DDL/VACUUM",
+    "SHARE": "writes",
+    "SHARE ROW EXCLUSIVE": "writes",
+    "EXCLUSIVE": "writes",
+    "ACCESS EXCLUSIVE": "reads and writes",
+}
+
+BLOCKING_LOCKS = {"SHARE", "SHARE ROW EXCLUSIVE", "EXCLUSIVE", "ACCESS EXCLUSIVE"}
+
+# Cheapest first
+WORK_KINDS = ["metadata", "rows", "scan", "index", "rewrite", "unknown"]
+
+VOLATILE_DEFAULT = re.compile(
+    r'\b(?:nextval|random|gen_random_uuid|uuid_generate_v[14]|clock_timestamp|timeofday)\s*\(',
+    re.IGNORECASE,
+)
+SERIAL_TYPES = {"serial", "bigserial", "smallserial", "serial2", "serial4", "serial8"}
+
+TYPE_ALIASES = {
+    "int": "integer",
+    "int4": "integer",
+    "int8": "bigint",
+    "int2": "smallint",
+    "bool": "boolean",
+    "decimal": "numeric",
+    "charactervarying": "varchar",
+    "timestampwithouttimezone": "timestamp",
+    "timestampwithtimezone": "timestamptz",
+}
+
+TableStats = namedtuple("TableStats", "pages rows index_pages")
+Action = namedtuple("Action", "description lock work")
+Plan = namedtuple("Plan", "tag sql table stats actions lock work seconds blocking notes")
+
+STATS_SQL = """
+    SELECT c.relname,
+           c.relpages,
+           GREATEST(c.reltuples, 0)::bigint,
+           coalesce((
+               SELECT sum(ic.relpages)
+               FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid
+               WHERE i.indrelid = c.oid
+           ), 0)::bigint
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+"""
+
+
+def load_table_stats(conn):
+    """{table: TableStats} from planner statistics (no table scans)"""
+    with conn.cursor() as cur:
+        cur.execute(STATS_SQL)
+        return {name: TableStats(pages, rows, index_pages) for name, pages, rows, index_pages in cur.fetchall()}
+
+
+def _strongest(values, order):
+    return max(values, key=order.index, default=order[0])
+
+
+def _canonical_type(type_name):
+    t = re.sub(r'\s+', '', type_name.lower())
+    base, _, args = t.partition("(")
+    base = TYPE_ALIASES.get(base, base)
+    return base, tuple(int(a) for a in re.findall(r'\d+', args))
+
+
+def _binary_coercible(old, new):
+    """True when ALTER COLUMN TYPE old -> new needs no table rewrite"""
+    old_base, old_args = _canonical_type(old)
+    new_base, new_args = _canonical_type(new)
+    if (old_base, old_args) == (new_base, new_args):
+        return True
+    text_types = {"text", "varchar"}
+    if old_base in text_types and new_base in text_types:
+        # Dropping or widening a length limit is catalog-only
+        return not new_args or (bool(old_args) and new_args[0] >= old_args[0])
+    if old_base == new_base == "numeric":
+        if not new_args:
+            return True
+        return (len(old_args) == len(new_args) == 2 and new_args[1] == old_args[1]
+                and new_args[0] >= old_args[0])
+    return False
+
+
+def _add_column(table, clause, notes):
+    m = re.match(rf'ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({IDENT})\s*(.*)$', clause, re.I | re.S)
+    if not m:
+        return Action(clause[:60], "ACCESS EXCLUSIVE", "unknown")
+    column, rest = sqllex.normalize_identifier(m.group(1)), m.group(2)
+    type_word = rest.split()[0].lower() if rest.split() else ""
+    default = re.search(
+        r'\bDEFAULT\s+(.*?)(?=\s+(?:NOT\s+NULL|NULL|CONSTRAINT|CHECK|UNIQUE|PRIMARY|REFERENCES|GENERATED|COLLATE)\b|$)',
+        rest, re.I | re.S,
+    )
+
+    work, why = "metadata", ""
+    if type_word in SERIAL_TYPES:
+        work, why = "rewrite", " (serial fills every row)"
+    elif re.search(r'\bGENERATED\b.*\b(?:STORED|IDENTITY)\b', rest, re.I | re.S):
+        work, why = "rewrite", " (generated values fill every row)"
+    elif default and VOLATILE_DEFAULT.search(default.group(1)):
+        work, why = "rewrite", " (volatile default is computed per row)"
+    elif re.search(r'\b(?:PRIMARY\s+KEY|UNIQUE)\b', rest, re.I):
+        work = "index"
+    elif re.search(r'\b(?:CHECK|REFERENCES)\b', rest, re.I):
+        work = "scan"
+
+    if re.search(r'\bNOT\s+NULL\b', rest, re.I) and not default and work != "rewrite":
+        notes.append(f"{column} is NOT NULL without a DEFAULT: fails if {table} has rows")
+    if re.search(r'\bREFERENCES\b', rest, re.I):
+        notes.append("also takes SHARE ROW EXCLUSIVE on the referenced table")
+    return Action(f"add column {column}{why}", "ACCESS EXCLUSIVE", work)
+
+
+def _alter_type(table, clause, cat):
+    m = re.match(
+        rf'ALTER\s+(?:COLUMN\s+)?({IDENT})\s+(?:SET\s+DATA\s+)?TYPE\s+(.+?)(\s+(?:USING|COLLATE)\b.*)?$',
+        clause, re.I | re.S,
+    )
+    if not m:
+        return Action(clause[:60], "ACCESS EXCLUSIVE", "rewrite")
+    column, new_type, tail = sqllex.normalize_identifier(m.group(1)), m.group(2).strip(), m.group(3)
+    current = cat.column_type(table, column) if cat else None
+    description = f"{column}: {current or '?'} → {new_type}"
+    if current and not tail and _binary_coercible(current, new_type):
+        return Action(description + " (no rewrite)", "ACCESS EXCLUSIVE", "metadata")
+    return Action(description, "ACCESS EXCLUSIVE", "rewrite")
+
+
+def _alter_clause(table, clause, cat, notes):
+    u = " ".join(clause.upper().split())
+    not_valid = "NOT VALID" in u
+    column_op = r'ALTER (?:COLUMN )?\S+ '
+
+    if re.match(r'ADD (?:CONSTRAINT \S+ )?FOREIGN KEY', u):
+        notes.append("also takes SHARE ROW EXCLUSIVE on the referenced table")
+        return Action("add foreign key", "SHARE ROW EXCLUSIVE", "metadata" if not_valid else "scan")
+    if re.match(r'ADD (?:CONSTRAINT \S+ )?CHECK\b', u):
+        return Action("add check constraint", "ACCESS EXCLUSIVE", "metadata" if not_valid else "scan")
+    if re.match(r'ADD (?:CONSTRAINT \S+ )?(?:UNIQUE|PRIMARY KEY)\b', u):
+        if "USING INDEX" in u:
+            return Action("attach existing index as constraint", "ACCESS EXCLUSIVE", "metadata")
+        return Action("add unique/primary key", "ACCESS EXCLUSIVE", "index")
+    if re.match(r'ADD (?:CONSTRAINT \S+ )?EXCLUDE\b', u):
+        return Action("add exclusion constraint", "ACCESS EXCLUSIVE", "index")
+    if u.startswith("ADD "):
+        return _add_column(table, clause, notes)
+    if re.match(column_op + r'(?:SET DATA )?TYPE\b', u):
+        return _alter_type(table, clause, cat)
+    if re.match(column_op + r'SET NOT NULL', u):
+        return Action("set not null (full scan unless a validated CHECK proves it)", "ACCESS EXCLUSIVE", "scan")
+    if re.match(column_op + r'SET STATISTICS', u):
+        return Action("set statistics", "SHARE UPDATE EXCLUSIVE", "metadata")
+    if re.match(column_op, u):
+        return Action(u.lower()[:60], "ACCESS EXCLUSIVE", "metadata")
+    if u.startswith("VALIDATE CONSTRAINT"):
+        return Action("validate constraint", "SHARE UPDATE EXCLUSIVE", "scan")
+    if re.match(r'(?:SET|RESET) \(', u):
+        return Action("storage parameters", "SHARE UPDATE EXCLUSIVE", "metadata")
+    if re.match(r'SET (?:TABLESPACE|LOGGED|UNLOGGED|WITHOUT OIDS)\b', u) or u.startswith("CLUSTER ON"):
+        return Action(u.lower()[:60], "ACCESS EXCLUSIVE", "rewrite")
+    if re.match(r'(?:ENABLE|DISABLE) (?:ALWAYS |REPLICA )?TRIGGER', u):
+        return Action(u.lower()[:60], "SHARE ROW EXCLUSIVE", "metadata")
+    if re.match(r'(?:DROP|RENAME|OWNER|ENABLE|DISABLE|FORCE|NO FORCE|REPLICA IDENTITY)\b', u):
+        return Action(u.lower()[:60], "ACCESS EXCLUSIVE", "metadata")
+    return Action(u.lower()[:60], "ACCESS EXCLUSIVE", "unknown")
+
+
+def _classify(text, cat, notes):
+    """(table, [Action]) for one statement with literals masked"""
+    u = " ".join(text.upper().split())
+
+    m = re.match(rf'ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({IDENT})\s*(.*)$', text, re.I | re.S)
+    if m:
+        table = sqllex.normalize_identifier(m.group(1))
+        return table, [_alter_clause(table, c, cat, notes) for c in sqllex.split_top_level(m.group(2))]
+
+    m = re.match(
+        rf'CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(IF\s+NOT\s+EXISTS\s+)?(?:({IDENT})\s+)?ON\s+(?:ONLY\s+)?({IDENT})',
+        text, re.I,
+    )
+    if m:
+        table = sqllex.normalize_identifier(m.group(5))
+        name = sqllex.normalize_identifier(m.group(4)) if m.group(4) else None
+        if m.group(3) and name and cat and cat.has_index(name):
+            notes.append(f"index {name} already exists: no-op")
+            return table, [Action(f"index {name} exists", None, "metadata")]
+        if m.group(2):
+            notes.append("CONCURRENTLY: two table scans, writes keep flowing")
+            return table, [Action("create index concurrently", "SHARE UPDATE EXCLUSIVE", "index")]
+        return table, [Action("create index", "SHARE", "index")]
+
+    m = re.match(rf'DROP\s+INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?({IDENT})', text, re.I)
+    if m:
+        name = sqllex.normalize_identifier(m.group(2))
+        index = cat.index(name) if cat else None
+        lock = "SHARE UPDATE EXCLUSIVE" if m.group(1) else "ACCESS EXCLUSIVE"
+        return (index.table if index else None), [Action(f"drop index {name}", lock, "metadata")]
+
+    m = re.match(rf'CREATE\s+(?:UNLOGGED\s+|TEMP(?:ORARY)?\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?({IDENT})', text, re.I)
+    if m:
+        table = sqllex.normalize_identifier(m.group(2))
+        if cat and cat.has_table(table):
+            notes.append(f"{table} already exists" + (": no-op" if m.group(1) else ": will fail"))
+        if re.search(r'\bREFERENCES\b', text, re.I):
+            notes.append("takes SHARE ROW EXCLUSIVE briefly on referenced tables")
+        return table, [Action("create table", None, "metadata")]
+
+    m = re.match(rf'(?:DROP\s+TABLE|TRUNCATE)\s+(?:TABLE\s+)?(?:IF\s+EXISTS\s+)?({IDENT})', text, re.I)
+    if m:
+        return sqllex.normalize_identifier(m.group(1)), [Action(u.split()[0].lower(), "ACCESS EXCLUSIVE", "metadata")]
+
+    m = re.match(rf'(?:UPDATE\s+(?:ONLY\s+)?({IDENT})\s+(?:\w+\s+)?SET|DELETE\s+FROM\s+(?:ONLY\s+)?({IDENT}))', text, re.I)
+    if m:
+        table = sqllex.normalize_identifier(m.group(1) or m.group(2))
+        if re.search(r'\bWHERE\b', u):
+            notes.append("estimate assumes every row matches the WHERE clause")
+        notes.append("row locks on matched rows are held until commit")
+        return table, [Action(u.split()[0].lower(), "ROW EXCLUSIVE", "rows")]
+
+    m = re.match(rf'INSERT\s+INTO\s+({IDENT})', text, re.I)
+    if m:
+        table = sqllex.normalize_identifier(m.group(1))
+        work = "unknown" if re.search(r'\bSELECT\b', u) else "metadata"
+        return table, [Action("insert", "ROW EXCLUSIVE", work)]
+
+    m = re.match(rf'CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+{IDENT}\s+.*?\bON\s+({IDENT})', text, re.I | re.S)
+    if m:
+        return sqllex.normalize_identifier(m.group(1)), [Action("create trigger", "SHARE ROW EXCLUSIVE", "metadata")]
+
+    m = re.match(rf'(?:DROP\s+TRIGGER|(?:CREATE|ALTER|DROP)\s+POLICY)\s+(?:IF\s+EXISTS\s+)?{IDENT}\s+ON\s+({IDENT})', text, re.I)
+    if m:
+        return sqllex.normalize_identifier(m.group(1)), [Action(" ".join(u.split()[:2]).lower(), "ACCESS EXCLUSIVE", "metadata")]
+
+    m = re.match(rf'(?:VACUUM\s+(?:\(\s*)?FULL\b\s*\)?|CLUSTER)\s+({IDENT})', text, re.I)
+    if m:
+        return sqllex.normalize_identifier(m.group(1)), [Action(u.split()[0].lower(), "ACCESS EXCLUSIVE", "rewrite")]
+
+    if re.match(r'DO\b', u):
+        notes.append("DO block: effects cannot be predicted, review it manually")
+        return None, [Action("do block", None, "unknown")]
+
+    if re.match(r'(?:CREATE|ALTER|DROP|COMMENT|GRANT|REVOKE)\b', u):
+        # Functions, types, extensions, sequences, views, comments: no table lock worth planning for
+        return None, [Action(" ".join(u.split()[:3]).lower(), None, "metadata")]
+
+    return None, [Action(" ".join(u.split()[:3]).lower(), None, "unknown")]
+
+
+def _seconds(work, stats):
+    if stats is None:
+        return 0.0
+    if work == "scan":
+        return stats.pages * PAGE_SIZE / SCAN_BYTES_PER_S
+    if work == "rewrite":
+        return (stats.pages + stats.index_pages) * PAGE_SIZE / REWRITE_BYTES_PER_S
+    if work == "index":
+        return stats.pages * PAGE_SIZE / SCAN_BYTES_PER_S + stats.rows / INDEX_ROWS_PER_S
+    if work == "rows":
+        return stats.rows / UPDATE_ROWS_PER_S
+    return 0.0
+
+
+def plan_statement(tag, sql, cat=None, stats=None):
+    """Plan for one statement; `cat` and `stats` make it size- and type-aware"""
+    notes = []
+    table, actions = _classify(sqllex.mask_literals(sql).strip(), cat, notes)
+    table_stats = (stats or {}).get(table) if table else None
+
+    lock = _strongest([a.lock for a in actions], LOCK_LEVELS)
+    work = _strongest([a.work for a in actions], WORK_KINDS)
+    if any(a.work == "rewrite" for a in actions):
+        # One rewrite per ALTER TABLE, however many clauses need it; it also rebuilds the indexes
+        seconds = _seconds("rewrite", table_stats)
+    else:
+        seconds = sum(_seconds(a.work, table_stats) for a in actions)
+    if lock == "SHARE UPDATE EXCLUSIVE" and work == "index":
+        seconds *= 2
+    blocking = seconds if lock in BLOCKING_LOCKS else 0.0
+
+    if table and stats is not None and table_stats is None and actions[0].description != "create table":
+        notes.append(f"no statistics for {table} (created earlier in this plan?)")
+    elif table_stats and table_stats.pages and not table_stats.rows:
+        notes.append(f"{table} has never been analyzed; row-based estimates are 0")
+    return Plan(tag, sql, table, table_stats, actions, lock, work, seconds, blocking, notes)
+
+
+def plan_statements(conn, statements):
+    """Plans for [(tag, sql), ...] against the connected database"""
+    cat = catalog.snapshot(conn)
+    stats = load_table_stats(conn)
+    return [plan_statement(tag, sql, cat, stats) for tag, sql in statements]
+
+
+def format_bytes(n):
+    for unit in ("B", "kB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _format_seconds(seconds):
+    if seconds < 0.05:
+        return "~0s"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    return format_duration(seconds)
+
+
+def print_plan(plans):
+    """Print one line per statement plus a blocking summary; returns total blocking seconds"""
+    print(f"\n📋 Migration plan ({len(plans)} statements, nothing executed)\n")
+    print(f"   {'#':>3}  {'Lock':<22}  {'Work':<8}  {'Est.':>7}  {'Blocks':<17}  Statement")
+    for i, plan in enumerate(plans, 1):
+        first_line = " ".join(plan.sql.split())[:60]
+        lock = plan.lock or "-"
+        print(
+            f"   {i:>3}  {lock:<22}  {plan.work:<8}  {_format_seconds(plan.seconds):>7}  "
+            f"{LOCK_BLOCKS[plan.lock]:<17}  {plan.tag}: {first_line}"
+        )
+        for action in plan.actions:
+            if len(plan.actions) > 1 or action.work == "rewrite":
+                print(f"          ↳ {action.description} [{action.lock or '-'}, {action.work}]")
+        if plan.stats and plan.work not in ("metadata", "unknown"):
+            s = plan.stats
+            print(f"          ↳ {plan.table}: {format_bytes(s.pages * PAGE_SIZE)} heap, "
+                  f"{format_bytes(s.index_pages * PAGE_SIZE)} indexes, ~{s.rows:,} rows")
+        for note in plan.notes:
+            print(f"          ⚠️  {note}")
+
+    per_table = {}
+    for plan in plans:
+        if plan.blocking and plan.table:
+            per_table.setdefault(plan.table, []).append(plan)
+    total = sum(p.blocking for p in plans)
+
+    print("\n⏱️  Expected blocking time")
+    if not per_table:
+        print("   None of the statements is expected to block application traffic noticeably")
+    for table, table_plans in sorted(per_table.items(), key=lambda kv: -sum(p.blocking for p in kv[1])):
+        blocks = LOCK_BLOCKS[_strongest([p.lock for p in table_plans], LOCK_LEVELS)]
+        print(f"   {table:<32} {_format_seconds(sum(p.blocking for p in table_plans)):>8}  ({blocks} blocked)")
+    print(f"   {'total':<32} {_format_seconds(total):>8}")
+
+    rewrites = [p for p in plans if p.work == "rewrite" and p.table]
+    if rewrites:
+        tables = ", ".join(sorted({p.table for p in rewrites}))
+        print(f"\n⚠️  {len(rewrites)} statements rewrite a table ({tables}); "
+              "schedule them in a low-traffic window or use an online change")
+    exclusive = sum(1 for p in plans if p.lock == "ACCESS EXCLUSIVE")
+    if exclusive:
+        print(f"ℹ️  {exclusive} statements take ACCESS EXCLUSIVE; even instant ones queue behind "
+              "long-running transactions, so run them with a lock_timeout")
+    unknown = sum(1 for p in plans if p.work == "unknown")
+    if unknown:
+        print(f"ℹ️  {unknown} statements could not be classified; review them manually")
+    return total
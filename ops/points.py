@@ -0,0 +1,406 @@
+"""
+Points ledger maintenance: user_points_ledgers derived from points_transactions.
+
+Totals follow updateUserPointsBalance() in server/blockchain/db-utils.ts:
+the balance is credits (earnings, escrow releases and transfers in) minus
+debits (burns and escrow locks); earned and burned count only earnings and
+burns.
+
+    from ops import db, points
+
+    conn = db.connect()
+    points.rebuild(conn)                         # all users, one GROUP BY + one upsert
+    points.rebuild(conn, ['did:privy:...'])      # some users
+    points.apply_increments(conn)                # only transactions since the last run
+    points.verify(conn, sample=200)              # spot-check ledgers for drift
+
+Ledgers are kept equal to the sum of transactions up to a watermark id
+stored in ops_points_watermark. A full rebuild sets the watermark, and
+apply_increments() recomputes only the users with rows above it, so a
+refresh costs O(history of the users who changed). Ledgers are always
+rewritten, never added to, because the API also recomputes a user's ledger
+on every insert. The watermark only moves past rows older than
+`settle_seconds`, which leaves time for transactions that inserted smaller
+ids to commit. Anything that still slips through, such as an edited or
+deleted historical row or a very long transaction, is what verify() is for.
+
+install_trigger() switches to an exact, push-based mode for
+points_ledger_daemon.py: a statement trigger queues the ids of inserted
+rows in ops_points_queue in the inserting transaction and NOTIFYs
+`points_ledger`. drain() deletes a batch of queued rows and recomputes
+their users' ledgers in one transaction, so each row is counted exactly
+once, whatever order ids commit in. While the trigger is installed, ledgers equal the totals of every
+committed row not in the queue, and apply_increments() drains the queue
+instead of reading past the watermark.
+"""
+
+EARNED_TYPES = ["earned_challenge", "creation_reward", "joining_reward", "admin_claim_weekly", "admin_payout_weekly"]
+BURNED_TYPES = ["burned_usage"]
+CREDIT_TYPES = EARNED_TYPES + ["released_escrow", "transferred_escrow", "transferred_user"]
+DEBIT_TYPES = BURNED_TYPES + ["locked_escrow"]
+# Recorded by the API without moving the balance
+NEUTRAL_TYPES = ["challenge_joined"]
+
+WATERMARK_TABLE = "ops_points_watermark"
+WATERMARK_NAME = "user_points_ledgers"
+SETTLE_SECONDS = 10
+
+QUEUE_TABLE = "ops_points_queue"
+TRIGGER_NAME = "ops_points_enqueue"
+CHANNEL = "points_ledger"
+DRAIN_BATCH = 5000
+
+# Queued rows are left for drain(); only referenced once the queue table exists
+QUEUE_FILTER = f"AND NOT EXISTS (SELECT 1 FROM {QUEUE_TABLE} q WHERE q.id = points_transactions.id)"
+
+TOTALS_SQL = """
+    SELECT user_id,
+           coalesce(sum(amount) FILTER (WHERE transaction_type = ANY(%(credit)s)), 0)
+             - coalesce(sum(amount) FILTER (WHERE transaction_type = ANY(%(debit)s)), 0) AS balance,
+           coalesce(sum(amount) FILTER (WHERE transaction_type = ANY(%(earned)s)), 0) AS earned,
+           coalesce(sum(amount) FILTER (WHERE transaction_type = ANY(%(burned)s)), 0) AS burned
+    FROM points_transactions
+    WHERE (%(all_users)s OR user_id = ANY(%(users)s))
+      AND id > %(after_id)s
+      AND (%(through_id)s::bigint IS NULL OR id <= %(through_id)s)
+      {queue_filter}
+    GROUP BY user_id
+"""
+
+
+def _params(user_ids, after_id=0, through_id=None):
+    return {
+        "earned": EARNED_TYPES,
+        "burned": BURNED_TYPES,
+        "credit": CREDIT_TYPES,
+        "debit": DEBIT_TYPES,
+        "all_users": user_ids is None,
+        "users": list(user_ids or []),
+        "after_id": after_id,
+        "through_id": through_id,
+    }
+
+
+def _totals_sql(cur):
+    """TOTALS_SQL, excluding queued rows when the queue table exists"""
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (QUEUE_TABLE,))
+    return TOTALS_SQL.format(queue_filter=QUEUE_FILTER if cur.fetchone()[0] else "")
+
+
+def ensure_watermark_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+                name TEXT PRIMARY KEY,
+                last_id BIGINT NOT NULL,
+                last_created_at TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """)
+        # Empty unless install_trigger() has been run; TOTALS_SQL excludes it
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} (id BIGINT PRIMARY KEY)")
+    conn.commit()
+
+
+def _trigger_installed(cur):
+    cur.execute(
+        "SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = 'points_transactions'::regclass",
+        (TRIGGER_NAME,),
+    )
+    return cur.fetchone() is not None
+
+
+def trigger_installed(conn):
+    with conn.cursor() as cur:
+        return _trigger_installed(cur)
+
+
+def _reset(cur):
+    """Full rebuild with points_transactions locked against inserts; returns (upserted, zeroed)"""
+    cur.execute("LOCK TABLE points_transactions IN SHARE ROW EXCLUSIVE MODE")
+    _lock_watermark(cur)
+    cur.execute(f"DELETE FROM {QUEUE_TABLE}")
+    result = _write_totals(cur, None, None, zero_missing=True)
+    cur.execute("SELECT coalesce(max(id), 0) FROM points_transactions")
+    _set_watermark(cur, cur.fetchone()[0])
+    return result
+
+
+def install_trigger(conn):
+    """Queue + NOTIFY every insert into points_transactions; returns the rebuild's (upserted, zeroed)
+
+    Runs a full rebuild in the same transaction, with inserts blocked, so
+    the queue starts exactly where the ledgers leave off.
+    """
+    ensure_watermark_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION {TRIGGER_NAME}() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO {QUEUE_TABLE} (id) SELECT id FROM inserted ON CONFLICT DO NOTHING;
+                PERFORM pg_notify('{CHANNEL}', '');
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        result = _reset(cur)
+        cur.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON points_transactions")
+        cur.execute(f"""
+            CREATE TRIGGER {TRIGGER_NAME}
+            AFTER INSERT ON points_transactions
+            REFERENCING NEW TABLE AS inserted
+            FOR EACH STATEMENT EXECUTE FUNCTION {TRIGGER_NAME}()
+        """)
+    conn.commit()
+    return result
+
+
+def remove_trigger(conn):
+    """Back to watermark mode; returns the rebuild's (upserted, zeroed)"""
+    ensure_watermark_table(conn)
+    with conn.cursor() as cur:
+        result = _reset(cur)
+        cur.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON points_transactions")
+        cur.execute(f"DROP FUNCTION IF EXISTS {TRIGGER_NAME}()")
+    conn.commit()
+    return result
+
+
+def _lock_watermark(cur, mode="UPDATE"):
+    """Watermark id (None if never set), locked until the transaction ends"""
+    cur.execute(
+        f"SELECT last_id FROM {WATERMARK_TABLE} WHERE name = %s FOR {mode}",
+        (WATERMARK_NAME,),
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def watermark(conn):
+    """Id of the last points_transactions row folded into the ledgers, or None"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (WATERMARK_TABLE,))
+        if cur.fetchone()[0] is None:
+            return None
+        cur.execute(f"SELECT last_id FROM {WATERMARK_TABLE} WHERE name = %s", (WATERMARK_NAME,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _settled_high(cur, after_id, settle_seconds):
+    """Largest id above `after_id` whose row is older than `settle_seconds`, or None"""
+    cur.execute(
+        """
+        SELECT max(id) FROM points_transactions
+        WHERE id > %s AND created_at <= NOW() - make_interval(secs => %s)
+        """,
+        (after_id, settle_seconds),
+    )
+    return cur.fetchone()[0]
+
+
+def _set_watermark(cur, last_id):
+    cur.execute(
+        f"""
+        INSERT INTO {WATERMARK_TABLE} (name, last_id, last_created_at)
+        VALUES (%(name)s, %(id)s, (SELECT created_at FROM points_transactions WHERE id = %(id)s))
+        ON CONFLICT (name) DO UPDATE SET
+            last_id = EXCLUDED.last_id,
+            last_created_at = EXCLUDED.last_created_at,
+            updated_at = NOW()
+        """,
+        {"name": WATERMARK_NAME, "id": last_id},
+    )
+
+
+def _write_totals(cur, user_ids, through_id, zero_missing):
+    """Overwrite ledgers with totals through `through_id`; returns (upserted, zeroed)"""
+    params = _params(user_ids, through_id=through_id)
+    cur.execute(
+        f"""
+        WITH totals AS ({_totals_sql(cur)})
+        INSERT INTO user_points_ledgers
+            (user_id, points_balance, total_points_earned, total_points_burned, last_updated_at)
+        SELECT user_id, balance, earned, burned, NOW() FROM totals
+        ON CONFLICT (user_id) DO UPDATE SET
+            points_balance = EXCLUDED.points_balance,
+            total_points_earned = EXCLUDED.total_points_earned,
+            total_points_burned = EXCLUDED.total_points_burned,
+            last_updated_at = NOW()
+        WHERE (user_points_ledgers.points_balance,
+               user_points_ledgers.total_points_earned,
+               user_points_ledgers.total_points_burned)
+              IS DISTINCT FROM
+              (EXCLUDED.points_balance, EXCLUDED.total_points_earned, EXCLUDED.total_points_burned)
+        """,
+        params,
+    )
+    upserted = cur.rowcount
+
+    zeroed = 0
+    if zero_missing:
+        # Ledgers of users without any transactions (through the watermark) left
+        cur.execute(
+            f"""
+            UPDATE user_points_ledgers l
+            SET points_balance = 0, total_points_earned = 0, total_points_burned = 0,
+                last_updated_at = NOW()
+            WHERE (%(all_users)s OR l.user_id = ANY(%(users)s))
+              AND (l.points_balance, l.total_points_earned, l.total_points_burned) IS DISTINCT FROM (0, 0, 0)
+              AND NOT EXISTS (
+                  SELECT 1 FROM points_transactions t
+                  WHERE t.user_id = l.user_id
+                    AND (%(through_id)s::bigint IS NULL OR t.id <= %(through_id)s)
+                    AND NOT EXISTS (SELECT 1 FROM {QUEUE_TABLE} q WHERE q.id = t.id)
+              )
+            """,
+            params,
+        )
+        zeroed = cur.rowcount
+    return upserted, zeroed
+
+
+def rebuild(conn, user_ids=None, zero_missing=True, settle_seconds=SETTLE_SECONDS):
+    """Recompute ledgers for `user_ids` (None = everyone); returns (upserted, zeroed)
+
+    A full rebuild also moves the watermark; a per-user rebuild counts
+    transactions up to the current watermark so later increments stay exact.
+    With the trigger installed, both count every row that is not queued.
+    """
+    ensure_watermark_table(conn)
+    with conn.cursor() as cur:
+        queued = _trigger_installed(cur)
+        last_id = _lock_watermark(cur)
+        if queued:
+            result = _write_totals(cur, user_ids, None, zero_missing)
+            conn.commit()
+            return result
+        if user_ids is None:
+            high = _settled_high(cur, last_id or 0, settle_seconds)
+            through_id = high if high is not None else last_id
+        else:
+            through_id = last_id
+        result = _write_totals(cur, user_ids, through_id, zero_missing)
+        if user_ids is None and through_id is not None:
+            _set_watermark(cur, through_id)
+    conn.commit()
+    return result
+
+
+def apply_increments(conn, settle_seconds=SETTLE_SECONDS):
+    """Recompute ledgers of users with transactions above the watermark; returns (users updated, new watermark)"""
+    ensure_watermark_table(conn)
+    with conn.cursor() as cur:
+        queued = _trigger_installed(cur)
+    if queued:
+        updated = 0
+        while True:
+            users, drained = drain(conn)
+            updated += users
+            if drained < DRAIN_BATCH:
+                return updated, watermark(conn)
+
+    with conn.cursor() as cur:
+        last_id = _lock_watermark(cur)
+        if last_id is None:
+            conn.rollback()
+            print("   ℹ️  No watermark yet, running a full rebuild instead")
+            updated, _ = rebuild(conn, settle_seconds=settle_seconds)
+            return updated, watermark(conn)
+
+        high = _settled_high(cur, last_id, settle_seconds)
+        if high is None:
+            conn.commit()
+            return 0, last_id
+
+        cur.execute(
+            "SELECT DISTINCT user_id FROM points_transactions WHERE id > %s AND id <= %s",
+            (last_id, high),
+        )
+        user_ids = [r[0] for r in cur.fetchall()]
+        updated, _ = _write_totals(cur, user_ids, high, zero_missing=False)
+        _set_watermark(cur, high)
+    conn.commit()
+    return updated, high
+
+
+def drain(conn, batch_size=DRAIN_BATCH):
+    """Recompute ledgers of users with up to `batch_size` queued rows; returns (users updated, rows drained)
+
+    Ledgers are rewritten, not added to, so the app's own recompute on insert
+    (updateUserPointsBalance) cannot be counted twice. The watermark then
+    records the highest id folded in so far.
+    """
+    with conn.cursor() as cur:
+        # Same lock as rebuild(), so a rebuild never sees a half-applied batch
+        last_id = _lock_watermark(cur)
+        cur.execute(
+            f"""
+            DELETE FROM {QUEUE_TABLE}
+            WHERE id IN (SELECT id FROM {QUEUE_TABLE} ORDER BY id LIMIT %s)
+            RETURNING id
+            """,
+            (batch_size,),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        if not ids:
+            conn.commit()
+            return 0, 0
+        cur.execute("SELECT DISTINCT user_id FROM points_transactions WHERE id = ANY(%s)", (ids,))
+        user_ids = [r[0] for r in cur.fetchall()]
+        # Rows still queued stay excluded; the ones just drained now count
+        updated, _ = _write_totals(cur, user_ids, None, zero_missing=False)
+        _set_watermark(cur, max(max(ids), last_id or 0))
+    conn.commit()
+    return updated, len(ids)
+
+
+def drift(conn, user_ids=None, limit=None, through_id=None):
+    """(user_id, ledger balance, computed balance, earned, burned) for ledgers that are off"""
+    params = _params(user_ids, through_id=through_id)
+    params["limit"] = limit
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH totals AS ({_totals_sql(cur)})
+            SELECT coalesce(t.user_id, l.user_id),
+                   l.points_balance,
+                   coalesce(t.balance, 0),
+                   coalesce(t.earned, 0),
+                   coalesce(t.burned, 0)
+            FROM totals t
+            FULL JOIN (
+                SELECT * FROM user_points_ledgers
+                WHERE %(all_users)s OR user_id = ANY(%(users)s)
+            ) l ON l.user_id = t.user_id
+            WHERE (l.points_balance, l.total_points_earned, l.total_points_burned)
+                  IS DISTINCT FROM
+                  (coalesce(t.balance, 0), coalesce(t.earned, 0), coalesce(t.burned, 0))
+            ORDER BY abs(coalesce(l.points_balance, 0) - coalesce(t.balance, 0)) DESC
+            LIMIT %(limit)s
+            """,
+            params,
+        )
+        return cur.fetchall()
+
+
+def verify(conn, sample=200, repair=False):
+    """Compare `sample` random ledgers (None = all) with their transactions through the watermark.
+
+    Returns the drifted rows (see drift()); repair=True rewrites those ledgers.
+    """
+    ensure_watermark_table(conn)
+    with conn.cursor() as cur:
+        # FOR SHARE keeps apply_increments() and drain() out until the check is done
+        through_id = _lock_watermark(cur, "SHARE")
+        if _trigger_installed(cur):
+            through_id = None
+        users = None
+        if sample is not None:
+            cur.execute("SELECT user_id FROM user_points_ledgers ORDER BY random() LIMIT %s", (sample,))
+            users = [r[0] for r in cur.fetchall()]
+        rows = drift(conn, users, through_id=through_id)
+        if repair and rows:
+            _write_totals(cur, [r[0] for r in rows], through_id, zero_missing=True)
+    conn.commit()
+    return rows
@@ -0,0 +1,77 @@
+"""
+Throughput/ETA reporting for long-running batch jobs.
+"""
+
+import time
+
+
+def estimate_rows(conn, table):
+    """Planner row estimate from pg_class.reltuples (no table scan)"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass",
+            (table,),
+        )
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+
+
+class Progress:
+    """Counts processed rows and prints rate and ETA at most every `interval` seconds"""
+
+    def __init__(self, label, total=None, interval=2.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Seconds remaining, or None when the total or rate is unknown"""
+        if not self.total or not self.rate:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def update(self, rows, force=False):
+        self.done += rows
+        now = time.monotonic()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self):
+        line = f"   ⏳ {self.label}: {self.done:,}"
+        if self.total:
+            pct = min(self.done / self.total * 100, 100.0)
+            line += f"/{self.total:,} ({pct:.1f}%)"
+        line += f" · {self.rate:,.0f} rows/s"
+        eta = self.eta()
+        if eta is not None:
+            line += f" · ETA {format_duration(eta)}"
+        print(line, flush=True)
+
+    def finish(self):
+        print(
+            f"   ✅ {self.label}: {self.done:,} rows in {format_duration(self.elapsed)} "
+            f"({self.rate:,.0f} rows/s)",
+            flush=True,
+        )
@@ -0,0 +1,236 @@
+"""
+Data-quality rules: declared once, checked in one scan per table.
+
+Each rule is a SQL predicate that matches the bad rows of one table, with an
+optional UPDATE that fixes them:
+
+    from ops import quality
+
+    quality.rule(
+        "challenges.open_admin_flag", "challenges",
+        "status = 'open' AND admin_created = true AND challenged IS NOT NULL",
+        "open P2P challenge flagged as admin-created",
+        fix="UPDATE challenges SET admin_created = false WHERE id = ANY(%(keys)s)",
+    )
+
+    report = quality.audit(jobs=4)          # every table in parallel, one scan each
+    quality.write_report(report, "quality.json")
+
+scan() compiles all of a table's rules into one SELECT of
+count(*) FILTER (WHERE ...) columns, so adding a rule adds no extra pass
+over the table. Sample keys come from a LIMIT query per rule that has
+violations. Fixes run through backfill.run() with the rule's predicate
+as the chunk filter, so they are resumable like any other backfill.
+
+From the shell:
+
+    python -m ops audit [--jobs N] [--table T] [--json PATH] [--fix RULE ...]
+"""
+
+import json
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ops import backfill, db, points, tokens
+
+Rule = namedtuple("Rule", "name table predicate description fix params key")
+Violation = namedtuple("Violation", "rule count sample")
+TableResult = namedtuple("TableResult", "table rows seconds violations error")
+
+RULES = OrderedDict()
+
+DEFAULT_SAMPLE = 5
+
+
+def rule(name, table, predicate, description="", fix=None, params=None, key="id"):
+    """Register a rule; `fix` is a backfill SQL statement using %(keys)s"""
+    if name in RULES:
+        raise ValueError(f"rule {name} is already registered")
+    registered = Rule(name, table, predicate, description, fix, dict(params or {}), key)
+    RULES[name] = registered
+    return registered
+
+
+def rules_for(tables=None, names=None):
+    """{table: [Rule]} for the selected tables/rule names (default: all)"""
+    grouped = OrderedDict()
+    for r in RULES.values():
+        if tables and r.table not in tables:
+            continue
+        if names and r.name not in names:
+            continue
+        grouped.setdefault(r.table, []).append(r)
+    return grouped
+
+
+def _merged_params(rules):
+    params = {}
+    for r in rules:
+        for k, v in r.params.items():
+            if k in params and params[k] != v:
+                raise ValueError(f"rules on {r.table} disagree on parameter %({k})s")
+            params[k] = v
+    return params
+
+
+def compile_scan(table, rules):
+    """One SELECT that counts every rule's matches"""
+    columns = ["count(*)"] + [f"count(*) FILTER (WHERE {r.predicate})" for r in rules]
+    select_list = ",\n       ".join(columns)
+    return f"SELECT {select_list}\nFROM {table}"
+
+
+def _sample(cur, table, r, sample):
+    """Up to `sample` keys of rows matching `r`; stops at the first matches found"""
+    cur.execute(f"SELECT {r.key} FROM {table} WHERE {r.predicate} LIMIT {int(sample)}", r.params)
+    return [row[0] for row in cur.fetchall()]
+
+
+def scan(conn, table, rules, sample=DEFAULT_SAMPLE):
+    """TableResult for `rules` (all on `table`) from a single pass over the table
+
+    Sample keys are fetched afterwards with a LIMIT query per violated rule,
+    so memory does not grow with the number of violations.
+    """
+    started = time.monotonic()
+    with conn.cursor() as cur:
+        cur.execute(compile_scan(table, rules), _merged_params(rules))
+        row = cur.fetchone()
+        violations = []
+        for r, count in zip(rules, row[1:]):
+            samples = _sample(cur, table, r, sample) if sample and count else []
+            violations.append(Violation(r.name, count, samples))
+    conn.commit()
+    return TableResult(table, row[0], time.monotonic() - started, violations, None)
+
+
+def _scan_table(table, rules, sample, statement_timeout):
+    try:
+        with db.connection(statement_timeout=statement_timeout) as conn:
+            return scan(conn, table, rules, sample)
+    except Exception as e:
+        return TableResult(table, None, None, [], str(e).strip())
+
+
+def audit(tables=None, names=None, jobs=4, sample=DEFAULT_SAMPLE, statement_timeout=None):
+    """Scan every selected table in parallel (one connection each); returns a report dict"""
+    started = time.monotonic()
+    grouped = rules_for(tables, names)
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(grouped) or 1))) as pool:
+        futures = [
+            pool.submit(_scan_table, table, rules, sample, statement_timeout)
+            for table, rules in grouped.items()
+        ]
+        results = [f.result() for f in futures]
+    return report(results, time.monotonic() - started)
+
+
+def report(results, seconds):
+    """Machine-readable report for a list of TableResults"""
+    tables = OrderedDict()
+    for result in results:
+        entry = {"rows": result.rows, "seconds": round(result.seconds or 0, 3), "rules": OrderedDict()}
+        if result.error:
+            entry["error"] = result.error
+        for v in result.violations:
+            r = RULES.get(v.rule)
+            entry["rules"][v.rule] = {
+                "description": r.description if r else "",
+                "violations": v.count,
+                "sample": v.sample,
+                "fixable": bool(r and r.fix),
+            }
+        tables[result.table] = entry
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "violations": sum(v.count for r in results for v in r.violations),
+        "errors": sum(1 for r in results if r.error),
+        "tables": tables,
+    }
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def print_report(report):
+    print(f"\n📋 Data quality ({report['seconds']:.2f}s)\n")
+    for table, entry in report["tables"].items():
+        if entry.get("error"):
+            print(f"   ❌ {table}: {entry['error'].splitlines()[0]}")
+            continue
+        print(f"   {table} ({entry['rows']:,} rows, {entry['seconds']:.2f}s)")
+        for name, result in entry["rules"].items():
+            if result["violations"]:
+                sample = ", ".join(str(k) for k in result["sample"])
+                print(f"      ⚠️  {name}: {result['violations']:,}  {result['description']}"
+                      + (f"  (e.g. {sample})" if sample else ""))
+            else:
+                print(f"      ✅ {name}")
+
+
+def fix(conn, names):
+    """Run the fixes of the named rules; returns {rule: rows changed}"""
+    changed = OrderedDict()
+    for name in names:
+        r = RULES[name]
+        if not r.fix:
+            raise ValueError(f"rule {name} has no fix")
+        print(f"\n🔧 Fixing {name}...")
+        changed[name] = backfill.run(
+            conn, f"quality.{name}", r.table,
+            pk=r.key, where=r.predicate, params=r.params, sql=r.fix,
+        )
+    return changed
+
+
+# Built-in rules
+
+rule(
+    "challenges.open_admin_flag", "challenges",
+    "status = 'open' AND admin_created = true AND challenged IS NOT NULL",
+    "open P2P challenge flagged as admin-created",
+    fix="""
+        UPDATE challenges SET admin_created = false
+        WHERE id = ANY(%(keys)s) AND status = 'open' AND admin_created = true
+    """,
+)
+rule(
+    "challenges.null_payment_token", "challenges",
+    "payment_token_address IS NULL OR payment_token_address = ''",
+    "challenge without a payment token address",
+)
+rule(
+    "challenges.unknown_payment_token", "challenges",
+    "payment_token_address <> '' AND lower(payment_token_address) <> ALL(%(known_tokens)s)",
+    "payment token not in the token registry (ops/tokens.py)",
+    params={"known_tokens": sorted(tokens.ADDRESSES)},
+)
+rule(
+    "challenges.non_positive_amount", "challenges",
+    "amount IS NULL OR amount <= 0",
+    "challenge with a missing or non-positive stake amount",
+)
+rule(
+    "points_transactions.unknown_type", "points_transactions",
+    "transaction_type IS NULL OR transaction_type <> ALL(%(points_types)s)",
+    "transaction type the server never records",
+    params={"points_types": points.CREDIT_TYPES + points.DEBIT_TYPES + points.NEUTRAL_TYPES},
+)
+rule(
+    "points_transactions.non_positive_amount", "points_transactions",
+    "amount <= 0",
+    "points transaction with a non-positive amount",
+)
+# Ledger balances depend on the user's whole history, not on the ledger row
+# alone; rebuild_points_ledger.py --verify checks them (ops/points.py).
+rule(
+    "user_points_ledgers.negative_balance", "user_points_ledgers",
+    "points_balance < 0",
+    "negative points balance",
+    key="user_id",
+)
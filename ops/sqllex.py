@@ -0,0 +1,200 @@
+"""
+SQL lexer and statement splitter for migration files.
+
+tokens() walks SQL text once and yields (kind, text, line) tuples, keeping
+string literals, quoted identifiers, dollar-quoted bodies and comments
+intact, so a ';' inside a function body or a '--' inside a string does not
+end a statement:
+
+    from ops import sqllex
+
+    for statement in sqllex.split_statements(text):
+        cursor.execute(statement)
+
+    parsed = sqllex.parse_file('migrations/phase3-blockchain.sql')
+    parsed.checksum, parsed.statements
+
+Drizzle's `--> statement-breakpoint` comments also end a statement.
+parse_file() caches the statement list by the file's SHA-256, so unchanged
+files are not lexed again.
+"""
+
+import re
+from collections import namedtuple
+
+from ops import cache
+
+# Bump when splitting rules change so old cache entries are ignored
+LEXER_VERSION = 1
+
+BREAKPOINT = "--> statement-breakpoint"
+
+ParsedFile = namedtuple("ParsedFile", "path checksum statements")
+
+# Optionally schema-qualified, optionally quoted identifier
+IDENT = r'(?:"[^"]+"|[\w$]+)(?:\.(?:"[^"]+"|[\w$]+))?'
+
+_SIMPLE_TOKENS = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<line_comment>--[^\n]*)
+    | (?P<estring>[eE]'(?:[^'\\]|\\.|'')*')
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<dollar_open>\$(?:[^\W\d]\w*)?\$)
+    | (?P<param>\$\d+)
+    | (?P<word>[^\W\d][\w$]*)
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+    | (?P<semicolon>;)
+    | (?P<block_open>/\*)
+    | (?P<unterminated>[eE]?'|")
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_BLOCK_COMMENT_PARTS = re.compile(r"/\*|\*/")
+
+
+class SqlLexError(ValueError):
+    pass
+
+
+def tokens(sql):
+    """Yield (kind, text, line) for every token in `sql`, whitespace and comments included"""
+    pos = 0
+    line = 1
+    end = len(sql)
+    while pos < end:
+        match = _SIMPLE_TOKENS.match(sql, pos)
+        kind = match.lastgroup
+        stop = match.end()
+
+        if kind == "estring":
+            kind = "string"
+        elif kind == "unterminated":
+            raise SqlLexError(f"unterminated quoted text starting on line {line}")
+        elif kind == "dollar_open":
+            tag = match.group()
+            close = sql.find(tag, stop)
+            if close < 0:
+                raise SqlLexError(f"unterminated dollar-quoted string {tag} starting on line {line}")
+            kind, stop = "dollar_string", close + len(tag)
+        elif kind == "block_open":
+            # Block comments nest in PostgreSQL
+            depth = 1
+            scan = stop
+            while depth:
+                part = _BLOCK_COMMENT_PARTS.search(sql, scan)
+                if part is None:
+                    raise SqlLexError(f"unterminated block comment starting on line {line}")
+                depth += 1 if part.group() == "/*" else -1
+                scan = part.end()
+            kind, stop = "block_comment", scan
+
+        text = sql[pos:stop]
+        yield kind, text, line
+        line += text.count("\n")
+        pos = stop
+
+
+def split_statements(sql):
+    """Statements in `sql` without their terminating ';' or surrounding comments"""
+    statements = []
+    current = []
+    pending = []    # whitespace/comments seen since the last significant token
+
+    def flush():
+        if current:
+            statements.append("".join(current).strip())
+        current.clear()
+        pending.clear()
+
+    for kind, text, _ in tokens(sql):
+        if kind == "semicolon":
+            flush()
+        elif kind == "line_comment" and text.startswith(BREAKPOINT):
+            flush()
+        elif kind in ("space", "line_comment", "block_comment"):
+            # Leading comments are dropped; inner ones are kept with the statement
+            if current:
+                pending.append(text)
+        else:
+            current.extend(pending)
+            pending.clear()
+            current.append(text)
+    flush()
+    return statements
+
+
+def split_top_level(sql, separator=","):
+    """Split on `separator` outside parentheses, strings and comments"""
+    parts, current, depth = [], [], 0
+    for kind, text, _ in tokens(sql):
+        if kind == "other" and text == "(":
+            depth += 1
+        elif kind == "other" and text == ")":
+            depth -= 1
+        elif kind in ("other", "semicolon") and text == separator and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(text)
+    parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+
+def normalize_identifier(name):
+    """Unquoted, lower-cased name with a leading public. removed"""
+    name = name.replace('"', '').lower()
+    if name.startswith("public."):
+        name = name[len("public."):]
+    return name
+
+
+def identifier_key(name):
+    """Exact identity of an IDENT: unquoted parts folded to lower case, quoted parts kept
+
+    Unlike normalize_identifier(), "Challenges" and challenges stay distinct,
+    as they are to PostgreSQL. A leading public. is removed.
+    """
+    parts = [part[1:-1] if part.startswith('"') else part.lower()
+             for part in re.findall(r'"[^"]+"|[\w$]+', name)]
+    if len(parts) > 1 and parts[0] == "public":
+        parts = parts[1:]
+    return ".".join(parts)
+
+
+def strip_comments(sql):
+    """`sql` with comments replaced by a single space"""
+    return "".join(
+        " " if kind in ("line_comment", "block_comment") else text
+        for kind, text, _ in tokens(sql)
+    )
+
+
+def mask_literals(sql):
+    """`sql` with comments removed and string/dollar-quoted contents blanked, for keyword matching"""
+    masked = []
+    for kind, text, _ in tokens(sql):
+        if kind in ("line_comment", "block_comment"):
+            masked.append(" ")
+        elif kind in ("string", "dollar_string"):
+            masked.append("''")
+        else:
+            masked.append(text)
+    return "".join(masked)
+
+
+def parse_file(path):
+    """ParsedFile for a migration file, using the checksum-keyed cache"""
+    with open(path, "rb") as f:
+        data = f.read()
+    checksum = cache.sha256_bytes(data)
+    key = f"{checksum}-v{LEXER_VERSION}"
+
+    statements = cache.get("sql", key)
+    if statements is None:
+        statements = split_statements(data.decode("utf-8"))
+        cache.put("sql", key, statements)
+    return ParsedFile(str(path), checksum, statements)
@@ -0,0 +1,383 @@
+"""
+Deterministic synthetic data for load tests, bulk-loaded with COPY.
+
+    from ops import db, synth
+
+    conn = db.connect()
+    data = synth.Dataset(users=100_000, challenges=1_000_000, transactions=5_000_000, seed=7)
+    counts = synth.load(conn, data)
+
+Rows are generated on the fly and streamed through `COPY ... FROM STDIN`,
+so memory use does not grow with the row count (apart from two integers
+per user for the ledger totals). The same seed always generates the same
+users, challenges and transactions. Challenge and transaction ids continue
+from the table's current max(id), so they are identical only between loads
+into equally empty tables.
+
+Distributions:
+- Users sign up evenly over the window, and older users are more active.
+  Activity follows a power law over the users who exist at that moment.
+- Challenges are 10% admin and 90% P2P. Every status, chain and registered
+  token appears (ops/tokens.py). Stakes are log-normal.
+- Points transactions use every earned and burned type. A burn never
+  exceeds the user's balance at that time.
+- user_points_ledgers equal the transaction totals exactly, so
+  `python -m ops audit` is clean.
+
+`dirty` is the fraction of challenges given one of the defects
+fix_challenge_data.py repairs: an open P2P challenge flagged admin-created,
+a missing token, or an unknown token. This is useful for benchmarking that
+migration.
+
+Columns that do not exist in the target database (for example
+blockchain_chain_id before phase3-blockchain.sql) are skipped.
+"""
+
+import random
+from array import array
+from datetime import datetime, timedelta
+
+from psycopg2 import sql as pgsql
+
+from ops import catalog, points, progress, tokens
+
+END = datetime(2026, 1, 1)
+SKEW = 2.5            # activity ~ (random ** SKEW): the oldest 1% of users create ~16% of rows
+BUFFER_BYTES = 1 << 20
+
+USER_COLUMNS = [
+    "id", "email", "password", "username", "first_name", "points", "status",
+    "is_admin", "wallet_address", "created_at", "updated_at",
+]
+CHALLENGE_COLUMNS = [
+    "id", "challenger", "challenged", "challenger_side", "title", "description",
+    "category", "amount", "status", "result", "due_date", "created_at",
+    "completed_at", "admin_created", "bonus_side", "payment_token_address",
+    "stake_amount_wei", "stake_amount", "blockchain_chain_id", "on_chain_status",
+    "settlement_type", "creator_staked", "acceptor_staked",
+]
+TRANSACTION_COLUMNS = [
+    "id", "user_id", "challenge_id", "transaction_type", "amount", "reason",
+    "blockchain_tx_hash", "block_number", "chain_id", "created_at",
+]
+LEDGER_COLUMNS = [
+    "user_id", "points_balance", "total_points_earned", "total_points_burned",
+    "points_locked_in_escrow", "last_updated_at", "created_at",
+]
+
+USER_STATUSES = [("active", 92), ("inactive", 5), ("suspended", 2), ("banned", 1)]
+P2P_STATUSES = [("open", 15), ("pending", 10), ("active", 20), ("completed", 45),
+                ("disputed", 3), ("cancelled", 7)]
+ADMIN_STATUSES = [("open", 30), ("active", 20), ("completed", 45), ("cancelled", 5)]
+RESULTS = [("challenger_won", 45), ("challenged_won", 45), ("draw", 10)]
+ON_CHAIN_STATUS = {
+    "open": "pending", "pending": "submitted", "active": "confirmed",
+    "completed": "completed", "disputed": "confirmed", "cancelled": "failed",
+}
+CHAINS = [(tokens.BASE_SEPOLIA, 6), (tokens.ARBITRUM_SEPOLIA, 2), (tokens.POLYGON_AMOY, 2)]
+TOKEN_WEIGHTS = [50, 35, 15]       # native, then the chain's stablecoins in registry order
+# Whole tokens staked per coin of `amount`; keeps 18-decimal stakes inside BIGINT
+STAKE_PER_COIN = {18: 0.001, 6: 0.1}
+CATEGORIES = [("sports", 30), ("crypto", 25), ("gaming", 15), ("entertainment", 10),
+              ("politics", 8), ("music", 7), ("p2p", 5)]
+POINTS_TYPES = [("earned_challenge", 40), ("creation_reward", 20), ("joining_reward", 20),
+                ("burned_usage", 20)]
+FIRST_NAMES = ["Ada", "Tunde", "Chioma", "Emeka", "Ngozi", "Sam", "Kemi", "Ife", "Uche", "Bola"]
+SUBJECTS = ["Arsenal", "Bitcoin", "ETH", "Lakers", "Burna Boy", "Real Madrid", "Solana", "Team Liquid"]
+OUTCOMES = ["win tonight", "close above 100k", "top the chart", "score first", "make the final"]
+DEFECTS = ["open_admin_flag", "null_token", "empty_token", "unknown_token"]
+
+
+class SynthError(Exception):
+    pass
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _hex(rng, nbytes):
+    return f"0x{rng.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+class Dataset:
+    """Row generators for one seeded dataset"""
+
+    def __init__(self, users, challenges, transactions, seed=1, days=365, dirty=0.0,
+                 end=END, prefix=None):
+        if users < 1:
+            raise SynthError("need at least one user")
+        self.users = users
+        self.challenges = challenges
+        self.transactions = transactions
+        self.seed = seed
+        self.dirty = dirty
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.span = (end - self.start).total_seconds()
+        self.prefix = prefix or f"synth-{seed}-"
+        self.earned = array("q", bytes(8 * users))
+        self.burned = array("q", bytes(8 * users))
+        self._chain_tokens = {chain_id: tokens.for_chain(chain_id) for chain_id, _ in CHAINS}
+
+    def _rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def user_id(self, i):
+        return f"{self.prefix}{i:08d}"
+
+    def _at(self, fraction):
+        return self.start + timedelta(seconds=self.span * fraction)
+
+    def _timeline(self, rng, i, n):
+        """(fraction of the window, timestamp) of row i of n; non-decreasing in i"""
+        fraction = (i + rng.random()) / n
+        return fraction, self._at(fraction)
+
+    def _pick_user(self, rng, fraction):
+        """Index of an active user among those signed up by `fraction` of the window"""
+        existing = max(1, min(self.users, int(self.users * fraction) + 1))
+        return int(existing * rng.random() ** SKEW)
+
+    def _pick_opponent(self, rng, fraction, creator):
+        """Like _pick_user, but never `creator` (unless there is only one user)"""
+        for _ in range(10):
+            user = self._pick_user(rng, fraction)
+            if user != creator:
+                return user
+        return (creator + 1) % self.users
+
+    def user_rows(self):
+        rng = self._rng("users")
+        admins = max(1, self.users // 10000)
+        for i in range(self.users):
+            user_id = self.user_id(i)
+            created = self._at(i / self.users)
+            yield (
+                user_id, f"{user_id}@example.test", "synthetic", user_id,
+                rng.choice(FIRST_NAMES), 1000, _weighted(rng, USER_STATUSES), i < admins,
+                _hex(rng, 20) if rng.random() < 0.7 else None, created, created,
+            )
+
+    def _token(self, rng, chain_id):
+        listed = self._chain_tokens[chain_id]
+        return rng.choices(listed, TOKEN_WEIGHTS[:len(listed)])[0]
+
+    def challenge_rows(self, first_id):
+        rng = self._rng("challenges")
+        for i in range(self.challenges):
+            fraction, created = self._timeline(rng, i, self.challenges)
+            admin = rng.random() < 0.1
+            status = _weighted(rng, ADMIN_STATUSES if admin else P2P_STATUSES)
+            chain_id = _weighted(rng, CHAINS)
+            token = self._token(rng, chain_id)
+            amount = min(9000, max(1, int(rng.lognormvariate(3.0, 1.2))))
+            stake = int(tokens.from_units(f"{amount * STAKE_PER_COIN[token.decimals]:.6f}", token))
+
+            if admin:
+                challenger = challenged = side = None
+            else:
+                creator = self._pick_user(rng, fraction)
+                challenger = self.user_id(creator)
+                side = rng.choice(["YES", "NO"])
+                # Most open P2P challenges are open to anyone
+                if status == "open" and rng.random() < 0.6:
+                    challenged = None
+                else:
+                    challenged = self.user_id(self._pick_opponent(rng, fraction, creator))
+            token_address = token.address
+            admin_created = admin
+
+            if self.dirty and rng.random() < self.dirty:
+                defect = rng.choice(DEFECTS)
+                if defect == "open_admin_flag":
+                    status, admin_created = "open", True
+                    creator = self._pick_user(rng, fraction) if admin else creator
+                    challenger = self.user_id(creator)
+                    challenged = challenged or self.user_id(self._pick_opponent(rng, fraction, creator))
+                elif defect == "null_token":
+                    token_address = None
+                elif defect == "empty_token":
+                    token_address = ""
+                else:
+                    token_address = _hex(rng, 20)
+
+            finished = status == "completed"
+            staked = status not in ("open", "pending", "cancelled")
+            yield (
+                first_id + i, challenger, challenged, side,
+                f"Will {rng.choice(SUBJECTS)} {rng.choice(OUTCOMES)}?", "Synthetic load-test challenge",
+                _weighted(rng, CATEGORIES),
+                amount, status, _weighted(rng, RESULTS) if finished else None,
+                created + timedelta(days=rng.uniform(1, 30)), created,
+                created + timedelta(hours=rng.uniform(1, 336)) if finished else None,
+                admin_created, rng.choice(["YES", "NO"]) if admin and rng.random() < 0.3 else None,
+                token_address, stake, None if admin else stake, chain_id,
+                ON_CHAIN_STATUS[status], "voting", staked, staked and not admin,
+            )
+
+    def transaction_rows(self, first_id, first_challenge_id):
+        """points_transactions rows; fills self.earned / self.burned as a side effect"""
+        rng = self._rng("points_transactions")
+        earned, burned = self.earned, self.burned
+        block = 10_000_000
+        for i in range(self.transactions):
+            fraction, created = self._timeline(rng, i, self.transactions)
+            user = self._pick_user(rng, fraction)
+            kind = _weighted(rng, POINTS_TYPES)
+            if kind == "burned_usage":
+                amount = max(1, int(rng.lognormvariate(3.0, 1.0)))
+                if amount > earned[user] - burned[user]:
+                    kind = "earned_challenge"
+            if kind == "earned_challenge":
+                amount = max(1, int(rng.lognormvariate(3.5, 1.0)))
+            elif kind == "creation_reward":
+                amount = rng.choice([10, 25, 50])
+            elif kind == "joining_reward":
+                amount = rng.choice([5, 10, 20])
+
+            if kind == "burned_usage":
+                burned[user] += amount
+            else:
+                earned[user] += amount
+
+            challenge_id = None
+            if self.challenges and kind != "burned_usage":
+                challenge_id = first_challenge_id + int(self.challenges * fraction * rng.random())
+            tx_hash = number = None
+            if rng.random() < 0.3:
+                block += rng.randint(1, 50)
+                tx_hash, number = _hex(rng, 32), block
+            yield (
+                first_id + i, self.user_id(user), challenge_id, kind, amount,
+                kind.replace("_", " "), tx_hash, number, tokens.BASE_SEPOLIA, created,
+            )
+
+    def ledger_rows(self):
+        """Ledgers matching the totals of transaction_rows(); run that generator first"""
+        for i in range(self.users):
+            earned, burned = self.earned[i], self.burned[i]
+            if earned or burned:
+                yield (self.user_id(i), earned - burned, earned, burned, 0, self.end, self._at(i / self.users))
+
+
+def _format(value):
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    # Generated text never contains tabs, newlines or backslashes
+    return str(value)
+
+
+class _CopyStream:
+    """Read-only file object turning row tuples into COPY text for copy_expert()"""
+
+    def __init__(self, rows, keep, counter):
+        self.rows = rows
+        self.keep = keep
+        self.counter = counter
+        self.buffer = b""
+
+    def read(self, size=-1):
+        size = BUFFER_BYTES if size is None or size < 0 else size
+        chunks = [self.buffer]
+        length = len(self.buffer)
+        count = 0
+        for row in self.rows:
+            line = "\t".join(_format(row[i]) for i in self.keep) + "\n"
+            data = line.encode("utf-8")
+            chunks.append(data)
+            length += len(data)
+            count += 1
+            if length >= size:
+                break
+        if count:
+            self.counter.update(count)
+        data = b"".join(chunks)
+        self.buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(conn, table, columns, rows, total=None):
+    """COPY generated `rows` (tuples in `columns` order) into `table`; returns the row count
+
+    Columns the table does not have are dropped from every row.
+    """
+    cat = catalog.snapshot(conn)
+    keep = [i for i, column in enumerate(columns) if cat.has_column(table, column)]
+    statement = pgsql.SQL("COPY {} ({}) FROM STDIN").format(
+        pgsql.Identifier(table), pgsql.SQL(", ").join(pgsql.Identifier(columns[i]) for i in keep))
+    counter = progress.Progress(table, total)
+    with conn.cursor() as cur:
+        cur.copy_expert(statement.as_string(cur), _CopyStream(iter(rows), keep, counter))
+    conn.commit()
+    counter.finish()
+    return counter.done
+
+
+def _next_id(cur, table):
+    cur.execute(pgsql.SQL("SELECT coalesce(max(id), 0) + 1 FROM {}").format(pgsql.Identifier(table)))
+    return cur.fetchone()[0]
+
+
+def _sync_sequence(cur, table):
+    """Move the serial past ids that COPY set explicitly"""
+    cur.execute(
+        pgsql.SQL("SELECT setval(pg_get_serial_sequence(%s, 'id'), max(id)) FROM {} HAVING max(id) IS NOT NULL")
+        .format(pgsql.Identifier(table)),
+        (table,),
+    )
+
+
+def load(conn, data):
+    """COPY a Dataset into users, challenges, points_transactions and user_points_ledgers
+
+    Returns {table: rows}. If the points ledger is maintained incrementally
+    (a watermark or the queue trigger from ops/points.py), ledgers are
+    rebuilt through points.rebuild() instead of copied, so the new
+    transactions are not counted twice.
+    """
+    cat = catalog.snapshot(conn, refresh=True)
+    for table in ("users", "challenges", "points_transactions", "user_points_ledgers"):
+        if not cat.has_table(table):
+            raise SynthError(f"table {table} does not exist")
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM users WHERE id LIKE %s LIMIT 1", (data.prefix.replace("_", r"\_") + "%",))
+        if cur.fetchone():
+            raise SynthError(f"users with prefix {data.prefix!r} already exist; use another seed or prefix")
+        first_challenge = _next_id(cur, "challenges")
+        first_transaction = _next_id(cur, "points_transactions")
+    conn.commit()
+
+    counts = {}
+    counts["users"] = copy_rows(conn, "users", USER_COLUMNS, data.user_rows(), data.users)
+    counts["challenges"] = copy_rows(
+        conn, "challenges", CHALLENGE_COLUMNS, data.challenge_rows(first_challenge), data.challenges)
+    counts["points_transactions"] = copy_rows(
+        conn, "points_transactions", TRANSACTION_COLUMNS,
+        data.transaction_rows(first_transaction, first_challenge), data.transactions)
+    with conn.cursor() as cur:
+        _sync_sequence(cur, "challenges")
+        _sync_sequence(cur, "points_transactions")
+    conn.commit()
+
+    if points.watermark(conn) is not None or points.trigger_installed(conn):
+        upserted, _ = points.rebuild(conn)
+        counts["user_points_ledgers"] = upserted
+    else:
+        counts["user_points_ledgers"] = copy_rows(
+            conn, "user_points_ledgers", LEDGER_COLUMNS, data.ledger_rows())
+
+    # Fresh planner statistics, so benchmarks do not start from an empty-table estimate
+    with conn.cursor() as cur:
+        for table in counts:
+            cur.execute(pgsql.SQL("ANALYZE {}").format(pgsql.Identifier(table)))
+    conn.commit()
+    return counts
@@ -0,0 +1,200 @@
+"""
+Payment tokens the app accepts, keyed by (chain_id, address).
+
+    from ops import tokens
+
+    token = tokens.lookup(row.payment_token_address, row.blockchain_chain_id)
+    if token:
+        print(tokens.to_units(row.amount, token), token.symbol)   # Decimal, never 1e6 guesses
+
+Addresses are checked and lowercased once, when the table below is loaded; a
+malformed entry fails at import instead of silently never matching. Lookups
+are dict hits. classify() resolves a whole column of addresses, once per
+distinct value.
+
+Without a chain id, an address resolves if every chain that lists it agrees
+on decimals (true for everything below). The result then has chain_id None
+and, where the chains disagree on the symbol, a combined one such as
+"ETH/POL".
+
+The testnet entries mirror client/src/config/chains.ts.
+"""
+
+import re
+from collections import namedtuple
+from decimal import Decimal
+
+Token = namedtuple("Token", "chain_id address symbol decimals")
+
+NATIVE = "0x0000000000000000000000000000000000000000"
+
+ETHEREUM = 1
+POLYGON = 137
+BASE = 8453
+ARBITRUM = 42161
+POLYGON_AMOY = 80002
+BASE_SEPOLIA = 84532
+ARBITRUM_SEPOLIA = 421614
+
+CHAIN_NAMES = {
+    ETHEREUM: "Ethereum",
+    POLYGON: "Polygon",
+    BASE: "Base",
+    ARBITRUM: "Arbitrum",
+    POLYGON_AMOY: "Polygon Amoy",
+    BASE_SEPOLIA: "Base Sepolia",
+    ARBITRUM_SEPOLIA: "Arbitrum Sepolia",
+}
+
+ADDRESS = re.compile(r"^0x[0-9a-f]{40}$")
+
+# (chain_id, address, symbol, decimals)
+_TOKENS = [
+    (ETHEREUM, NATIVE, "ETH", 18),
+    (ETHEREUM, "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48", "USDC", 6),
+    (ETHEREUM, "0xdac17f958d2ee523a2206206994597c13d831ec7", "USDT", 6),
+
+    (BASE, NATIVE, "ETH", 18),
+    (BASE, "0x833589fcd6edb6e08f4c7c32d4f71b3566da8860", "USDC", 6),
+
+    (POLYGON, NATIVE, "POL", 18),
+    (POLYGON, "0x3c499c542cef5e3811e1192ce70d8cc7d307b653", "USDC", 6),
+    (POLYGON, "0x2791bca1f2de4661ed88a30c99a7a9449aa84174", "USDC.e", 6),
+    (POLYGON, "0xc2132d05d31c914a87c6611c10748aeb04b58e8f", "USDT", 6),
+
+    (ARBITRUM, NATIVE, "ETH", 18),
+    (ARBITRUM, "0xff970a61a04b1ca14834a43f5de4533ebddb5fed", "USDC.e", 6),
+    (ARBITRUM, "0xfd086bc7cd5c481dcc9c85ffe45f54dc7c5437e9", "USDT", 6),
+
+    # The app's Base Sepolia config points at the Base mainnet USDC and Polygon USDC contracts
+    (BASE_SEPOLIA, NATIVE, "ETH", 18),
+    (BASE_SEPOLIA, "0x833589fcd6edb6e08f4c7c32d4f71b3566da8860", "USDC", 6),
+    (BASE_SEPOLIA, "0x3c499c542cef5e3811e1192ce70d8cc7d307b653", "USDT", 6),
+
+    (POLYGON_AMOY, NATIVE, "POL", 18),
+    (POLYGON_AMOY, "0x41e94cb5eb3092ec94a15db6b9123d1b2850b422", "USDC", 6),
+    (POLYGON_AMOY, "0xb932d46b8e0f9ca6c1ca48e7da2ca284baaac27a", "USDT", 6),
+
+    (ARBITRUM_SEPOLIA, NATIVE, "ETH", 18),
+    (ARBITRUM_SEPOLIA, "0x75faf114eafb1bdbe2f0316df893fd58ce46aa4d", "USDC", 6),
+    (ARBITRUM_SEPOLIA, "0xf66f95dc9f28f82faf3a3a1d25ab4cf4c4b7298c", "USDT", 6),
+]
+
+
+class InvalidAddress(ValueError):
+    pass
+
+
+def normalize(address):
+    """Lowercase 0x-address, or InvalidAddress if it is not 20 hex bytes"""
+    if not isinstance(address, str):
+        raise InvalidAddress(f"not an address: {address!r}")
+    normalized = address.strip().lower()
+    if not ADDRESS.match(normalized):
+        raise InvalidAddress(f"not an address: {address!r}")
+    return normalized
+
+
+def is_valid(address):
+    try:
+        normalize(address)
+        return True
+    except InvalidAddress:
+        return False
+
+
+def _build(entries):
+    by_key = {}
+    by_address = {}
+    for chain_id, address, symbol, decimals in entries:
+        token = Token(chain_id, normalize(address), symbol, decimals)
+        if (chain_id, token.address) in by_key:
+            raise ValueError(f"token {token.address} listed twice for chain {chain_id}")
+        by_key[(chain_id, token.address)] = token
+        by_address.setdefault(token.address, []).append(token)
+
+    # Address-only lookups resolve when all chains agree on the decimals
+    unique = {}
+    for address, listed in by_address.items():
+        if len({t.decimals for t in listed}) == 1:
+            symbol = "/".join(sorted({t.symbol for t in listed}))
+            unique[address] = Token(None, address, symbol, listed[0].decimals)
+    return by_key, by_address, unique
+
+
+_BY_KEY, _BY_ADDRESS, _UNIQUE = _build(_TOKENS)
+
+ADDRESSES = frozenset(_BY_ADDRESS)
+
+
+def lookup(address, chain_id=None):
+    """Token for `address` (any case) on `chain_id`, or None if unknown or ambiguous"""
+    if not address:
+        return None
+    key = address.lower()
+    if chain_id is not None:
+        return _BY_KEY.get((int(chain_id), key))
+    return _UNIQUE.get(key)
+
+
+def is_known(address, chain_id=None):
+    """True if `address` is a registered token (on `chain_id`, or on any chain)"""
+    if not address:
+        return False
+    key = address.lower()
+    if chain_id is not None:
+        return (int(chain_id), key) in _BY_KEY
+    return key in _BY_ADDRESS
+
+
+def for_chain(chain_id):
+    """Every registered token on `chain_id`, native first"""
+    return [t for t in _BY_KEY.values() if t.chain_id == chain_id]
+
+
+def address_of(symbol, chain_id):
+    """Registered address of `symbol` on `chain_id` (KeyError if none)"""
+    for token in _BY_KEY.values():
+        if token.chain_id == chain_id and token.symbol == symbol:
+            return token.address
+    raise KeyError(f"no {symbol} registered on chain {chain_id}")
+
+
+def classify(addresses, chain_ids=None):
+    """[Token or None] for a sequence of addresses (and optional parallel chain ids)
+
+    Each distinct (address, chain) pair is resolved once, however often it repeats.
+    """
+    if chain_ids is None:
+        chain_ids = [None] * len(addresses)
+    seen = {}
+    result = []
+    for address, chain_id in zip(addresses, chain_ids):
+        key = (address, chain_id)
+        if key not in seen:
+            seen[key] = lookup(address, chain_id)
+        result.append(seen[key])
+    return result
+
+
+def to_units(raw, token):
+    """Smallest-unit amount -> Decimal in whole tokens"""
+    return Decimal(str(raw)).scaleb(-token.decimals)
+
+
+def from_units(amount, token):
+    """Whole-token amount -> smallest-unit int (ValueError if it has more precision than the token)"""
+    scaled = Decimal(str(amount)).scaleb(token.decimals)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"{amount} has more than {token.decimals} decimals for {token.symbol}")
+    return int(scaled)
+
+
+def describe(address, chain_id=None):
+    """'USDC on Base', 'unknown token 0x…' and so on, for log lines"""
+    token = lookup(address, chain_id)
+    if token is None:
+        return f"unknown token {address}"
+    if chain_id is None:
+        return token.symbol
+    return f"{token.symbol} on {CHAIN_NAMES.get(token.chain_id, token.chain_id)}"
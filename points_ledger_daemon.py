@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Keep user_points_ledgers up to date as points_transactions rows are inserted.
+
+An insert trigger on points_transactions queues the new row ids and sends a
+NOTIFY on the `points_ledger` channel (see ops/points.py). This worker
+LISTENs on that channel. After the first notification it waits --window
+seconds so a burst of inserts arrives as one micro-batch. It then folds the
+queued rows into the ledgers in one transaction. Balances stay current
+without the API recomputing them on every read.
+
+Usage:
+  python points_ledger_daemon.py --install     # add the trigger (rebuilds every ledger once)
+  python points_ledger_daemon.py               # run the worker
+  python points_ledger_daemon.py --uninstall   # drop the trigger; use rebuild_points_ledger.py --incremental again
+
+The queue is drained every --poll seconds even when no notification
+arrives. A NOTIFY missed while the worker was down or reconnecting is
+therefore only delayed, never lost.
+"""
+import argparse
+import select
+import signal
+import sys
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+from ops import db, points
+
+RECONNECT_MAX_SECONDS = 60
+
+def open_connection(autocommit=False):
+    """Dedicated (unpooled) connection; the worker holds it for its lifetime"""
+    conn = psycopg2.connect(**db.parse_database_url(db.get_database_url()))
+    if autocommit:
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    return conn
+
+def listen():
+    conn = open_connection(autocommit=True)
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {points.CHANNEL}")
+    return conn
+
+def wait(listener, timeout):
+    """True if a notification arrived within `timeout` seconds"""
+    if not listener.notifies and select.select([listener], [], [], max(timeout, 0))[0]:
+        listener.poll()
+    if listener.notifies:
+        listener.notifies.clear()
+        return True
+    return False
+
+class Stats:
+    def __init__(self, every):
+        self.every = every
+        self.reset()
+
+    def reset(self):
+        self.since = time.monotonic()
+        self.rows = self.users = self.batches = 0
+        self.slowest = 0.0
+
+    def add(self, rows, users, seconds):
+        self.rows += rows
+        self.users += users
+        self.batches += 1
+        self.slowest = max(self.slowest, seconds)
+
+    def maybe_report(self):
+        if time.monotonic() - self.since < self.every:
+            return
+        if self.rows:
+            print(f"📋 {self.rows} transaction(s) → {self.users} ledger update(s) in {self.batches} batch(es), "
+                  f"slowest {self.slowest * 1000:.0f}ms")
+        self.reset()
+
+def flush(conn, batch_size, stats, verbose=False):
+    """Drain the whole queue in batches of `batch_size`"""
+    while True:
+        started = time.monotonic()
+        users, rows = points.drain(conn, batch_size)
+        seconds = time.monotonic() - started
+        if rows:
+            stats.add(rows, users, seconds)
+            if verbose:
+                print(f"   ✅ {rows} transaction(s) → {users} ledger(s) in {seconds * 1000:.0f}ms")
+        if rows < batch_size:
+            return
+
+def stop(signum, frame):
+    raise KeyboardInterrupt
+
+def run(args):
+    signal.signal(signal.SIGTERM, stop)
+
+    conn = open_connection()
+    if not points.trigger_installed(conn):
+        print("❌ Trigger not installed; run with --install first")
+        conn.close()
+        return 1
+
+    stats = Stats(args.report)
+    listener = None
+    backoff = 1
+    print(f"👂 Listening on '{points.CHANNEL}' (window {args.window * 1000:.0f}ms, poll {args.poll}s)")
+    try:
+        while True:
+            try:
+                if conn.closed:
+                    conn = open_connection()
+                if listener is None:
+                    listener = listen()
+                    # Catch up on anything queued while nobody was listening
+                    flush(conn, args.batch, stats, args.verbose)
+
+                if wait(listener, args.poll):
+                    deadline = time.monotonic() + args.window
+                    while time.monotonic() < deadline:
+                        wait(listener, deadline - time.monotonic())
+                flush(conn, args.batch, stats, args.verbose)
+                stats.maybe_report()
+                backoff = 1
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                reason = (str(e).strip() or e.__class__.__name__).splitlines()[0]
+                print(f"⚠️  Connection lost ({reason}); reconnecting in {backoff}s")
+                for c in (listener, conn):
+                    if c is not None and not c.closed:
+                        c.close()
+                listener = None
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping")
+    finally:
+        for c in (listener, conn):
+            if c is not None and not c.closed:
+                c.close()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply new points_transactions to user_points_ledgers as they arrive")
+    parser.add_argument('--install', action='store_true',
+                        help="install the insert trigger and rebuild all ledgers, then exit")
+    parser.add_argument('--uninstall', action='store_true',
+                        help="drop the insert trigger and rebuild all ledgers, then exit")
+    parser.add_argument('--window', type=float, default=0.05,
+                        help="seconds to collect notifications into one batch (default 0.05)")
+    parser.add_argument('--poll', type=float, default=5.0,
+                        help="drain the queue at least this often, in seconds (default 5)")
+    parser.add_argument('--batch', type=int, default=points.DRAIN_BATCH,
+                        help=f"max transactions per ledger update (default {points.DRAIN_BATCH})")
+    parser.add_argument('--report', type=float, default=60.0,
+                        help="seconds between throughput summaries (default 60)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print every batch")
+    args = parser.parse_args()
+
+    if args.install or args.uninstall:
+        conn = db.connect()
+        try:
+            started = time.monotonic()
+            if args.install:
+                upserted, zeroed = points.install_trigger(conn)
+                print(f"✅ Trigger installed; {upserted} ledger(s) rebuilt, {zeroed} reset to zero "
+                      f"in {time.monotonic() - started:.2f}s")
+            else:
+                upserted, zeroed = points.remove_trigger(conn)
+                print(f"✅ Trigger removed; {upserted} ledger(s) rebuilt, {zeroed} reset to zero "
+                      f"in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            sys.exit(1)
+        finally:
+            conn.close()
+        return
+
+    sys.exit(run(args))
+
+if __name__ == '__main__':
+    main()
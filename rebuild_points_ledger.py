@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Rebuild user_points_ledgers from points_transactions.
+
+Balances for all users come from one GROUP BY over points_transactions and
+one bulk upsert. Only ledgers whose values differ are written.
+
+Usage:
+  python rebuild_points_ledger.py                    # all users
+  python rebuild_points_ledger.py --user did:privy:… # one or more users
+  python rebuild_points_ledger.py --dry-run          # show drift, change nothing
+  python rebuild_points_ledger.py --incremental      # recompute users with transactions since the last run
+  python rebuild_points_ledger.py --verify [--sample N] [--repair]
+                                                     # spot-check N random ledgers (default 200)
+
+--incremental is what a cron job should run: it recomputes only users with
+transactions above the stored watermark. Schedule --verify (or --verify --sample 0 for
+every user) less often to catch drift the increments cannot see.
+"""
+import argparse
+import sys
+import time
+
+from ops import db, points
+
+def print_drift(rows):
+    print(f"\n📋 {len(rows)} ledger(s) out of date:\n")
+    for user_id, ledger_balance, balance, earned, burned in rows:
+        print(f"   {user_id[:40]:40}  ledger={ledger_balance}  computed={balance}  (earned {earned}, burned {burned})")
+
+def maintain(args):
+    """--incremental / --verify; returns the exit status"""
+    conn = db.connect()
+    try:
+        started = time.monotonic()
+        if args.incremental:
+            updated, watermark = points.apply_increments(conn)
+            print(f"✅ {updated} ledger(s) updated through points_transactions.id {watermark} "
+                  f"in {time.monotonic() - started:.2f}s")
+        if args.verify:
+            sample = args.sample or None
+            print(f"🔍 Verifying {'all' if sample is None else sample} ledger(s)...")
+            rows = points.verify(conn, sample=sample, repair=args.repair)
+            if not rows:
+                print("✅ No drift found")
+                return 0
+            print_drift(rows[:args.limit])
+            if args.repair:
+                print(f"\n🔧 Repaired {len(rows)} ledger(s)")
+                return 0
+            print(f"\n⚠️  Drift in {len(rows)} ledger(s); rerun with --repair to fix")
+            return 1
+        return 0
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+        return 1
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_points_ledgers from points_transactions")
+    parser.add_argument('--user', action='append', dest='users',
+                        help="rebuild only this user (repeatable); default is all users")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="list ledgers that would change without writing")
+    parser.add_argument('--limit', type=int, default=50,
+                        help="rows to show with --dry-run (default 50)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="apply only transactions above the watermark")
+    parser.add_argument('--verify', action='store_true',
+                        help="compare a random sample of ledgers with their transactions")
+    parser.add_argument('--sample', type=int, default=200,
+                        help="ledgers to check with --verify; 0 checks every user (default 200)")
+    parser.add_argument('--repair', action='store_true',
+                        help="with --verify, rewrite ledgers found to have drifted")
+    args = parser.parse_args()
+    
+    if args.incremental or args.verify:
+        sys.exit(maintain(args))
+
+    scope = f"{len(args.users)} user(s)" if args.users else "all users"
+    print(f"🔄 Rebuilding points ledgers for {scope}...")
+
+    conn = db.connect()
+    try:
+        started = time.monotonic()
+        if args.dry_run:
+            print_drift(points.drift(conn, args.users, limit=args.limit))
+        else:
+            upserted, zeroed = points.rebuild(conn, args.users)
+            print(f"\n✅ {upserted} ledger(s) updated, {zeroed} reset to zero "
+                  f"in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        conn.rollback()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
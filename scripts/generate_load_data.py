@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Bulk-load synthetic users, challenges, points transactions and ledgers for
+load testing (see ops/synth.py).
+
+Usage:
+  python scripts/generate_load_data.py                                  # 10k users, 100k challenges, 500k transactions
+  python scripts/generate_load_data.py --users 200000 --challenges 2000000 --transactions 5000000
+  python scripts/generate_load_data.py --seed 2 --dirty 0.01            # a second dataset, 1% broken challenges
+
+The same --seed always generates the same rows. Loading into a database
+that is not on localhost needs --force.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ops import db, progress, synth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY deterministic synthetic data into the database")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--challenges", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=500_000, help="points_transactions rows")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=365, help="length of the activity window ending 2026-01-01")
+    parser.add_argument("--dirty", type=float, default=0.0,
+                        help="fraction of challenges with a defect fix_challenge_data.py repairs")
+    parser.add_argument("--prefix", help="user id prefix (default synth-<seed>-)")
+    parser.add_argument("--force", action="store_true", help="allow a non-local DATABASE_URL")
+    args = parser.parse_args()
+
+    host = db.parse_database_url(db.get_database_url()).get("host") or ""
+    if host not in db.LOCAL_HOSTS and not args.force:
+        print(f"❌ DATABASE_URL points at {host}; pass --force to load synthetic data there")
+        return 1
+
+    data = synth.Dataset(args.users, args.challenges, args.transactions, seed=args.seed,
+                         days=args.days, dirty=args.dirty, prefix=args.prefix)
+    print(f"🧪 Generating {args.users:,} users, {args.challenges:,} challenges and "
+          f"{args.transactions:,} points transactions (seed {args.seed})")
+
+    conn = db.connect()
+    started = time.monotonic()
+    try:
+        counts = synth.load(conn, data)
+    except synth.SynthError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+    total = sum(counts.values())
+    elapsed = time.monotonic() - started
+    print(f"\n✅ Loaded {total:,} rows in {progress.format_duration(elapsed)}")
+    for table, rows in counts.items():
+        print(f"   {table}: {rows:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
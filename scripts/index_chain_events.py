@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Index ChallengeFactory and ChallengeEscrow events by block range into
+ops_chain_events, merging challenge creations and stakes into challenges
+(see ops/indexer.py). Resumes from the per-chain checkpoint.
+
+Usage:
+  python scripts/index_chain_events.py                                   # local anvil, addresses from env
+  python scripts/index_chain_events.py --rpc $VITE_BASE_SEPOLIA_RPC --confirmations 5 --from-block 12000000
+  python scripts/index_chain_events.py --follow --poll 2                 # keep indexing new blocks
+  python scripts/index_chain_events.py --reset --from-block 0            # start over
+
+Windows of --span blocks are requested --batch at a time in one JSON-RPC
+request; capped windows are split and refetched automatically.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ops import db, evm, indexer, onchain, progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpointed ChallengeFactory/ChallengeEscrow event indexer")
+    parser.add_argument("--rpc", default="http://127.0.0.1:8545",
+                        help="JSON-RPC URL (default: local anvil)")
+    parser.add_argument("--factory", default=os.getenv("VITE_BASE_CHALLENGE_FACTORY_ADDRESS"))
+    parser.add_argument("--escrow", default=os.getenv("VITE_BASE_CHALLENGE_ESCROW_ADDRESS"))
+    parser.add_argument("--chain-id", type=int, help="default: the node's")
+    parser.add_argument("--name", default="challenges", help="checkpoint name (one per set of contracts)")
+    parser.add_argument("--from-block", type=int, default=0, help="first block when there is no checkpoint")
+    parser.add_argument("--to-block", type=int, help="default: head minus --confirmations")
+    parser.add_argument("--confirmations", type=int, default=0, help="blocks to stay behind the head")
+    parser.add_argument("--span", type=int, default=indexer.SPAN, help="initial blocks per eth_getLogs call")
+    parser.add_argument("--batch", type=int, default=indexer.BATCH, help="eth_getLogs calls per request")
+    parser.add_argument("--reset", action="store_true", help="drop the checkpoint and start at --from-block")
+    parser.add_argument("--follow", action="store_true", help="keep polling for new blocks")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between polls with --follow")
+    args = parser.parse_args()
+
+    rpc = evm.Rpc(args.rpc)
+    try:
+        source = indexer.Source(rpc, factory=args.factory, escrow=args.escrow)
+        chain_id = args.chain_id or rpc.chain_id()
+    except (OSError, evm.RpcError, indexer.IndexerError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"📡 Indexing {', '.join(source.addresses)} on chain {chain_id} via {args.rpc}")
+
+    conn = db.connect()
+    if args.reset:
+        indexer.reset(conn, chain_id, args.name)
+        print(f"🔧 Checkpoint {args.name} reset")
+
+    def on_commit(last_block, to_block, events):
+        print(f"   ⏳ block {last_block:,}/{to_block:,}, {events:,} event(s)", flush=True)
+
+    try:
+        while True:
+            started = time.monotonic()
+            counts = indexer.run(
+                conn, source, args.name, chain_id=chain_id, from_block=args.from_block,
+                to_block=args.to_block, confirmations=args.confirmations, span=args.span,
+                batch=args.batch, on_commit=on_commit,
+            )
+            if counts["from_block"] <= counts["to_block"]:
+                print(f"✅ Blocks {counts['from_block']:,}-{counts['to_block']:,}: {counts['events']:,} event(s) "
+                      f"({counts['stored']:,} new) in {counts['requests']:,} request(s), "
+                      f"{progress.format_duration(time.monotonic() - started)}")
+                print(f"   Challenges inserted: {counts['inserted']:,}, updated: {counts['updated']:,}, "
+                      f"unchanged: {counts['unchanged']:,}")
+                if counts["orphans"]:
+                    print(f"   ⚠️  {counts['orphans']:,} challenge(s) with stake events but no creation event or row")
+            elif not args.follow:
+                print(f"ℹ️  Already at block {counts['to_block']:,}; nothing to index")
+            if not args.follow or args.to_block is not None:
+                return 0
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        print("\n⏭️  Stopped; the next run resumes from the checkpoint")
+        return 0
+    except (OSError, evm.RpcError, indexer.IndexerError, onchain.IngestError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        rpc.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Ingest ChallengeFactory events (ChallengeCreatedP2P, CreatorStakeLocked,
+ParticipantStakeLocked) into challenges, in batches. Safe to rerun (see
+ops/onchain.py).
+
+Usage:
+  python scripts/ingest_onchain_events.py --jsonl events.jsonl [--chain-id 84532]
+  python scripts/ingest_onchain_events.py --rpc http://127.0.0.1:8545 --factory 0x… --from-block 0 [--to-block N]
+
+JSONL lines may be raw eth_getLogs entries (topics + data) or decoded
+events ({"event", "args", "transactionHash", ...}, or fetch_tx_logs.js's
+"parsed" form). Lines for other events are skipped.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ops import db, evm, onchain, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched, idempotent ChallengeFactory event ingestion")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--jsonl", nargs="+", help="JSONL file(s) of logs or decoded events")
+    source.add_argument("--rpc", help="JSON-RPC URL of a node to read logs from")
+    parser.add_argument("--factory", default=os.getenv("VITE_BASE_CHALLENGE_FACTORY_ADDRESS"),
+                        help="ChallengeFactory address (with --rpc)")
+    parser.add_argument("--from-block", type=int, default=0)
+    parser.add_argument("--to-block", type=int, help="default: latest")
+    parser.add_argument("--chunk", type=int, default=2000, help="blocks per eth_getLogs call")
+    parser.add_argument("--chain-id", type=int, help=f"default: the node's, or {tokens.BASE_SEPOLIA} for JSONL")
+    parser.add_argument("--batch-size", type=int, default=onchain.BATCH_SIZE, help="challenges per transaction")
+    args = parser.parse_args()
+
+    events = onchain.factory_events()
+    started = time.monotonic()
+    try:
+        if args.rpc:
+            if not args.factory:
+                parser.error("--rpc needs --factory (or VITE_BASE_CHALLENGE_FACTORY_ADDRESS)")
+            rpc = evm.Rpc(args.rpc)
+            to_block = args.to_block if args.to_block is not None else rpc.block_number()
+            print(f"📡 Reading logs of {args.factory} from blocks {args.from_block}-{to_block}...")
+            logs = list(onchain.read_rpc(rpc, args.factory, events, args.from_block, to_block,
+                                         args.chain_id, args.chunk))
+            print(f"   {len(logs):,} event(s) in {rpc.requests} request(s)")
+        else:
+            chain_id = args.chain_id or tokens.BASE_SEPOLIA
+            logs = [log for path in args.jsonl for log in onchain.read_jsonl(path, events, chain_id)]
+            print(f"📄 {len(logs):,} event(s) read from {len(args.jsonl)} file(s)")
+    except (OSError, evm.RpcError, onchain.IngestError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    conn = db.connect()
+    try:
+        counts = onchain.ingest(
+            conn, logs, args.batch_size,
+            on_batch=lambda done, total: print(f"   ⏳ {done:,}/{total:,} challenges merged", flush=True),
+        )
+    except onchain.IngestError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"\n✅ {counts['events']:,} event(s) for {counts['challenges']:,} challenge(s) "
+          f"in {time.monotonic() - started:.1f}s")
+    print(f"   Inserted: {counts['inserted']:,}")
+    print(f"   Updated: {counts['updated']:,}")
+    print(f"   Already up to date: {counts['unchanged']:,}")
+    if counts["orphans"]:
+        print(f"   ⚠️  {counts['orphans']:,} challenge(s) with stake events but no creation event or row; "
+              f"rerun after ingesting their creation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Drive many challenges through create/join/stake/vote/resolve concurrently
+and report per-step latency percentiles, lock waits and deadlocks (see
+ops/loadsim.py).
+
+Usage:
+  python scripts/simulate_challenge_load.py                           # 1000 challenges, 8 workers
+  python scripts/simulate_challenge_load.py --challenges 5000 --workers 32 --joiners 4
+  python scripts/simulate_challenge_load.py --prefix synth-1- --json loadsim.json
+  python scripts/simulate_challenge_load.py --lock-timeout 200        # count lock timeouts instead of waiting
+
+Users come from the users table (--prefix picks the ones
+scripts/generate_load_data.py created). Running against a database that is
+not on localhost needs --force.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ops import db, loadsim
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent challenge lifecycle load simulator")
+    parser.add_argument("--challenges", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8, help="threads, one connection each")
+    parser.add_argument("--in-flight", type=int, help="challenges active at once (default 4 x workers)")
+    parser.add_argument("--joiners", type=int, default=2, help="users racing to join each challenge")
+    parser.add_argument("--users", type=int, default=10000, help="how many users to draw from")
+    parser.add_argument("--prefix", help="only users whose id starts with this")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--lock-timeout", type=int, help="lock_timeout in ms for the workers")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--force", action="store_true", help="allow a non-local DATABASE_URL")
+    args = parser.parse_args()
+
+    host = db.parse_database_url(db.get_database_url()).get("host") or ""
+    if host not in db.LOCAL_HOSTS and not args.force:
+        print(f"❌ DATABASE_URL points at {host}; pass --force to run the simulator there")
+        return 1
+
+    print(f"🚦 Simulating {args.challenges:,} challenge lifecycles on {args.workers} workers...")
+    try:
+        report = loadsim.run(
+            challenges=args.challenges, workers=args.workers, users=args.users, prefix=args.prefix,
+            in_flight=args.in_flight, joiners=args.joiners, seed=args.seed, lock_timeout=args.lock_timeout,
+        )
+    except loadsim.SimulationError as e:
+        print(f"❌ {e}")
+        return 1
+
+    loadsim.print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+    return 1 if report["failed_steps"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,156 +5,150 @@ Migration script to fix challenge data inconsistencies:
 2. Fix challenges with NULL payment_token_address
 3. Backup data before making changes
 4. Validate results
+
+Pass --stream to read flagged challenges through a server-side cursor
+(for very large challenges tables).
 """
 
-import os
 import sys
-import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from collections import Counter
+from pathlib import Path
+from psycopg2.extras import NamedTupleCursor
 from datetime import datetime
-from urllib.parse import urlparse
 
-# Known token addresses (lowercased for comparison)
-KNOWN_TOKENS = {
-    # ETH (native)
-    "0x0000000000000000000000000000000000000000": "ETH",
-    # USDC addresses (Base, Base Test, Polygon, Ethereum, Arbitrum)
-    "0x833589fcd6edb6e08f4c7c32d4f71b3566da8860": "USDC",  # Base
-    "0x1c7d4b3638f4dea3d3a4b9c8e5f7a6b2c3d4e5f6g": "USDC",  # Base Test
-    "0x2791bca1f2de4661ed88a30c99a7a9449aa84174": "USDC",  # Polygon
-    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48": "USDC",  # Ethereum
-    "0xff970a61a04b1ca14834a43f5de4533ebddb5fed": "USDC",  # Arbitrum
-    # USDT addresses (Base, Polygon, Arbitrum, Ethereum)
-    "0x3c499c542cef5e3811e1192ce70d8cc7d307b653": "USDT",  # Base
-    "0xc2132d05d31c914a87c6611c10748aeb04b58e8f": "USDT",  # Polygon
-    "0xfd086bc7cd5c481dcc9c85ffe45f54dc7c5437e9": "USDT",  # Arbitrum
-    "0xdac17f958d2ee523a2206206994597c13d831ec7": "USDT",  # Ethereum
-}
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from ops import backfill, backup, db, progress, quality, tokens
 
 def get_db_connection():
-    """Get database connection from DATABASE_URL"""
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        print("❌ DATABASE_URL not set in environment")
-        sys.exit(1)
-    
-    # Parse the URL
-    parsed = urlparse(db_url)
-    conn = psycopg2.connect(
-        host=parsed.hostname,
-        port=parsed.port or 5432,
-        database=parsed.path[1:],
-        user=parsed.username,
-        password=parsed.password,
-        sslmode='require'
-    )
-    return conn
+    """Get a pooled database connection from DATABASE_URL"""
+    return db.connect()
 
 def backup_affected_records(conn, issues):
-    """Create a backup of affected records"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"/workspaces/56yhggy6/server/migrations/backup_challenges_{timestamp}.json"
-    
-    with open(backup_file, 'w') as f:
-        json.dump(issues, f, indent=2, default=str)
+    """Stream every affected challenge row to a compressed COPY file with a manifest"""
+    ids = sorted({c.id for c in issues["wrong_admin_flag"] + issues["null_token_address"]})
+    summary = {
+        "timestamp": issues["timestamp"],
+        "wrong_admin_flag": len(issues["wrong_admin_flag"]),
+        "null_token_address": len(issues["null_token_address"]),
+        "invalid_token_address": issues["invalid_token_address"],
+    }
+    manifest = backup.backup(
+        conn, 'challenges',
+        where="id = ANY(%(ids)s)", params={'ids': ids},
+        label="backup_challenges", meta=summary,
+    )
     
-    print(f"✅ Backup created: {backup_file}")
-    return backup_file
+    print(f"✅ Backup created: {manifest.data_path} ({manifest.rows} rows)")
+    print(f"   Restore with: python -m ops restore {manifest.path}")
+    return manifest.path
 
-def identify_issues(conn):
-    """Identify all data consistency issues"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
+ISSUE_COLUMNS = """
+    id, title, status, admin_created, payment_token_address,
+    challenger, challenged, created_at
+"""
+
+# Issue name -> the ops/quality.py rule that defines it
+ISSUE_RULES = {
+    "wrong_admin_flag": quality.RULES["challenges.open_admin_flag"],
+    "null_token_address": quality.RULES["challenges.null_payment_token"],
+    "invalid_token_address": quality.RULES["challenges.unknown_payment_token"],
+}
+
+ISSUE_FLAGS = ",\n           ".join(
+    f"coalesce(({r.predicate}), false) AS {name}" for name, r in ISSUE_RULES.items()
+)
+
+# Every rule in one predicate, so the table is scanned once however many rules there are;
+# each rule's match is also selected as a flag column named after the issue
+ISSUE_QUERY = f"""
+    SELECT {ISSUE_COLUMNS.strip()},
+           {ISSUE_FLAGS}
+    FROM challenges
+    WHERE {" OR ".join(f"({r.predicate})" for r in ISSUE_RULES.values())}
+"""
+
+# Summary counts, taken in the same scan as the validation rules
+STAT_RULES = [
+    quality.Rule("admin_count", "challenges", "admin_created = true", "", None, {}, "id"),
+    quality.Rule("p2p_count", "challenges", "admin_created = false", "", None, {}, "id"),
+    quality.Rule("open_count", "challenges", "status = 'open'", "", None, {}, "id"),
+]
+
+def classify_challenge(challenge):
+    """Names of the rules a challenge row (namedtuple from ISSUE_QUERY) breaks"""
+    return [name for name in ISSUE_RULES if getattr(challenge, name)]
+
+def identify_issues(conn, stream=False, itersize=5000):
+    """Identify all data consistency issues in one pass over challenges
+
+    stream=True reads through a server-side cursor, `itersize` rows at a
+    time, instead of materialising the result on the client.
+    """
     issues = {
         "wrong_admin_flag": [],
         "null_token_address": [],
         "invalid_token_address": [],
         "timestamp": datetime.now().isoformat()
     }
+    unknown_tokens = Counter()
+    params = {k: v for r in ISSUE_RULES.values() for k, v in r.params.items()}
     
-    # Issue 1: Open challenges with admin_created=true (should be false)
-    print("\n🔍 Checking for open challenges with wrong admin_created flag...")
-    cursor.execute("""
-        SELECT id, title, status, admin_created, payment_token_address, 
-               challenger, challenged, created_at
-        FROM challenges
-        WHERE status = 'open' AND admin_created = true
-        ORDER BY created_at DESC
-    """)
+    print("\n🔍 Checking challenges for wrong admin_created flags, NULL and unknown token addresses...")
+    if stream:
+        rows = db.scan(conn, ISSUE_QUERY, params, itersize=itersize)
+    else:
+        with conn.cursor(cursor_factory=NamedTupleCursor) as cursor:
+            cursor.execute(ISSUE_QUERY, params)
+            rows = cursor.fetchall()
     
-    wrong_admin = cursor.fetchall()
-    issues["wrong_admin_flag"] = [dict(r) for r in wrong_admin]
+    scanned = progress.Progress("flagged challenges")
+    for challenge in rows:
+        scanned.update(1)
+        for rule in classify_challenge(challenge):
+            if rule == "invalid_token_address":
+                unknown_tokens[challenge.payment_token_address] += 1
+            else:
+                issues[rule].append(challenge)
+    if stream:
+        scanned.finish()
     
+    for rule in ("wrong_admin_flag", "null_token_address"):
+        issues[rule].sort(key=lambda c: c.created_at or datetime.min, reverse=True)
+    issues["invalid_token_address"] = [
+        {"address": token, "count": count} for token, count in sorted(unknown_tokens.items())
+    ]
+    
+    # Issue 1: Open challenges with admin_created=true (should be false)
+    wrong_admin = issues["wrong_admin_flag"]
     if wrong_admin:
         print(f"⚠️  Found {len(wrong_admin)} open challenges with admin_created=true:")
         for challenge in wrong_admin:
-            print(f"   - ID {challenge['id']}: {challenge['title'][:50]}")
+            print(f"   - ID {challenge.id}: {challenge.title[:50]}")
     else:
         print("✅ No open challenges with wrong admin_created flag")
     
     # Issue 2: Challenges with NULL payment_token_address
-    print("\n🔍 Checking for challenges with NULL payment_token_address...")
-    cursor.execute("""
-        SELECT id, title, status, admin_created, payment_token_address,
-               challenger, challenged, created_at
-        FROM challenges
-        WHERE payment_token_address IS NULL OR payment_token_address = ''
-        ORDER BY created_at DESC
-    """)
-    
-    null_tokens = cursor.fetchall()
-    issues["null_token_address"] = [dict(r) for r in null_tokens]
-    
+    null_tokens = issues["null_token_address"]
     if null_tokens:
         print(f"⚠️  Found {len(null_tokens)} challenges with NULL/empty token address:")
         for challenge in null_tokens:
-            is_admin = "ADMIN" if challenge['admin_created'] else "P2P"
-            print(f"   - ID {challenge['id']} ({is_admin}): {challenge['title'][:50]}")
+            is_admin = "ADMIN" if challenge.admin_created else "P2P"
+            print(f"   - ID {challenge.id} ({is_admin}): {challenge.title[:50]}")
     else:
         print("✅ No challenges with NULL token address")
     
     # Issue 3: Challenges with invalid token addresses (not in known list)
-    print("\n🔍 Checking for challenges with invalid token addresses...")
-    cursor.execute("""
-        SELECT DISTINCT payment_token_address
-        FROM challenges
-        WHERE payment_token_address IS NOT NULL 
-        AND payment_token_address != ''
-        ORDER BY payment_token_address
-    """)
-    
-    all_tokens = cursor.fetchall()
-    invalid_tokens = []
-    
-    for token_row in all_tokens:
-        token = token_row['payment_token_address']
-        if token and token.lower() not in KNOWN_TOKENS:
-            invalid_tokens.append(token)
-    
-    if invalid_tokens:
-        print(f"⚠️  Found {len(set(invalid_tokens))} unique unknown token addresses:")
-        for token in set(invalid_tokens):
-            # Count how many challenges use this token
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM challenges WHERE payment_token_address = %s",
-                (token,)
-            )
-            count = cursor.fetchone()['count']
-            print(f"   - {token}: {count} challenges")
-            issues["invalid_token_address"].append({
-                "address": token,
-                "count": count
-            })
+    if unknown_tokens:
+        print(f"⚠️  Found {len(unknown_tokens)} unique unknown token addresses:")
+        for entry in issues["invalid_token_address"]:
+            print(f"   - {entry['address']}: {entry['count']} challenges")
     else:
         print("✅ All token addresses are valid")
     
-    cursor.close()
     return issues
 
 def fix_issues(conn, issues):
-    """Fix identified issues"""
-    cursor = conn.cursor()
+    """Fix identified issues in resumable chunks, touching only the backed-up rows"""
     fixes = {
         "admin_flag_fixed": 0,
         "token_address_fixed": 0,
@@ -163,106 +157,73 @@ def fix_issues(conn, issues):
     
     try:
         # Fix 1: Correct admin_created flag for open P2P challenges
-        if issues["wrong_admin_flag"]:
-            print(f"\n🔧 Fixing {len(issues['wrong_admin_flag'])} challenges with wrong admin_created flag...")
-            for challenge in issues["wrong_admin_flag"]:
-                try:
-                    # Only fix if it's P2P (has challenger and challenged users)
-                    if challenge['challenger'] and challenge['challenged']:
-                        cursor.execute(
-                            "UPDATE challenges SET admin_created = false WHERE id = %s",
-                            (challenge['id'],)
-                        )
-                        fixes["admin_flag_fixed"] += 1
-                        print(f"   ✓ Fixed ID {challenge['id']}")
-                except Exception as e:
-                    error_msg = f"   ❌ Error fixing ID {challenge['id']}: {str(e)}"
-                    print(error_msg)
-                    fixes["errors"].append(error_msg)
+        # Only fix if it's P2P (has challenger and challenged users)
+        admin_ids = [c.id for c in issues["wrong_admin_flag"] if c.challenger and c.challenged]
+        if admin_ids:
+            print(f"\n🔧 Fixing {len(admin_ids)} challenges with wrong admin_created flag...")
+            fixes["admin_flag_fixed"] = backfill.run(
+                conn, 'fix_challenge_data.admin_flag', 'challenges',
+                where="id = ANY(%(target_ids)s)",
+                params={'target_ids': admin_ids},
+                sql="UPDATE challenges SET admin_created = false WHERE id = ANY(%(keys)s)",
+            )
         
         # Fix 2: Set default token address for challenges with NULL
-        if issues["null_token_address"]:
-            print(f"\n🔧 Fixing {len(issues['null_token_address'])} challenges with NULL token address...")
-            for challenge in issues["null_token_address"]:
-                try:
-                    # Default to ETH for all challenges
-                    default_token = "0x0000000000000000000000000000000000000000"
-                    cursor.execute(
-                        "UPDATE challenges SET payment_token_address = %s WHERE id = %s",
-                        (default_token, challenge['id'])
-                    )
-                    fixes["token_address_fixed"] += 1
-                    print(f"   ✓ Fixed ID {challenge['id']} → ETH")
-                except Exception as e:
-                    error_msg = f"   ❌ Error fixing ID {challenge['id']}: {str(e)}"
-                    print(error_msg)
-                    fixes["errors"].append(error_msg)
+        token_ids = [c.id for c in issues["null_token_address"]]
+        if token_ids:
+            print(f"\n🔧 Fixing {len(token_ids)} challenges with NULL token address...")
+            # Default to ETH for all challenges
+            fixes["token_address_fixed"] = backfill.run(
+                conn, 'fix_challenge_data.token_address', 'challenges',
+                where="id = ANY(%(target_ids)s)",
+                params={'target_ids': token_ids, 'default_token': tokens.NATIVE},
+                sql="UPDATE challenges SET payment_token_address = %(default_token)s WHERE id = ANY(%(keys)s)",
+            )
         
-        # Commit all changes
-        conn.commit()
         print(f"\n✅ Database commit successful!")
         
     except Exception as e:
         conn.rollback()
-        print(f"\n❌ Error during fixes, rolling back: {str(e)}")
+        print(f"\n❌ Error during fixes, rolling back uncommitted chunk: {str(e)}")
+        print("   Rerun to resume from the last committed chunk")
         fixes["errors"].append(f"Transaction failed: {str(e)}")
-    finally:
-        cursor.close()
     
     return fixes
 
 def validate_fixes(conn):
-    """Validate that fixes were applied correctly"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
+    """Validate that fixes were applied correctly, in one scan of challenges"""
     print("\n✔️ Validating fixes...")
+    checked = [ISSUE_RULES["wrong_admin_flag"], ISSUE_RULES["null_token_address"]]
+    result = quality.scan(conn, 'challenges', checked + STAT_RULES, sample=0)
+    counts = {v.rule: v.count for v in result.violations}
     
-    # Check 1: No more open challenges with admin_created=true
-    cursor.execute("""
-        SELECT COUNT(*) as count FROM challenges
-        WHERE status = 'open' AND admin_created = true
-    """)
-    wrong_admin_count = cursor.fetchone()['count']
-    
+    # Check 1: No more open P2P challenges with admin_created=true
+    wrong_admin_count = counts[checked[0].name]
     if wrong_admin_count == 0:
-        print("✅ Validation: No open challenges with admin_created=true")
+        print("✅ Validation: No open challenges with wrong admin_created flag")
     else:
-        print(f"⚠️  Validation: Still {wrong_admin_count} open challenges with admin_created=true")
+        print(f"⚠️  Validation: Still {wrong_admin_count} open challenges with wrong admin_created flag")
     
     # Check 2: No more NULL token addresses
-    cursor.execute("""
-        SELECT COUNT(*) as count FROM challenges
-        WHERE payment_token_address IS NULL OR payment_token_address = ''
-    """)
-    null_count = cursor.fetchone()['count']
-    
+    null_count = counts[checked[1].name]
     if null_count == 0:
         print("✅ Validation: No challenges with NULL token address")
     else:
         print(f"⚠️  Validation: Still {null_count} challenges with NULL token address")
     
     # Check 3: Summary stats
-    cursor.execute("""
-        SELECT 
-            COUNT(*) as total,
-            SUM(CASE WHEN admin_created = true THEN 1 ELSE 0 END) as admin_count,
-            SUM(CASE WHEN admin_created = false THEN 1 ELSE 0 END) as p2p_count,
-            SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open_count
-        FROM challenges
-    """)
-    
-    stats = cursor.fetchone()
+    stats = {"total": result.rows}
+    stats.update((r.name, counts[r.name]) for r in STAT_RULES)
     print(f"\n📊 Challenge Statistics:")
     print(f"   Total challenges: {stats['total']}")
     print(f"   Admin challenges: {stats['admin_count']}")
     print(f"   P2P challenges: {stats['p2p_count']}")
     print(f"   Open challenges: {stats['open_count']}")
     
-    cursor.close()
     return {
         "wrong_admin_count": wrong_admin_count,
         "null_token_count": null_count,
-        "stats": dict(stats)
+        "stats": stats
     }
 
 def main():
@@ -281,7 +242,7 @@ def main():
         print("\n" + "=" * 60)
         print("PHASE 1: IDENTIFYING ISSUES")
         print("=" * 60)
-        issues = identify_issues(conn)
+        issues = identify_issues(conn, stream='--stream' in sys.argv)
         
         # Backup data
         print("\n" + "=" * 60)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Check ops/online_alter.py against a scratch table: a NOT NULL column with a
+DEFAULT and an index changes type online and keeps its default, NOT NULL
+and index. The scratch table is dropped afterwards.
+"""
+
+import sys
+
+from ops import catalog, db, online_alter
+
+TABLE = "ops_online_alter_check"
+
+
+def main():
+    conn = db.connect()
+    failures = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cur.execute(f"""
+                CREATE TABLE {TABLE} (
+                    id SERIAL PRIMARY KEY,
+                    amount INTEGER NOT NULL DEFAULT 7,
+                    status VARCHAR(20) DEFAULT 'open'
+                )
+            """)
+            cur.execute(f"CREATE INDEX {TABLE}_amount_idx ON {TABLE} (amount)")
+            cur.execute(f"INSERT INTO {TABLE} (amount) SELECT g FROM generate_series(1, 1000) g")
+        conn.commit()
+
+        print(f"\n🧪 Defaulted column {TABLE}.amount...")
+        blockers = online_alter._blocking_dependencies(conn, TABLE, "amount")
+        if blockers:
+            failures.append(f"default counted as a blocking dependency: {blockers}")
+        online_alter.change_column_type(conn, TABLE, "amount", "bigint", batch_size=200, sleep=0)
+
+        col = catalog.snapshot(conn, refresh=True).column(TABLE, "amount")
+        if col.type != "bigint":
+            failures.append(f"amount is {col.type}, expected bigint")
+        if not col.not_null:
+            failures.append("amount lost NOT NULL")
+        with conn.cursor() as cur:
+            cur.execute(f"INSERT INTO {TABLE} DEFAULT VALUES RETURNING amount")
+            if cur.fetchone()[0] != 7:
+                failures.append("amount lost its default")
+            cur.execute(f"SELECT count(*), sum(amount) FROM {TABLE} WHERE id <= 1000")
+            if cur.fetchone() != (1000, 500500):
+                failures.append("backfilled values differ")
+            cur.execute("SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                        (TABLE, f"{TABLE}_amount_idx"))
+            if cur.fetchone() is None:
+                failures.append("index was not rebuilt")
+        conn.rollback()
+
+        print(f"\n🧪 Defaulted varchar column {TABLE}.status...")
+        online_alter.change_column_type(conn, TABLE, "status", "text", batch_size=200, sleep=0)
+        with conn.cursor() as cur:
+            cur.execute(f"INSERT INTO {TABLE} DEFAULT VALUES RETURNING status")
+            if cur.fetchone()[0] != "open":
+                failures.append("status lost its default")
+        conn.rollback()
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.commit()
+        conn.close()
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("\n✅ Defaulted columns change type online and keep their defaults")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
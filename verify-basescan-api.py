@@ -1,110 +1,167 @@
 #!/usr/bin/env python3
 """
 BaseScan contract verification using the REST API
+
+Each contract is submitted as standard-json-input built from the Hardhat
+build-info in contracts/artifacts (see ops/artifacts.py), so imports verify
+without flattening. All contracts are submitted concurrently and their GUIDs
+polled until BaseScan reports a result, under a shared rate limit (see
+ops/explorer.py).
+
+Usage:
+  python verify-basescan-api.py                       # Base Sepolia
+  python verify-basescan-api.py --api URL --rate 5    # another explorer / plan
+  python verify-basescan-api.py --mock                # dry run against ops/mock_explorer.py,
+                                                      # its eth_getCode and a scratch status cache
 """
-import requests
-import json
+import argparse
+import asyncio
 import os
+import sys
+import tempfile
 from pathlib import Path
 
+from ops import artifacts, explorer
+from ops.mock_explorer import MockExplorer
+
 BASESCAN_API = "https://api-sepolia.basescan.org/api"
-API_KEY = "Y8FSM4KAIQW5NSYUT2K7YXRJ8SYHHWPSAI"
+CHAIN_ID = 84532  # Base Sepolia
+RPC_URL = os.getenv("VITE_BASE_SEPOLIA_RPC", "https://sepolia.base.org")
+API_KEY = os.getenv("BASESCAN_API_KEY", "Y8FSM4KAIQW5NSYUT2K7YXRJ8SYHHWPSAI")
 
-# Read contract source files
-CONTRACTS_DIR = Path("/workspaces/class7768project/contracts/src")
+# Hardhat output; payloads are built from build-info/ (see ops/artifacts.py)
+ARTIFACTS_DIR = Path(__file__).resolve().parent / "contracts" / "artifacts"
 
 CONTRACTS = [
     {
         "name": "BantahPoints",
         "address": "0x3Fc4Eb09540625A07AB7c485c8e2c03a0F15FDCB",
-        "file": "BantahPoints.sol",
-        "compiler": "v0.8.20+commit.a35aead5",
-        "optimization": True,
-        "runs": 200,
     },
     {
         "name": "ChallengeEscrow",
         "address": "0xC107f8328712998abBB2cCf559f83EACF476AE82",
-        "file": "ChallengeEscrow.sol",
-        "compiler": "v0.8.20+commit.a35aead5",
-        "optimization": True,
-        "runs": 200,
     },
     {
         "name": "ChallengeFactory",
         "address": "0xcE1D04A1830035Aa117A910f285818FF1AFca621",
-        "file": "ChallengeFactory.sol",
-        "compiler": "v0.8.20+commit.a35aead5",
-        "optimization": True,
-        "runs": 200,
     },
     {
         "name": "PointsEscrow",
         "address": "0xCfAa7FCE305c26F2429251e5c27a743E1a0C3FAf",
-        "file": "PointsEscrow.sol",
-        "compiler": "v0.8.20+commit.a35aead5",
-        "optimization": True,
-        "runs": 200,
     },
 ]
 
-def read_source(filename):
-    """Read contract source file"""
-    path = CONTRACTS_DIR / filename
-    if not path.exists():
-        print(f"❌ File not found: {path}")
+def build_submission(contract, compiled, build_infos):
+    """explorer.Submission for a contract, or None if it has no compiled artifact"""
+    try:
+        artifact = artifacts.find(compiled, contract["name"])
+        params = artifacts.payload(artifact, build_infos)
+    except artifacts.ArtifactError as e:
+        print(f"❌ {e}")
         return None
-    with open(path, "r") as f:
-        return f.read()
-
-def verify_contract(contract):
-    """Submit contract for verification"""
-    print(f"\n📋 Submitting {contract['name']} for verification...")
-    
-    source = read_source(contract["file"])
-    if not source:
-        return False
     
     params = {
-        "apikey": API_KEY,
-        "module": "contract",
-        "action": "verifysourcecode",
         "contractaddress": contract["address"],
-        "sourceCode": source,
-        "codeformat": "solidity-single-file",
-        "contractname": contract["name"],
-        "compilerversion": contract["compiler"],
-        "optimizationUsed": "1" if contract["optimization"] else "0",
-        "runs": contract["runs"],
+        **params,
         "licenseType": "12",  # MIT
     }
-    
-    try:
-        resp = requests.post(BASESCAN_API, data=params, timeout=30)
-        result = resp.json()
-        
-        if result.get("status") == "1":
-            guid = result.get("result", "")
-            print(f"✅ Submitted! GUID: {guid}")
-            print(f"   Check status: https://sepolia.basescan.org/address/{contract['address']}#code")
-            return True
+    return explorer.Submission(contract["name"], contract["address"], params)
+
+def print_result(result):
+    icons = {
+        explorer.VERIFIED: "✅",
+        explorer.ALREADY_VERIFIED: "⏭️ ",
+        explorer.TIMEOUT: "⏳",
+    }
+    icon = icons.get(result.status, "❌")
+    print(f"{icon} {result.name} ({result.address}): {result.status} in {result.seconds:.1f}s")
+    if result.message and result.status != explorer.VERIFIED:
+        print(f"   {result.message}")
+
+async def verify_all(api_url, submissions, rate, poll_timeout, poll_interval, use_cache=True, rpc_url=RPC_URL):
+    # Contracts the status cache already knows are verified are not resubmitted
+    hashes = await explorer.code_hashes(rpc_url, [s.address for s in submissions]) if use_cache else {}
+    cached = []
+    pending = []
+    for submission in submissions:
+        hit = explorer.cached_status(CHAIN_ID, submission.address, hashes.get(submission.address)) if use_cache else None
+        if hit and hit[0]:
+            cached.append(explorer.Result(submission.name, submission.address,
+                                          explorer.ALREADY_VERIFIED, None, "cached", 0.0))
+            print_result(cached[-1])
         else:
-            print(f"❌ Error: {result.get('message', 'Unknown error')}")
-            print(f"   Response: {result.get('result', '')}")
-            return False
-    except Exception as e:
-        print(f"❌ Exception: {e}")
-        return False
-
-print("🔍 BaseScan Contract Verification")
-print("=" * 60)
-
-success_count = 0
-for contract in CONTRACTS:
-    if verify_contract(contract):
-        success_count += 1
-
-print("\n" + "=" * 60)
-print(f"\n✅ Submitted {success_count}/{len(CONTRACTS)} contracts")
-print("\n📊 BaseScan typically verifies within 1-5 minutes.")
-print("   Check status at: https://sepolia.basescan.org/\n")
+            pending.append(submission)
+
+    async with explorer.Client(api_url, API_KEY, rate=rate) as client:
+        results = await explorer.verify_all(
+            client, pending, poll_timeout=poll_timeout,
+            poll_interval=poll_interval, on_result=print_result,
+        )
+    print(f"\n📡 {client.requests} API request(s), {client.rate_limited} rate-limited and retried")
+
+    if use_cache:
+        for r in results:
+            if r.status in (explorer.VERIFIED, explorer.ALREADY_VERIFIED):
+                explorer.remember_status(CHAIN_ID, r.address, hashes.get(r.address), True, {"ContractName": r.name})
+    return cached + list(results)
+
+async def verify_against_mock(submissions, rate):
+    # A scratch status cache, so the mock's results never reach the real one
+    previous = os.environ.get("OPS_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["OPS_CACHE_DIR"] = cache_dir
+        try:
+            return await _verify_against_mock(submissions, rate)
+        finally:
+            if previous is None:
+                os.environ.pop("OPS_CACHE_DIR", None)
+            else:
+                os.environ["OPS_CACHE_DIR"] = previous
+
+async def _verify_against_mock(submissions, rate):
+    async with MockExplorer(rate=rate) as mock:
+        print(f"🧪 Using mock explorer at {mock.url}, mock RPC at {mock.rpc_url}")
+        hashes = await explorer.code_hashes(mock.rpc_url, [s.address for s in submissions])
+        if len(hashes) != len(submissions) or None in hashes.values():
+            print(f"❌ eth_getCode hashed {len(hashes)}/{len(submissions)} contract(s)")
+            return []
+        results = await verify_all(mock.url, submissions, rate, poll_timeout=30, poll_interval=0.2,
+                                   rpc_url=mock.rpc_url)
+
+        print("\n🧪 Second pass, every contract should come from the status cache")
+        requests = mock.requests
+        again = await verify_all(mock.url, submissions, rate, poll_timeout=30, poll_interval=0.2,
+                                 rpc_url=mock.rpc_url)
+        if mock.requests != requests or any(r.message != "cached" for r in again):
+            print(f"❌ {mock.requests - requests} explorer request(s) on the second pass")
+            return []
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the deployed contracts on BaseScan")
+    parser.add_argument("--api", default=BASESCAN_API, help=f"explorer API URL (default {BASESCAN_API})")
+    parser.add_argument("--rate", type=float, default=5, help="max requests per second (default 5)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for each GUID (default 300)")
+    parser.add_argument("--mock", action="store_true", help="verify against a local mock explorer")
+    args = parser.parse_args()
+
+    print("🔍 BaseScan Contract Verification")
+    print("=" * 60)
+
+    compiled = artifacts.index(ARTIFACTS_DIR)
+    build_infos = {}
+    submissions = [s for s in (build_submission(c, compiled, build_infos) for c in CONTRACTS) if s]
+    if args.mock:
+        results = asyncio.run(verify_against_mock(submissions, int(args.rate)))
+    else:
+        results = asyncio.run(verify_all(args.api, submissions, args.rate, args.timeout, 1.0))
+
+    done = sum(1 for r in results if r.status in (explorer.VERIFIED, explorer.ALREADY_VERIFIED))
+    print("\n" + "=" * 60)
+    print(f"\n✅ Verified {done}/{len(CONTRACTS)} contracts")
+    if not args.mock:
+        print("   View at: https://sepolia.basescan.org/\n")
+    sys.exit(0 if done == len(CONTRACTS) else 1)
+
+if __name__ == "__main__":
+    main()